@@ -0,0 +1,80 @@
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.chunkers import SemanticChunker
+from text_processing.doc_models.documents import Document
+from text_processing.models import ENCODER_BACKENDS, clear_models, get_encoder
+
+# Fixed corpus so sentences/sec is comparable across backends and runs
+CORPUS_BYTES = 256 * 1024
+BATCH_SIZE = 256
+
+
+def corpus_sentences(limit=2000):
+    """Get the first sentences of the synthetic corpus, as the chunker would encode them."""
+    document = Document(synthetic_markdown(CORPUS_BYTES, words_per_section=200))
+    blocks = document.create_blocks(min_words=50)
+    _, sentences = SemanticChunker(model=get_encoder('hash')).split_blocks(blocks)
+    return sentences[:limit]
+
+
+def run(backends=ENCODER_BACKENDS, limit=2000, repeat=2, workers=()):
+    """
+    Print load time and sentences/sec per backend.
+
+    Args:
+        backends (Iterable[str]): Backends to benchmark
+        limit (int): Number of corpus sentences to encode
+        repeat (int): Timed runs per configuration; the fastest is reported
+        workers (Iterable[int]): Encoding process counts to compare with the single-process path
+    """
+    sentences = corpus_sentences(limit)
+    print(f"{len(sentences)} sentences, batch size {BATCH_SIZE}")
+    print(f"{'backend':<22} {'workers':>7} {'load s':>8} {'seconds':>9} {'sentences/s':>12} {'speedup':>8} {'dim':>5}")
+    for backend in backends:
+        baseline = None
+        reference = None
+        for count in (1, *workers):
+            start = time.perf_counter()
+            try:
+                encoder = get_encoder(backend, workers=count)
+                chunker = SemanticChunker(model=encoder, batch_size=BATCH_SIZE)
+                # First call loads the model (and downloads it if needed); a pooled encoder only starts its
+                # workers for batches of at least min_pool_batch sentences
+                chunker.encode_sentences(sentences[:max(8, getattr(encoder, 'min_pool_batch', 0))])
+            except ImportError as exc:
+                print(f"{backend:<22} unavailable: {exc}")
+                break
+            load = time.perf_counter() - start
+
+            seconds = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                embeddings = chunker.encode_sentences(sentences)
+                seconds = min(seconds, time.perf_counter() - start)
+            if reference is None:
+                baseline, reference = seconds, embeddings
+            elif not np.allclose(embeddings, reference, atol=1e-4):
+                print(f"{backend:<22} {count:>7} embeddings differ from the single-process run")
+            print(f"{backend:<22} {count:>7} {load:>8.2f} {seconds:>9.3f} {len(sentences) / seconds:>12.0f} "
+                  f"{baseline / seconds:>7.2f}x {embeddings.shape[1]:>5}")
+    # Stops the encoding processes
+    clear_models()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare encoder backends by sentences/sec on a fixed corpus.")
+    parser.add_argument('--backend', action='append', choices=ENCODER_BACKENDS,
+                        help="backend to benchmark (repeatable, default: all)")
+    parser.add_argument('--sentences', type=int, default=2000, help="number of corpus sentences to encode")
+    parser.add_argument('--workers', type=int, action='append', default=[],
+                        help="also encode with this many processes (repeatable), compared with one process")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(backends=args.backend or ENCODER_BACKENDS, limit=args.sentences, workers=args.workers)
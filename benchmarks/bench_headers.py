@@ -0,0 +1,48 @@
+import random
+import time
+
+from text_processing.doc_models.documents import Document
+
+WORDS = "sustainability forest welfare economy nature report capital resource policy growth".split()
+
+
+def synthetic_body(rng, words, words_per_sentence=15):
+    """Generate prose of a given word count split into sentences."""
+    sentences = []
+    for start in range(0, words, words_per_sentence):
+        count = min(words_per_sentence, words - start)
+        sentences.append(' '.join(rng.choice(WORDS) for _ in range(count)) + '.')
+    return ' '.join(sentences)
+
+
+def synthetic_markdown(target_bytes, words_per_section=200, seed=0):
+    """Generate markdown of roughly target_bytes with repeated and unique headers."""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    section = 0
+    while size < target_bytes:
+        # Every tenth section reuses a common title to exercise repeated headers
+        title = "Introduction" if section % 10 == 0 else f"Section {section}"
+        header = f"{'#' * rng.randint(1, 3)} {title}"
+        body = synthetic_body(rng, words_per_section)
+        parts.append(header)
+        parts.append(body)
+        size += len(header) + len(body) + 2
+        section += 1
+    return '\n'.join(parts)
+
+
+def run(sizes_mb=(1, 2, 5, 10)):
+    print(f"{'size (MB)':>10} {'blocks':>8} {'seconds':>9} {'MB/s':>8}")
+    for size_mb in sizes_mb:
+        text = synthetic_markdown(size_mb * 1024 * 1024)
+        document = Document(text, doc_id=f"synthetic_{size_mb}mb")
+        start = time.perf_counter()
+        blocks = document.create_blocks(min_words=50)
+        elapsed = time.perf_counter() - start
+        print(f"{size_mb:>10} {len(blocks):>8} {elapsed:>9.3f} {size_mb / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,71 @@
+import subprocess
+import sys
+import time
+
+# Cumulative import time budget per module, in milliseconds
+IMPORT_BUDGET_MS = {
+    'text_processing.doc_models.documents': 30,
+    'text_processing.doc_models.blocks': 30,
+    'text_processing.doc_models.chunks': 250,
+    'text_processing.chunkers': 300,
+    'text_processing.load_and_chunk': 350,
+    'text_processing.main': 60,
+}
+
+# Modules that must not be imported until a model or converter is actually used
+HEAVY_MODULES = ('torch', 'sentence_transformers', 'sklearn', 'marker', 'rich')
+
+CLI_HELP_BUDGET_MS = 300
+
+
+def import_time_ms(module):
+    """Measure a module's cumulative import time in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True
+    )
+    for line in reversed(result.stderr.splitlines()):
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"No importtime entry for {module}")
+
+
+def heavy_imports(module):
+    """List heavy modules pulled in by importing a module."""
+    code = (
+        f'import sys, {module}; '
+        f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return [m for m in result.stdout.strip().split(',') if m]
+
+
+def cli_help_ms():
+    """Measure wall time of `python -m text_processing.main --help`."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'text_processing.main', '--help'],
+                   capture_output=True, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def run():
+    failures = []
+    print(f"{'module':<42} {'ms':>8} {'budget':>8}  heavy imports")
+    for module, budget in IMPORT_BUDGET_MS.items():
+        elapsed = import_time_ms(module)
+        heavy = heavy_imports(module)
+        status = 'ok' if elapsed <= budget and not heavy else 'OVER'
+        if status != 'ok':
+            failures.append(module)
+        print(f"{module:<42} {elapsed:>8.1f} {budget:>8}  {', '.join(heavy) or '-'} {status}")
+
+    elapsed = cli_help_ms()
+    if elapsed > CLI_HELP_BUDGET_MS:
+        failures.append('cli --help')
+    print(f"{'cli --help (wall, incl. interpreter)':<42} {elapsed:>8.1f} {CLI_HELP_BUDGET_MS:>8}")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if run() else 0)
@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.chunkers import SemanticChunker
+from text_processing.doc_models.documents import Document
+from text_processing.encoders import HashEncoder
+
+# Synthetic corpora: size and header density (words between headers)
+SCENARIOS = {
+    'small_dense': {'target_bytes': 256 * 1024, 'words_per_section': 60},
+    'small_sparse': {'target_bytes': 256 * 1024, 'words_per_section': 600},
+    'large_dense': {'target_bytes': 4 * 1024 * 1024, 'words_per_section': 60},
+    'large_sparse': {'target_bytes': 4 * 1024 * 1024, 'words_per_section': 600},
+}
+
+SAMPLE_PDF_DIR = 'data/sample_pdf'
+BLOCK_MIN_WORDS = 50
+REGRESSION_TOLERANCE = 0.10
+REPEAT = 3
+
+
+def peak_rss_kb():
+    """Get the peak resident set size of this process in KB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure(stage, blocks=0, sentences=0, repeat=REPEAT):
+    """
+    Time a stage (best of several runs), then run it under tracemalloc for allocations.
+
+    Args:
+        stage (Callable[[], Any]): Stage to run; must be repeatable
+        blocks (int | Callable): Block count, or a function of the stage result
+        sentences (int | Callable): Sentence count, or a function of the stage result
+        repeat (int): Number of timed runs
+
+    Returns:
+        Tuple[Any, dict]: Result of the timed run and its metrics
+    """
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = stage()
+        seconds = min(seconds, time.perf_counter() - start)
+    rss = peak_rss_kb()
+
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    stage()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sys.getallocatedblocks() - blocks_before
+
+    blocks = blocks(result) if callable(blocks) else blocks
+    sentences = sentences(result) if callable(sentences) else sentences
+    return result, {
+        'seconds': seconds,
+        'blocks': blocks,
+        'sentences': sentences,
+        'blocks_per_sec': blocks / seconds if seconds else 0.0,
+        'sentences_per_sec': sentences / seconds if seconds else 0.0,
+        'peak_rss_kb': rss,
+        'traced_peak_kb': traced_peak // 1024,
+        'allocated_blocks_delta': allocated,
+    }
+
+
+def run_pipeline(markdown, chunker):
+    """Time every chunking stage on one markdown text."""
+    metrics = {}
+    document = Document(markdown)
+
+    blocks, metrics['headers'] = measure(
+        lambda: document.create_blocks(min_words=BLOCK_MIN_WORDS), blocks=len
+    )
+    (block_spans, sentences), metrics['split'] = measure(
+        lambda: chunker.split_blocks(blocks), blocks=len(blocks), sentences=lambda result: len(result[1])
+    )
+    embeddings, metrics['encode'] = measure(
+        lambda: chunker.encode_sentences(sentences), blocks=len(blocks), sentences=len(sentences)
+    )
+    _, metrics['group'] = measure(
+        lambda: chunker.group_blocks(blocks, block_spans, embeddings, similarity_threshold=0.45),
+        blocks=len(blocks), sentences=len(sentences)
+    )
+    return metrics
+
+
+def cached_sample_markdown():
+    """Yield (name, markdown) for sample PDFs that already have a cached conversion."""
+    from text_processing.conversion_cache import ConversionCache
+    from text_processing.converters import ConverterManager
+
+    cache = ConversionCache()
+    config = ConverterManager.build_config("markdown")
+    for pdf in sorted(Path(SAMPLE_PDF_DIR).glob('*.pdf')):
+        rendered = cache.get(cache.key(pdf, config))
+        if rendered is None:
+            print(f"  skipping {pdf.name}: no cached conversion (run the pipeline on it once)")
+            continue
+        yield f"pdf_{pdf.stem}", rendered.markdown
+
+
+def git_commit():
+    """Get the current git commit, if any."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scenarios=None, include_pdfs=True, encoder=None):
+    """
+    Run the benchmark suite.
+
+    Args:
+        scenarios (Iterable[str], optional): Synthetic scenarios to run (default: all)
+        include_pdfs (bool): Also run over cached sample PDF conversions
+        encoder (optional): Encoder to benchmark; defaults to the deterministic HashEncoder
+
+    Returns:
+        dict: Metadata and per-corpus, per-stage metrics
+    """
+    chunker = SemanticChunker(model=encoder or HashEncoder())
+    corpora = []
+    for name in scenarios or SCENARIOS:
+        corpora.append((name, synthetic_markdown(**SCENARIOS[name])))
+    if include_pdfs:
+        corpora.extend(cached_sample_markdown())
+
+    results = {}
+    for name, markdown in corpora:
+        results[name] = run_pipeline(markdown, chunker)
+        print_metrics(name, results[name])
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'encoder': repr(chunker.model),
+        },
+        'results': results,
+    }
+
+
+def print_metrics(name, metrics):
+    print(f"\n{name}")
+    print(f"  {'stage':<8} {'seconds':>9} {'blocks/s':>11} {'sentences/s':>13} {'rss KB':>9} "
+          f"{'traced KB':>10} {'alloc blocks':>13}")
+    for stage, m in metrics.items():
+        print(f"  {stage:<8} {m['seconds']:>9.4f} {m['blocks_per_sec']:>11.0f} {m['sentences_per_sec']:>13.0f} "
+              f"{m['peak_rss_kb']:>9} {m['traced_peak_kb']:>10} {m['allocated_blocks_delta']:>13}")
+
+
+def compare(current, baseline, tolerance=REGRESSION_TOLERANCE):
+    """
+    Compare stage timings against a baseline run.
+
+    Args:
+        current (dict): Results of this run
+        baseline (dict): Results loaded from an earlier JSON file
+        tolerance (float): Allowed slowdown before a stage counts as a regression
+
+    Returns:
+        List[str]: Regressed corpus/stage names
+    """
+    regressions = []
+    print(f"\nComparison against {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})")
+    for name, stages in current['results'].items():
+        for stage, metrics in stages.items():
+            old = baseline['results'].get(name, {}).get(stage)
+            if not old or not old['seconds']:
+                continue
+            change = metrics['seconds'] / old['seconds'] - 1
+            flag = 'REGRESSION' if change > tolerance else ''
+            if flag:
+                regressions.append(f"{name}/{stage}")
+            print(f"  {name + '/' + stage:<28} {old['seconds']:>9.4f} -> {metrics['seconds']:>9.4f} "
+                  f"{change:>+8.1%} {flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the chunking pipeline with a deterministic stub encoder.")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="synthetic scenario to run (repeatable, default: all)")
+    parser.add_argument('--no-pdfs', action='store_true', help="skip cached sample PDF conversions")
+    parser.add_argument('--output', default=None,
+                        help="JSON file to write results to (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument('--compare', metavar='BASELINE', help="JSON results to compare against")
+    parser.add_argument('--encoder', metavar='BACKEND',
+                        help="encoder backend to run instead of the stub, e.g. fastembed (see bench_encoders)")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help="allowed slowdown per stage before failing the comparison")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    encoder = None
+    if args.encoder:
+        from text_processing.models import get_encoder
+
+        encoder = get_encoder(args.encoder)
+    report = run(scenarios=args.scenario, include_pdfs=not args.no_pdfs, encoder=encoder)
+
+    output = args.output
+    if output is None:
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        output = os.path.join('benchmarks', 'results', f"{report['meta']['commit'] or 'nocommit'}-{stamp}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report, baseline, tolerance=args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
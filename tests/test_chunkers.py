@@ -0,0 +1,34 @@
+import numpy as np
+
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.chunkers import SemanticChunker
+from text_processing.doc_models.documents import Document
+from text_processing.encoders import HashEncoder
+
+
+def blocks():
+    document = Document(synthetic_markdown(20000, words_per_section=300) + "\n## End")
+    return document.create_blocks(min_words=150)
+
+
+def assert_same_chunks(expected, actual):
+    assert len(expected) == len(actual)
+    for left, right in zip(expected, actual):
+        assert [(c.start, c.end, c.word_count, c.text) for c in left] == \
+            [(c.start, c.end, c.word_count, c.text) for c in right]
+        for a, b in zip(left, right):
+            np.testing.assert_allclose(a.get_embedding(), b.get_embedding(), rtol=1e-5, atol=1e-6)
+
+
+def test_vectorized_engine_matches_legacy():
+    settings = dict(min_words=60, max_words=200, similarity_threshold=0.45)
+    legacy = SemanticChunker(model=HashEncoder(), engine="legacy").chunk_blocks(blocks(), **settings)
+    vectorized = SemanticChunker(model=HashEncoder()).chunk_blocks(blocks(), **settings)
+    assert sum(len(chunks) for chunks in vectorized) > len(vectorized)
+    assert_same_chunks(legacy, vectorized)
+
+
+def test_chunk_blocks_matches_chunking_each_block():
+    chunker = SemanticChunker(model=HashEncoder())
+    per_block = [chunker.chunk_block(block, similarity_threshold=0.45) for block in blocks()]
+    assert_same_chunks(per_block, chunker.chunk_blocks(blocks(), similarity_threshold=0.45))
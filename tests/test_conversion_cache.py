@@ -0,0 +1,33 @@
+import os
+import shutil
+
+from text_processing.conversion_cache import CachedRendering, ConversionCache
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = ConversionCache(root=str(tmp_path))
+    cache.put("key", CachedRendering("# Title\n\nBody", metadata={"pages": 1}))
+
+    rendering = cache.get("key")
+    assert rendering.markdown == "# Title\n\nBody"
+    assert rendering.metadata == {"pages": 1}
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entry_removed_while_read_is_a_miss(tmp_path):
+    cache = ConversionCache(root=str(tmp_path))
+    cache.put("key", CachedRendering("text"))
+    # Another process evicted the entry after output.md was found
+    os.remove(os.path.join(str(tmp_path), "key", "meta.json"))
+    assert cache.get("key") is None
+
+    cache.put("torn", CachedRendering("text"))
+    with open(os.path.join(str(tmp_path), "torn", "meta.json"), "w") as f:
+        f.write('{"metadata"')
+    assert cache.get("torn") is None
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    shutil.rmtree(os.path.join(str(tmp_path), "key"))
+    cache.put("key", CachedRendering("again"))
+    assert cache.get("key").markdown == "again"
@@ -0,0 +1,83 @@
+import pytest
+
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.chunkers import SemanticChunker
+from text_processing.dedup import DedupChunker, Deduplicator
+from text_processing.doc_models.documents import Document
+from text_processing.encoders import HashEncoder
+
+
+class FailingChunker(SemanticChunker):
+    """SemanticChunker whose encode pass always fails."""
+
+    def chunk_blocks(self, blocks, **settings):
+        raise RuntimeError("encoder failed")
+
+
+def document(doc_id):
+    text = synthetic_markdown(8000, words_per_section=300) + "\n## End"
+    document = Document(text, doc_id=doc_id)
+    document.create_blocks(min_words=150)
+    return document
+
+
+def chunk(deduplicator, chunker, doc):
+    DedupChunker(chunker, deduplicator, doc.doc_id).chunk_document(doc, similarity_threshold=0.45)
+    deduplicator.process(doc)
+
+
+def test_duplicate_of_written_document_is_skipped():
+    deduplicator = Deduplicator()
+    chunker = SemanticChunker(model=HashEncoder())
+    first, second = document("first"), document("second")
+    chunk(deduplicator, chunker, first)
+    chunk(deduplicator, chunker, second)
+
+    assert all(block.duplicate_of is None and block.chunks for block in first.blocks)
+    assert all(block.duplicate_of == ("first", block.block_id) for block in second.blocks)
+    assert all(len(block.chunks) == 1 for block in second.blocks)
+    assert deduplicator.report.duplicate_blocks == len(second.blocks)
+
+
+def test_duplicate_of_failed_chunking_is_chunked():
+    deduplicator = Deduplicator()
+    failed, second = document("failed"), document("second")
+    with pytest.raises(RuntimeError):
+        chunk(deduplicator, FailingChunker(model=HashEncoder()), failed)
+
+    chunk(deduplicator, SemanticChunker(model=HashEncoder()), second)
+    assert all(block.duplicate_of is None and block.chunks for block in second.blocks)
+    assert deduplicator.report.duplicate_blocks == 0
+
+
+def test_duplicate_of_failed_write_is_chunked():
+    deduplicator = Deduplicator()
+    chunker = SemanticChunker(model=HashEncoder())
+    failed, second = document("failed"), document("second")
+    chunk(deduplicator, chunker, failed)
+    # The writer failed for this document
+    deduplicator.discard(failed.blocks, failed.doc_id)
+
+    chunk(deduplicator, chunker, second)
+    assert all(block.duplicate_of is None and block.chunks for block in second.blocks)
+    assert not any(chunk.duplicate_of for chunk in second.get_all_chunks())
+
+
+def test_orphaned_blocks_of_same_batch_are_rechunked():
+    deduplicator = Deduplicator()
+    chunker = SemanticChunker(model=HashEncoder())
+    failed, second = document("failed"), document("second")
+    # One encode pass for both documents, as run_batch does
+    blocks = deduplicator.skip_duplicate_blocks(failed.blocks, "failed")
+    blocks += deduplicator.skip_duplicate_blocks(second.blocks, "second")
+    for block, chunks in zip(blocks, chunker.chunk_blocks(blocks, similarity_threshold=0.45)):
+        block.chunks = chunks
+    deduplicator.complete_blocks(failed.blocks, "failed")
+    deduplicator.discard(failed.blocks, "failed")
+
+    deduplicator.complete_blocks(second.blocks, "second")
+    orphans = deduplicator.orphaned_blocks(second.blocks)
+    assert orphans == second.blocks
+    deduplicator.chunk_blocks(chunker, orphans, "second", similarity_threshold=0.45)
+    assert all(block.duplicate_of is None and block.chunks for block in second.blocks)
+    assert deduplicator.report.duplicate_blocks == 0
@@ -0,0 +1,27 @@
+import io
+
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.doc_models.documents import Document
+
+
+def test_streamed_blocks_match_create_blocks(tmp_path):
+    # Sections under min_words are skipped, longer ones become blocks
+    text = "\n".join([
+        synthetic_markdown(10000, words_per_section=60, seed=1),
+        synthetic_markdown(30000, words_per_section=200, seed=2),
+        "## End",
+    ])
+    expected = [
+        (block.block_id, block.start_header, block.end_header, block.start, block.text)
+        for block in Document(text).create_blocks(min_words=150)
+    ]
+    assert len(expected) > 10
+
+    path = tmp_path / "doc.md"
+    path.write_text(text, encoding="utf-8")
+    for source in (io.StringIO(text), str(path)):
+        streamed = [
+            (block.block_id, block.start_header, block.end_header, block.start, block.text)
+            for block in Document.from_source(source).iter_blocks(min_words=150)
+        ]
+        assert streamed == expected
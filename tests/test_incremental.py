@@ -0,0 +1,48 @@
+import numpy as np
+
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.chunkers import SemanticChunker
+from text_processing.doc_models.documents import Document
+from text_processing.encoders import HashEncoder
+from text_processing.incremental import ChunkManifest, rechunk_document
+
+
+def document():
+    document = Document(synthetic_markdown(8000, words_per_section=300) + "\n## End", doc_id="doc")
+    document.create_blocks(min_words=150)
+    return document
+
+
+def test_unchanged_document_reuses_every_block(tmp_path):
+    chunker = SemanticChunker(model=HashEncoder())
+    first = document()
+    manifest, _ = rechunk_document(first, chunker, similarity_threshold=0.45)
+    manifest.save(str(tmp_path), "doc")
+
+    second = document()
+    _, diff = rechunk_document(second, chunker, manifest=ChunkManifest.load(str(tmp_path), "doc"),
+                               similarity_threshold=0.45)
+    assert diff.reused_blocks == len(second.blocks)
+    for old, new in zip(first.get_all_chunks(), second.get_all_chunks()):
+        assert (old.start, old.end) == (new.start, new.end)
+        np.testing.assert_array_equal(old.get_embedding(), new.get_embedding())
+
+
+def test_embedding_dtype_change_rechunks_every_block():
+    manifest, _ = rechunk_document(document(), SemanticChunker(model=HashEncoder()), similarity_threshold=0.45)
+
+    int8 = SemanticChunker(model=HashEncoder(), embedding_dtype="int8")
+    second = document()
+    _, diff = rechunk_document(second, int8, manifest=manifest, similarity_threshold=0.45)
+    assert diff.reused_blocks == 0
+    assert all(chunk.quantized_embedding[0].dtype == np.int8 for chunk in second.get_all_chunks())
+
+
+def test_quantized_run_reuses_quantized_chunks():
+    int8 = SemanticChunker(model=HashEncoder(), embedding_dtype="int8")
+    manifest, _ = rechunk_document(document(), int8, similarity_threshold=0.45)
+
+    second = document()
+    _, diff = rechunk_document(second, int8, manifest=manifest, similarity_threshold=0.45)
+    assert diff.reused_blocks == len(second.blocks)
+    assert all(chunk.quantized_embedding[0].dtype == np.int8 for chunk in second.get_all_chunks())
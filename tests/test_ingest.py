@@ -0,0 +1,38 @@
+import json
+import os
+
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.batch import source_root
+from text_processing.chunkers import SemanticChunker
+from text_processing.encoders import HashEncoder
+from text_processing.ingest import Ingestor, JobQueue
+from text_processing.writers import ChunkWriter
+
+
+def test_source_root():
+    assert source_root("inbox/**/*.pdf") == "inbox"
+    assert source_root("*.pdf") == "."
+
+
+def test_same_file_name_in_two_directories_gets_separate_outputs(tmp_path):
+    inbox = tmp_path / "inbox"
+    paths = [inbox / "report.pdf", inbox / "a" / "report.pdf", inbox / "b" / "report.pdf"]
+    ingestor = Ingestor(
+        str(inbox / "**" / "*.pdf"), queue=JobQueue(str(tmp_path / "jobs.sqlite")),
+        chunker=SemanticChunker(model=HashEncoder()), writer=ChunkWriter(output_dir=str(tmp_path / "out")),
+        work_dir=str(tmp_path / "work")
+    )
+    for i, path in enumerate(paths):
+        ingestor.queue.enqueue(str(path), f"hash{i}", 0.0, 0)
+    jobs = ingestor.queue.claim(limit=len(paths))
+    assert [ingestor.output_name(job["path"]) for job in jobs] == ["report", "a__report", "b__report"]
+
+    for seed, job in enumerate(jobs):
+        markdown = synthetic_markdown(4000, words_per_section=300, seed=seed) + "\n## End"
+        assert ingestor._process_converted(job, markdown)
+    for name in ("report", "a__report", "b__report"):
+        with open(os.path.join(str(tmp_path / "out"), f"{name}_chunks.jsonl")) as f:
+            records = [json.loads(line) for line in f]
+        assert records and {record["doc_id"] for record in records} == {name}
+        assert os.path.exists(os.path.join(str(tmp_path / "out"), f"{name}_manifest.json"))
+    ingestor.close()
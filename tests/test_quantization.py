@@ -0,0 +1,16 @@
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.chunkers import SemanticChunker
+from text_processing.doc_models.documents import Document
+from text_processing.encoders import HashEncoder
+from text_processing.quantization import drift_report
+
+
+def test_drift_reference_is_float32_for_any_chunker_dtype():
+    document = Document(synthetic_markdown(8000, words_per_section=300) + "\n## End")
+    blocks = document.create_blocks(min_words=150)
+
+    reports = [
+        drift_report(blocks, SemanticChunker(model=HashEncoder(), embedding_dtype=dtype), similarity_threshold=0.45)
+        for dtype in ("float32", "int8")
+    ]
+    assert reports[0] == reports[1]
@@ -0,0 +1,34 @@
+import re
+
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.sentences import extend_to_terminator, sentence_spans, split_sentences
+
+
+def legacy_split(text):
+    """The segmentation sentence spans replaced."""
+    return [sentence.strip() for sentence in re.split(r'[.!?]+', text) if sentence.strip()]
+
+
+TEXTS = [
+    "",
+    "   ",
+    "No terminator",
+    "One. Two! Three? Four...",
+    "...leading terminators.?! and trailing ?!",
+    "Spaces  inside\tand\nnewlines . Then  more  .  ",
+    "Unicode spaces around　. Ünïcödé wörds! 日本語の文。Next",
+    synthetic_markdown(20000),
+]
+
+
+def test_sentence_spans_match_legacy_split():
+    for text in TEXTS:
+        expected = legacy_split(text)
+        assert split_sentences(text) == expected
+        assert [text[start:end] for start, end in sentence_spans(text)] == expected
+
+
+def test_extend_to_terminator():
+    text = "First?! Second"
+    (start, end), _ = sentence_spans(text)
+    assert text[start:extend_to_terminator(text, end)] == "First?!"
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.chunkers import SemanticChunker
+from text_processing.doc_models.documents import Document
+from text_processing.encoders import HashEncoder
+from text_processing.service import MicroBatcher, create_app
+from text_processing.writers import chunk_records
+
+
+class CountingEncoder(HashEncoder):
+    """HashEncoder that records the size of every encode() call."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        with self._lock:
+            self.calls.append(len(sentences))
+        return super().encode(sentences, batch_size=batch_size)
+
+
+def markdown(seed):
+    return synthetic_markdown(12000, words_per_section=300).replace("Section", f"Part {seed}")
+
+
+def test_chunk_markdown_matches_direct_chunking():
+    text = markdown(0)
+    with TestClient(create_app(encoder=HashEncoder())) as client:
+        response = client.post("/chunk/markdown", json={"markdown": text, "doc_id": "doc"})
+    assert response.status_code == 200
+    assert response.json()["chunks"]
+
+    document = Document(text, doc_id="doc")
+    document.create_blocks(min_words=150)
+    SemanticChunker(model=HashEncoder()).chunk_document(document, similarity_threshold=0.45)
+    assert response.json()["chunks"] == chunk_records(document)
+
+
+def test_concurrent_requests_share_one_encode_call():
+    encoder = CountingEncoder()
+    # A wide window so every request joins the first batch
+    app = create_app(encoder=encoder, max_batch_size=100000, max_wait_ms=1000)
+    texts = [markdown(i) for i in range(4)]
+    responses = [None] * len(texts)
+
+    with TestClient(app) as client:
+        def post(i):
+            responses[i] = client.post("/chunk/markdown", json={"markdown": texts[i]})
+
+        threads = [threading.Thread(target=post, args=(i,)) for i in range(len(texts))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = client.get("/stats").json()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len(encoder.calls) == 1
+    assert stats["batches"] == 1 and stats["requests"] == len(texts)
+
+
+def test_batch_flushes_at_max_batch_size():
+    async def run():
+        encoder = CountingEncoder()
+        batcher = MicroBatcher(encoder, max_batch_size=4, max_wait_ms=10000)
+        await batcher.start()
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(batcher.encode(["a", "b"]), batcher.encode(["c", "d"]))
+            elapsed = time.perf_counter() - start
+        finally:
+            await batcher.stop()
+        return encoder, results, elapsed
+
+    encoder, results, elapsed = asyncio.run(run())
+    # Full before the 10 s window closed
+    assert elapsed < 5
+    assert encoder.calls == [4]
+    np.testing.assert_array_equal(np.concatenate(results), HashEncoder().encode(["a", "b", "c", "d"]))
+
+
+def test_batch_flushes_after_max_wait():
+    async def run():
+        encoder = CountingEncoder()
+        batcher = MicroBatcher(encoder, max_batch_size=100000, max_wait_ms=20)
+        await batcher.start()
+        try:
+            start = time.perf_counter()
+            first = await batcher.encode(["a"])
+            elapsed = time.perf_counter() - start
+            await asyncio.sleep(0.1)
+            second = await batcher.encode(["b"])
+        finally:
+            await batcher.stop()
+        return encoder, batcher, first, second, elapsed
+
+    encoder, batcher, first, second, elapsed = asyncio.run(run())
+    # A lone request is sent once the window closes instead of waiting to fill the batch
+    assert elapsed < 1
+    assert encoder.calls == [1, 1]
+    assert batcher.stats()["batches"] == 2
+    np.testing.assert_array_equal(first, HashEncoder().encode(["a"]))
+    np.testing.assert_array_equal(second, HashEncoder().encode(["b"]))
+
+
+class BlockingEncoder(HashEncoder):
+    """HashEncoder that holds every encode() call until it is released."""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        self.started.set()
+        self.release.wait(10)
+        return super().encode(sentences, batch_size=batch_size)
+
+
+def test_stop_fails_the_batch_being_encoded():
+    async def run():
+        encoder = BlockingEncoder()
+        batcher = MicroBatcher(encoder, max_batch_size=1, max_wait_ms=0)
+        await batcher.start()
+        request = asyncio.ensure_future(batcher.encode(["a"]))
+        await asyncio.get_running_loop().run_in_executor(None, encoder.started.wait, 10)
+        # stop() waits for the encoder thread, which finishes the call once released
+        threading.Timer(0.1, encoder.release.set).start()
+        await batcher.stop()
+        return await asyncio.wait_for(asyncio.gather(request, return_exceptions=True), 5)
+
+    (result,) = asyncio.run(run())
+    assert isinstance(result, RuntimeError) and "shutting down" in str(result)
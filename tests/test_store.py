@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.chunkers import SemanticChunker
+from text_processing.doc_models.documents import Document
+from text_processing.doc_models.store import ChunkStore
+from text_processing.encoders import HashEncoder
+from text_processing.index import ChunkIndex
+
+
+def documents():
+    chunker = SemanticChunker(model=HashEncoder())
+    result = []
+    for seed in range(2):
+        document = Document(synthetic_markdown(8000, words_per_section=300, seed=seed) + "\n## End",
+                            doc_id=f"doc{seed}")
+        document.create_blocks(min_words=150)
+        chunker.chunk_document(document, similarity_threshold=0.45)
+        result.append(document)
+    return result
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_chunk_store_round_trip(tmp_path, dtype):
+    docs = documents()
+    store = ChunkStore.from_documents(docs, dtype=dtype, bind=False)
+    store.save(str(tmp_path))
+
+    for mmap in (True, False):
+        loaded = ChunkStore.load(str(tmp_path), mmap=mmap)
+        assert len(loaded) == len(store) == sum(len(d.get_all_chunks()) for d in docs)
+        for row in range(len(store)):
+            assert loaded.text(row) == store.text(row)
+            assert loaded.doc_id(row) == store.doc_id(row)
+            np.testing.assert_array_equal(loaded.embedding(row), store.embedding(row))
+        for name in ChunkStore.COLUMNS:
+            np.testing.assert_array_equal(getattr(loaded, name), getattr(store, name))
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_chunk_index_round_trip(tmp_path, dtype):
+    index = ChunkIndex.from_documents(documents(), dtype=dtype)
+    index.save(str(tmp_path))
+    loaded = ChunkIndex.load(str(tmp_path))
+
+    assert len(loaded) == len(index)
+    assert loaded.doc_ids == index.doc_ids and loaded.texts == index.texts
+    np.testing.assert_array_equal(loaded.block_ids, index.block_ids)
+    np.testing.assert_array_equal(loaded.chunk_ids, index.chunk_ids)
+    queries = HashEncoder().encode(["a query", "another query"])
+    for expected, actual in zip(index.search(queries, k=5, doc_id="doc1"), loaded.search(queries, k=5, doc_id="doc1")):
+        np.testing.assert_array_equal(expected, actual)
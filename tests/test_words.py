@@ -0,0 +1,28 @@
+import random
+
+from text_processing.words import WordIndex
+
+
+def test_counts_match_str_split():
+    rng = random.Random(0)
+    separators = [" ", "  ", "\t", "\n", "\n\n", " ", " ", "　", "\x1c"]
+    words = ["alpha", "béta", "γάμμα", "日本語", "x", "end."]
+    text = "".join(rng.choice(words) + rng.choice(separators) for _ in range(2000))
+    text = " " + text + "tail"
+    index = WordIndex(text)
+    assert len(index) == len(text.split())
+
+    spans = [sorted(rng.sample(range(len(text) + 1), 2)) for _ in range(500)]
+    spans += [(0, len(text)), (5, 5), (10, 3)]
+    for start, end in spans:
+        assert index.count(start, end) == len(text[start:end].split())
+    assert list(index.counts(spans)) == [len(text[start:end].split()) for start, end in spans]
+    assert index.count(7) == len(text[7:].split())
+
+
+def test_ascii_counts_match_str_split():
+    text = "one two\tthree\n\nfour  five six. Seven!"
+    index = WordIndex(text)
+    for start in range(len(text) + 1):
+        for end in range(start, len(text) + 1):
+            assert index.count(start, end) == len(text[start:end].split())
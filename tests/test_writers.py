@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+
+from benchmarks.bench_headers import synthetic_markdown
+from text_processing.chunkers import SemanticChunker
+from text_processing.doc_models.documents import Document
+from text_processing.encoders import HashEncoder
+from text_processing.writers import ChunkWriter, load_embeddings
+
+
+def chunked_document():
+    document = Document(synthetic_markdown(8000, words_per_section=300) + "\n## End", doc_id="doc")
+    document.create_blocks(min_words=150)
+    SemanticChunker(model=HashEncoder()).chunk_document(document, similarity_threshold=0.45)
+    return document
+
+
+def test_int8_embeddings_round_trip(tmp_path):
+    document = chunked_document()
+    paths = ChunkWriter(output_dir=str(tmp_path), embedding_dtype="int8").write(document, "doc.pdf")
+
+    expected = np.stack([chunk.get_embedding() for chunk in document.get_all_chunks()])
+    np.testing.assert_allclose(load_embeddings(paths["embeddings"]), expected, atol=0.01)
+
+
+def test_rewrite_as_float32_removes_int8_scales(tmp_path):
+    document = chunked_document()
+    paths = ChunkWriter(output_dir=str(tmp_path), embedding_dtype="int8").write(document, "doc.pdf")
+    assert os.path.exists(paths["embedding_scales"])
+
+    rewritten = ChunkWriter(output_dir=str(tmp_path)).write(document, "doc.pdf")
+    assert "embedding_scales" not in rewritten
+    assert not os.path.exists(paths["embedding_scales"])
+    assert load_embeddings(rewritten["embeddings"]).dtype == np.float32
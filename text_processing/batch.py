@@ -0,0 +1,272 @@
+import glob
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from text_processing.chunkers import SemanticChunker
+from text_processing.converters import get_converter_manager
+from text_processing.doc_models.documents import Document
+from text_processing.load_and_chunk import pdf2markdown
+from text_processing.text_layer import TextLayerReport
+from text_processing.writers import ChunkWriter
+
+
+def find_pdfs(source):
+    """
+    Resolve a directory, glob pattern or single file into a sorted list of PDFs.
+
+    Args:
+        source (str | Path): Directory, glob pattern or PDF path
+
+    Returns:
+        List[Path]: PDF paths
+    """
+    source = str(source)
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, "*.pdf"))
+    elif os.path.isfile(source):
+        paths = [source]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(Path(p) for p in paths if p.lower().endswith(".pdf"))
+
+
+def source_root(source):
+    """
+    Get the directory that the PDFs of a source are found under.
+
+    Args:
+        source (str | Path): Directory, glob pattern or PDF path
+
+    Returns:
+        str: The directory itself, the file's directory, or the part of a glob pattern before its
+        first wildcard
+    """
+    source = str(source)
+    if os.path.isdir(source):
+        return source
+    if os.path.isfile(source):
+        return os.path.dirname(source) or "."
+    parts = []
+    for part in Path(source).parts:
+        if any(char in part for char in "*?["):
+            break
+        parts.append(part)
+    return os.path.join(*parts) if parts else "."
+
+
+def _init_convert_worker():
+    """Load marker models once in each worker process."""
+    get_converter_manager().warm_up()
+
+
+def _convert_worker(file_path, text_layer=False):
+    """Convert one PDF in a worker process and return its markdown, page count and text-layer stats."""
+    rendered_file = pdf2markdown(file_path, text_layer=text_layer)
+    stats = rendered_file.metadata.get("text_layer")
+    page_count = stats["pages"] if stats else len(rendered_file.metadata.get("page_stats", []))
+    return rendered_file.markdown, page_count, stats
+
+
+class BatchReport:
+    """
+    Progress and throughput counters for a batch run.
+    """
+
+    def __init__(self, total):
+        """
+        Initialize the report.
+
+        Args:
+            total (int): Number of files in the batch
+        """
+        self.total = total
+        self.documents = 0
+        self.pages = 0
+        self.chunks = 0
+        self.failures = {}
+        self.text_layer = None
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        """Get seconds since the batch started."""
+        return time.perf_counter() - self.started
+
+    @property
+    def docs_per_min(self):
+        """Get completed documents per minute."""
+        return self.documents / self.elapsed * 60 if self.elapsed else 0.0
+
+    @property
+    def pages_per_sec(self):
+        """Get converted pages per second."""
+        return self.pages / self.elapsed if self.elapsed else 0.0
+
+    def progress(self):
+        """Get a one-line progress summary."""
+        done = self.documents + len(self.failures)
+        return (f"[{done}/{self.total}] {self.documents} ok, {len(self.failures)} failed, "
+                f"{self.docs_per_min:.1f} docs/min, {self.pages_per_sec:.2f} pages/sec")
+
+    def __str__(self):
+        lines = [f"Batch finished in {self.elapsed:.1f}s: {self.progress()}, {self.chunks} chunks"]
+        if self.text_layer is not None:
+            lines.append(f"  {self.text_layer}")
+        for file_path, error in self.failures.items():
+            lines.append(f"  FAILED {file_path}: {error}")
+        return "\n".join(lines)
+
+
+def run_batch(source, similarity_threshold=0.45, block_min_words=150, max_workers=None,
+              max_pending=None, chunk_batch_docs=4, chunker=None, writer=None, deduplicator=None,
+              text_layer=False):
+    """
+    Convert and chunk many PDFs as a two-stage pipeline.
+
+    PDFs are converted in a bounded process pool while the main process
+    chunks finished documents with one shared embedding model, encoding
+    several documents per pass. At most max_pending conversions are in
+    flight and at most chunk_batch_docs converted documents wait for
+    chunking, so memory does not grow with the number of files.
+
+    Args:
+        source (str | Path): Directory, glob pattern or PDF path
+        similarity_threshold (float): Similarity threshold for splitting
+        block_min_words (int): Minimum words per block
+        max_workers (int, optional): Conversion processes (default: CPU count, at most 4)
+        max_pending (int, optional): Conversions in flight (default: 2 x max_workers)
+        chunk_batch_docs (int): Documents chunked per encode pass
+        chunker (SemanticChunker, optional): Shared chunker
+        writer (ChunkWriter, optional): Writer for the chunk outputs
+        deduplicator (Deduplicator, optional): Corpus-wide near-duplicate filter; duplicate blocks are
+            skipped before encoding, duplicate chunks before writing
+        text_layer (bool): Extract born-digital pages from the PDF text layer instead of with marker
+
+    Returns:
+        BatchReport: Throughput and failure report
+    """
+    pdfs = find_pdfs(source)
+    report = BatchReport(len(pdfs))
+    if not pdfs:
+        return report
+
+    if max_workers is None:
+        max_workers = min(4, os.cpu_count() or 1)
+    if max_pending is None:
+        max_pending = 2 * max_workers
+    if chunker is None:
+        chunker = SemanticChunker()
+    if writer is None:
+        writer = ChunkWriter()
+    if text_layer:
+        report.text_layer = TextLayerReport()
+
+    ready = []
+
+    def flush():
+        blocks = []
+        for _, document in ready:
+            if deduplicator is not None:
+                # Near-duplicate blocks are marked or dropped before they are encoded
+                blocks.extend(deduplicator.skip_duplicate_blocks(document.blocks, document.doc_id))
+            else:
+                blocks.extend(document.blocks)
+        try:
+            block_chunks = chunker.chunk_blocks(blocks, similarity_threshold=similarity_threshold)
+        except Exception as error:
+            for file_path, document in ready:
+                report.failures[file_path] = repr(error)
+                if deduplicator is not None:
+                    deduplicator.discard(document.blocks, document.doc_id)
+            ready.clear()
+            return
+
+        for block, chunks in zip(blocks, block_chunks):
+            block.chunks = chunks
+        for file_path, document in ready:
+            try:
+                if deduplicator is not None:
+                    deduplicator.complete_blocks(document.blocks, document.doc_id)
+                    orphans = deduplicator.orphaned_blocks(document.blocks)
+                    if orphans:
+                        # Their original is in a document of this batch that failed to write
+                        deduplicator.chunk_blocks(chunker, orphans, document.doc_id,
+                                                  similarity_threshold=similarity_threshold)
+                    deduplicator.process(document)
+                writer.write(document, file_path)
+                report.documents += 1
+                report.chunks += len(document.get_all_chunks())
+            except Exception as error:
+                report.failures[file_path] = repr(error)
+                if deduplicator is not None:
+                    # Later duplicates must not point at a document that was never written
+                    deduplicator.discard(document.blocks, document.doc_id)
+        ready.clear()
+        print(report.progress())
+
+    # Spawn keeps torch state out of the workers; with the text layer, marker loads only if a page needs it
+    context = multiprocessing.get_context("spawn")
+
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                   initializer=None if text_layer else _init_convert_worker)
+
+    pool = new_pool()
+    queue = iter(pdfs)
+    pending = {}
+
+    def replace_pool(broken):
+        # A worker that dies (e.g. OOM-killed) breaks the whole pool; later files convert in a fresh one
+        nonlocal pool
+        if broken is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = new_pool()
+
+    def fill():
+        while len(pending) < max_pending:
+            file_path = next(queue, None)
+            if file_path is None:
+                return
+            try:
+                future = pool.submit(_convert_worker, file_path, text_layer)
+            except BrokenProcessPool:
+                replace_pool(pool)
+                future = pool.submit(_convert_worker, file_path, text_layer)
+            pending[future] = (file_path, pool)
+
+    try:
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path, owner = pending.pop(future)
+                try:
+                    markdown, page_count, stats = future.result()
+                    document = Document(markdown, doc_id=file_path.stem)
+                    document.create_blocks(min_words=block_min_words)
+                except BrokenProcessPool as error:
+                    # Every conversion in flight in the broken pool fails with it
+                    report.failures[file_path] = repr(error)
+                    replace_pool(owner)
+                    continue
+                except Exception as error:
+                    report.failures[file_path] = repr(error)
+                    continue
+                report.pages += page_count
+                if stats is not None:
+                    report.text_layer.merge(TextLayerReport.from_dict(stats))
+                ready.append((file_path, document))
+
+            if len(ready) >= chunk_batch_docs:
+                flush()
+            fill()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        # Documents converted before an unexpected error are still chunked and written
+        if ready:
+            flush()
+    return report
@@ -1,12 +1,12 @@
-import re
-
 import numpy as np
-from rich import print
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 
 from text_processing.doc_models.chunks import Chunk
 from text_processing.doc_models.documents import Document
+from text_processing.embedding_cache import CachedEncoder
+from text_processing.metrics import incr, span
+from text_processing.models import DEFAULT_MODEL_NAME, get_encoder
+from text_processing.quantization import check_dtype, dequantize, quantize
+from text_processing.sentences import extend_to_terminator, sentence_spans
 
 
 class SemanticChunker:
@@ -14,14 +14,35 @@ class SemanticChunker:
     A class to split blocks into semantic chunks and return Chunk objects.
     """
     
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
+    ENGINES = ('vectorized', 'legacy')
+    
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, batch_size=256, engine='vectorized', cache=None,
+                 model=None, embedding_dtype='float32', backend=None):
         """
         Initialize the semantic chunker.
         
         Args:
-            model_name (str): Name of the SentenceTransformer model to use
+            model_name (str): Name of the embedding model to use
+            batch_size (int): Number of sentences per encode batch
+            engine (str): Grouping engine, 'vectorized' or 'legacy'
+            cache (EmbeddingCache, optional): Persistent cache for sentence embeddings
+            model (optional): Already loaded encoder with an encode() method, used instead of model_name
+            embedding_dtype (str): Storage for sentence and chunk embeddings: 'float32', 'float16'
+                or 'int8' (scalar-quantized with a scale per vector)
+            backend (str, optional): Encoder backend from models.ENCODER_BACKENDS, e.g. 'fastembed'
+                (default: the TEXTRACT_ENCODER setting)
         """
-        self.model = SentenceTransformer(model_name)
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {self.ENGINES}")
+        self.model = model if model is not None else get_encoder(backend, model_name)
+        # Backends produce slightly different vectors, so caches and manifests key on the encoder's name
+        self.model_name = getattr(self.model, 'name', None) or model_name
+        if cache is not None:
+            self.model = CachedEncoder(self.model, self.model_name, cache)
+        self.cache = cache
+        self.batch_size = batch_size
+        self.engine = engine
+        self.embedding_dtype = check_dtype(embedding_dtype)
     
     def chunk_block(self, block, min_words=100, max_words=250, similarity_threshold=0.7):
         """
@@ -36,39 +57,309 @@ class SemanticChunker:
         Returns:
             List[Chunk]: List of Chunk objects
         """
-        # Split into sentences
-        sentences = self._split_into_sentences(block.text)
-        sentence_embeddings = self.model.encode(sentences)
+        # Split into sentence spans
+        spans = sentence_spans(block.text)
+        sentence_embeddings, scales = quantize(
+            self.encode_sentences([block.text[start:end] for start, end in spans]),
+            self.embedding_dtype
+        )
+        
+        return self.group_blocks(
+            [block], [spans], sentence_embeddings,
+            embedding_scales=scales,
+            min_words=min_words,
+            max_words=max_words,
+            similarity_threshold=similarity_threshold
+        )[0]
+    
+    def chunk_blocks(self, blocks, min_words=100, max_words=250, similarity_threshold=0.7):
+        """
+        Split several Block objects into semantic chunks with a single encode pass.
+        
+        Sentences from every block are encoded together in length-sorted
+        batches, then each block is grouped using its slice of the embeddings.
+        
+        Args:
+            blocks (List[Block]): Block objects to chunk
+            min_words (int): Minimum words per chunk
+            max_words (int): Maximum words per chunk
+            similarity_threshold (float): Similarity threshold for splitting
+            
+        Returns:
+            List[List[Chunk]]: Chunk lists, one per block in input order
+        """
+        block_spans, all_sentences = self.split_blocks(blocks)
+        # Hold the sentence embeddings of every block in the storage dtype while grouping
+        all_embeddings, scales = quantize(self.encode_sentences(all_sentences), self.embedding_dtype)
+        
+        return self.group_blocks(
+            blocks, block_spans, all_embeddings,
+            embedding_scales=scales,
+            min_words=min_words,
+            max_words=max_words,
+            similarity_threshold=similarity_threshold
+        )
+    
+    def split_blocks(self, blocks):
+        """
+        Split every block into sentences ahead of encoding.
+        
+        Args:
+            blocks (List[Block]): Block objects to split
+            
+        Returns:
+            Tuple[List[List[Tuple[int, int]]], List[str]]: Sentence spans per block, and all
+            sentence texts flattened
+        """
+        with span('split'):
+            block_spans = [sentence_spans(block.text) for block in blocks]
+            all_sentences = [
+                block.text[start:end]
+                for block, spans in zip(blocks, block_spans)
+                for start, end in spans
+            ]
+        incr('sentences', len(all_sentences))
+        return block_spans, all_sentences
+    
+    def group_blocks(self, blocks, block_spans, all_embeddings,
+                     min_words=100, max_words=250, similarity_threshold=0.7, embedding_scales=None,
+                     embedding_dtype=None):
+        """
+        Group pre-split, pre-encoded sentences of several blocks into chunks.
+        
+        Args:
+            blocks (List[Block]): Block objects being chunked
+            block_spans (List[List[Tuple[int, int]]]): Sentence spans per block from split_blocks()
+            all_embeddings (np.ndarray): Embeddings of the flattened sentences, in order, as
+                float32, float16 or int8 values
+            min_words (int): Minimum words per chunk
+            max_words (int): Maximum words per chunk
+            similarity_threshold (float): Similarity threshold for splitting
+            embedding_scales (np.ndarray, optional): Per-sentence scales for int8 embeddings
+            embedding_dtype (str, optional): Storage for the chunk embeddings (default: the chunker's)
+            
+        Returns:
+            List[List[Chunk]]: Chunk lists, one per block in input order
+        """
+        embedding_dtype = check_dtype(embedding_dtype or self.embedding_dtype)
+        results = []
+        offset = 0
+        with span('group'):
+            block_word_counts = self._count_words(blocks, block_spans)
+            for block, spans, word_counts in zip(blocks, block_spans, block_word_counts):
+                # Only one block's sentences are widened back to float32 at a time
+                embeddings = dequantize(
+                    all_embeddings[offset:offset + len(spans)],
+                    None if embedding_scales is None else embedding_scales[offset:offset + len(spans)]
+                )
+                offset += len(spans)
+                results.append(self._group_sentences(
+                    block, spans, embeddings, word_counts,
+                    min_words, max_words, similarity_threshold
+                ))
+            
+            chunk_spans = [[(chunk.start, chunk.end) for chunk in chunks] for chunks in results]
+            for chunks, word_counts in zip(results, self._count_words(blocks, chunk_spans)):
+                for chunk, word_count in zip(chunks, word_counts):
+                    chunk.word_count = word_count
+                    if embedding_dtype != 'float32':
+                        chunk.quantize_embedding(embedding_dtype)
+        incr('chunks', sum(len(chunks) for chunks in results))
+        return results
+    
+    @staticmethod
+    def _count_words(blocks, block_spans):
+        """Count the words of spans in many blocks, with one search per shared word index."""
+        groups = {}
+        for i, block in enumerate(blocks):
+            index = block.word_index
+            groups.setdefault(id(index), (index, []))[1].append(i)
+        
+        results = [[] for _ in blocks]
+        for index, members in groups.values():
+            flat = [
+                (start + blocks[i].word_offset, end + blocks[i].word_offset)
+                for i in members
+                for start, end in block_spans[i]
+            ]
+            if not flat:
+                continue
+            counts = index.counts(flat).tolist()
+            position = 0
+            for i in members:
+                results[i] = counts[position:position + len(block_spans[i])]
+                position += len(block_spans[i])
+        return results
+    
+    def chunk_document(self, document, min_words=100, max_words=250, similarity_threshold=0.7):
+        """
+        Chunk every block of a Document with a single encode pass.
+        
+        Blocks are created with their default settings if the document
+        has not been split yet. Each block keeps its own chunks.
+        
+        Args:
+            document (Document): Document to chunk
+            min_words (int): Minimum words per chunk
+            max_words (int): Maximum words per chunk
+            similarity_threshold (float): Similarity threshold for splitting
+            
+        Returns:
+            List[Chunk]: All chunks of the document in block order
+        """
+        blocks = document.blocks
+        if blocks is None:
+            blocks = document.create_blocks()
+        
+        block_chunks = self.chunk_blocks(
+            blocks,
+            min_words=min_words,
+            max_words=max_words,
+            similarity_threshold=similarity_threshold
+        )
+        for block, chunks in zip(blocks, block_chunks):
+            block.chunks = chunks
+        
+        return document.get_all_chunks()
+    
+    def encode_sentences(self, sentences):
+        """
+        Encode sentences in length-sorted batches.
+        
+        Args:
+            sentences (List[str]): Sentences to encode
+            
+        Returns:
+            np.ndarray: float32 matrix with one row per sentence, in input order
+        """
+        if not sentences:
+            return np.zeros((0, 0), dtype=np.float32)
+        
+        # Sorting by length keeps padding inside each batch to a minimum
+        order = sorted(range(len(sentences)), key=lambda i: len(sentences[i]), reverse=True)
+        with span('encode'):
+            sorted_embeddings = self.model.encode(
+                [sentences[i] for i in order],
+                batch_size=self.batch_size
+            )
+        incr('encode_calls')
+        incr('encode_batches', -(-len(sentences) // self.batch_size))
+        
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        return embeddings
+    
+    def _group_sentences(self, block, spans, sentence_embeddings, word_counts,
+                         min_words, max_words, similarity_threshold):
+        """Group consecutive sentence spans of a block into Chunk objects."""
+        if self.engine == 'legacy':
+            return self._group_sentences_legacy(
+                block, spans, sentence_embeddings, word_counts,
+                min_words, max_words, similarity_threshold
+            )
+        
+        if not spans:
+            return []
+        
+        embeddings = np.asarray(sentence_embeddings, dtype=np.float32)
+        starts = self._find_boundaries(embeddings, word_counts, min_words, max_words, similarity_threshold)
+        ends = starts[1:] + [len(spans)]
+        
+        chunks = []
+        for start, end in zip(starts, ends):
+            chunks.append(self._span_chunk(
+                block, spans, start, end, len(chunks),
+                embeddings[start:end].mean(axis=0)
+            ))
+        return chunks
+    
+    @staticmethod
+    def _span_chunk(block, spans, first, last, chunk_id, embedding):
+        """Create a chunk over sentences first..last-1 of a block, closing punctuation included."""
+        return Chunk.from_span(
+            block.text,
+            spans[first][0],
+            extend_to_terminator(block.text, spans[last - 1][1]),
+            chunk_id=chunk_id,
+            block_id=block.block_id,
+            embedding=embedding
+        )
+    
+    @staticmethod
+    def _find_boundaries(embeddings, word_counts, min_words, max_words, similarity_threshold):
+        """
+        Find the sentence indices at which new chunks start.
+        
+        Keeps a running sum of the current chunk's embeddings instead of
+        re-averaging, and compares pre-normalized sentence vectors against
+        the normalized centroid with a single dot product.
+        
+        Args:
+            embeddings (np.ndarray): float32 sentence embedding matrix
+            word_counts (List[int]): Word count of each sentence
+            min_words (int): Minimum words per chunk
+            max_words (int): Maximum words per chunk
+            similarity_threshold (float): Similarity threshold for splitting
+            
+        Returns:
+            List[int]: Start index of each chunk, always beginning with 0
+        """
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        unit_embeddings = embeddings / np.where(norms == 0, 1, norms)
+        
+        starts = [0]
+        centroid_sum = embeddings[0].copy()
+        current_word_count = word_counts[0]
+        
+        for i in range(1, len(word_counts)):
+            sentence_words = word_counts[i]
+            
+            if current_word_count < min_words:
+                split = False
+            elif current_word_count + sentence_words > max_words:
+                split = True
+            else:
+                # Cosine to the mean equals cosine to the sum, so no division by count
+                centroid_norm = np.linalg.norm(centroid_sum)
+                similarity = float(unit_embeddings[i] @ centroid_sum) / centroid_norm if centroid_norm else 0.0
+                split = similarity < similarity_threshold
+            
+            if split:
+                starts.append(i)
+                centroid_sum = embeddings[i].copy()
+                current_word_count = sentence_words
+            else:
+                centroid_sum += embeddings[i]
+                current_word_count += sentence_words
+        
+        return starts
+    
+    def _group_sentences_legacy(self, block, spans, sentence_embeddings, word_counts,
+                                min_words, max_words, similarity_threshold):
+        """Group sentences with the original per-sentence mean/cosine loop."""
+        from sklearn.metrics.pairwise import cosine_similarity
         
         chunks = []
-        current_sentences = []
+        current_first = 0
         current_embeddings = []
         current_word_count = 0
         
-        for i, sentence in enumerate(sentences):
-            sentence_words = len(sentence.split())
+        for i, sentence_words in enumerate(word_counts):
             proposed_word_count = current_word_count + sentence_words
             
             # If we're under minimum, must add
             if current_word_count < min_words:
-                current_sentences.append(sentence)
                 current_embeddings.append(sentence_embeddings[i])
                 current_word_count += sentence_words
             
             # If adding would exceed maximum, split now
             elif proposed_word_count > max_words:
                 # Save current chunk
-                chunk_text = ' '.join(current_sentences)
                 chunk_embedding = np.mean(current_embeddings, axis=0)
-                chunks.append(Chunk(
-                    text=chunk_text, 
-                    chunk_id=len(chunks),
-                    block_id=block.block_id,
-                    embedding=chunk_embedding
-                ))
+                chunks.append(self._span_chunk(block, spans, current_first, i, len(chunks), chunk_embedding))
                 
                 # Start new chunk with current sentence
-                current_sentences = [sentence]
+                current_first = i
                 current_embeddings = [sentence_embeddings[i]]
                 current_word_count = sentence_words
             
@@ -83,47 +374,30 @@ class SemanticChunker:
                 
                 if similarity >= similarity_threshold:
                     # Similar enough, add to current chunk
-                    current_sentences.append(sentence)
                     current_embeddings.append(sentence_embeddings[i])
                     current_word_count += sentence_words
                 else:
                     # Not similar, split here
-                    chunk_text = ' '.join(current_sentences)
                     chunk_embedding = np.mean(current_embeddings, axis=0)
-                    chunks.append(Chunk(
-                        text=chunk_text,
-                        chunk_id=len(chunks),
-                        block_id=block.block_id,
-                        embedding=chunk_embedding
-                    ))
+                    chunks.append(self._span_chunk(block, spans, current_first, i, len(chunks), chunk_embedding))
                     
                     # Start new chunk
-                    current_sentences = [sentence]
+                    current_first = i
                     current_embeddings = [sentence_embeddings[i]]
                     current_word_count = sentence_words
         
         # Add final chunk if it exists
-        if current_sentences:
-            chunk_text = ' '.join(current_sentences)
+        if current_embeddings:
             chunk_embedding = np.mean(current_embeddings, axis=0)
-            chunks.append(Chunk(
-                text=chunk_text,
-                chunk_id=len(chunks),
-                block_id=block.block_id,
-                embedding=chunk_embedding
-            ))
+            chunks.append(self._span_chunk(block, spans, current_first, len(spans), len(chunks), chunk_embedding))
         
         return chunks
-    
-    @staticmethod
-    def _split_into_sentences(text):
-        """Split text into sentences using regex."""
-        sentences = re.split(r'[.!?]+', text)
-        return [s.strip() for s in sentences if s.strip()]
 
 
 # Example usage:
 if __name__ == "__main__":
+    from rich import print
+    
     # Initialize chunker
     chunker = SemanticChunker()
     
@@ -0,0 +1,242 @@
+import errno
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from importlib import metadata as importlib_metadata
+
+
+def marker_version():
+    """Get the installed marker-pdf version, part of every cache key."""
+    try:
+        return importlib_metadata.version("marker-pdf")
+    except importlib_metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """Hash a file's content with SHA-256."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CachedRendering:
+    """
+    A marker rendering restored from the conversion cache.
+    """
+
+    def __init__(self, markdown, metadata=None, images=None):
+        """
+        Initialize a cached rendering.
+
+        Args:
+            markdown (str): Rendered markdown
+            metadata (dict, optional): marker metadata
+            images (dict, optional): Image name to PIL image
+        """
+        self.markdown = markdown
+        self.metadata = metadata or {}
+        self.images = images or {}
+
+    def __repr__(self):
+        return f"CachedRendering(chars={len(self.markdown)}, images={len(self.images)})"
+
+
+class ConversionCache:
+    """
+    A content-addressed on-disk cache of PDF to markdown conversions.
+    """
+
+    def __init__(self, root="data/cache/markdown", max_bytes=2 * 1024 ** 3, keep_images=False):
+        """
+        Initialize the conversion cache.
+
+        Args:
+            root (str): Directory to store cache entries in
+            max_bytes (int): Maximum total size of all entries before eviction
+            keep_images (bool): Also store rendered images alongside the markdown
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.keep_images = keep_images
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, file_path, config):
+        """
+        Build the cache key for a PDF and converter config.
+
+        Args:
+            file_path (str | Path): PDF path
+            config (dict): marker config used for the conversion
+
+        Returns:
+            str: Content hash followed by a hash of config and marker version
+        """
+        config_json = json.dumps(config, sort_keys=True, default=str)
+        settings = hashlib.sha256((config_json + marker_version()).encode()).hexdigest()
+        return f"{file_hash(file_path)}-{settings[:16]}"
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        """
+        Load a cached rendering.
+
+        Args:
+            key (str): Cache key from key()
+
+        Returns:
+            CachedRendering | None: The rendering, or None on a miss
+        """
+        entry = self._entry_dir(key)
+        markdown_path = os.path.join(entry, "output.md")
+        if not os.path.exists(markdown_path):
+            self.misses += 1
+            return None
+
+        try:
+            with open(markdown_path, encoding="utf-8") as f:
+                markdown = f.read()
+            with open(os.path.join(entry, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+
+            images = {}
+            image_dir = os.path.join(entry, "images")
+            if os.path.isdir(image_dir):
+                from PIL import Image
+
+                for name in meta.get("images", []):
+                    with Image.open(os.path.join(image_dir, name)) as image:
+                        images[name] = image.copy()
+
+            # Touch the entry so eviction is least-recently-used
+            os.utime(markdown_path)
+        except (OSError, ValueError):
+            # Another process evicted or replaced the entry while it was read
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return CachedRendering(markdown, meta.get("metadata"), images)
+
+    def put(self, key, rendered_file):
+        """
+        Store a rendering atomically and evict old entries if over the size limit.
+
+        Args:
+            key (str): Cache key from key()
+            rendered_file: marker output with markdown, metadata and images
+        """
+        images = getattr(rendered_file, "images", None) or {}
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+        try:
+            with open(os.path.join(tmp_dir, "output.md"), "w", encoding="utf-8") as f:
+                f.write(rendered_file.markdown)
+
+            image_names = []
+            if self.keep_images and images:
+                os.makedirs(os.path.join(tmp_dir, "images"))
+                for name, image in images.items():
+                    image.save(os.path.join(tmp_dir, "images", name))
+                    image_names.append(name)
+
+            meta = {
+                "metadata": getattr(rendered_file, "metadata", None) or {},
+                "images": image_names,
+                "marker_version": marker_version(),
+            }
+            with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, default=str)
+
+            with self._lock:
+                entry = self._entry_dir(key)
+                # The lock only covers this process; batch and ingest workers can store the same key at once
+                if os.path.exists(entry):
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                else:
+                    try:
+                        os.replace(tmp_dir, entry)
+                    except OSError as error:
+                        if error.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                            raise
+                        # Another process stored the same conversion first
+                        shutil.rmtree(tmp_dir, ignore_errors=True)
+                self._evict()
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            entry = os.path.join(self.root, name)
+            if name.startswith(".") or not os.path.isdir(entry):
+                continue
+            try:
+                size = sum(
+                    os.path.getsize(os.path.join(dirpath, filename))
+                    for dirpath, _, filenames in os.walk(entry)
+                    for filename in filenames
+                )
+                markdown_path = os.path.join(entry, "output.md")
+                last_used = os.path.getmtime(markdown_path) if os.path.exists(markdown_path) else 0
+            except OSError:
+                # Evicted by another process meanwhile
+                continue
+            entries.append((last_used, size, entry))
+            total += size
+
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def invalidate(self, file_path=None, key=None):
+        """
+        Remove cached conversions.
+
+        With no arguments the whole cache is cleared. Given a file, every
+        entry for its content is removed, whatever config produced it.
+
+        Args:
+            file_path (str | Path, optional): PDF whose entries to remove
+            key (str, optional): Explicit cache key to remove
+        """
+        with self._lock:
+            if key is not None:
+                shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+                return
+
+            prefix = f"{file_hash(file_path)}-" if file_path is not None else ""
+            for name in os.listdir(self.root):
+                if name.startswith(prefix):
+                    shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def __repr__(self):
+        return f"ConversionCache(root={self.root!r}, hits={self.hits}, misses={self.misses})"
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_conversion_cache():
+    """Get the process-wide ConversionCache."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ConversionCache()
+    return _default_cache
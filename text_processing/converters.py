@@ -0,0 +1,417 @@
+import math
+import multiprocessing
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from text_processing.conversion_cache import CachedRendering
+from text_processing.metrics import incr
+
+# Pages per range when one PDF is converted in parallel; ranges shrink so every worker gets one
+PAGES_PER_RANGE = 25
+MIN_PAGES_PER_RANGE = 4
+
+_HEADING_PATTERN = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t]*$', re.MULTILINE)
+
+
+class ConverterManager:
+    """
+    A long-lived owner of marker models that hands out reusable PdfConverters.
+    """
+
+    def __init__(self, artifact_dict=None):
+        """
+        Initialize the converter manager.
+
+        Args:
+            artifact_dict (dict, optional): Pre-loaded marker models; loaded lazily if omitted
+        """
+        self._artifact_dict = artifact_dict
+        self._converters = {}
+        self._lock = threading.Lock()
+
+    @property
+    def artifact_dict(self):
+        """Get the marker model dict, loading it on first use."""
+        if self._artifact_dict is None:
+            with self._lock:
+                if self._artifact_dict is None:
+                    # marker pulls in torch and the layout/OCR models, so import on demand
+                    from marker.models import create_model_dict
+
+                    self._artifact_dict = create_model_dict()
+        return self._artifact_dict
+
+    @staticmethod
+    def build_config(output_format="markdown", **options):
+        """
+        Build the marker config dict used for a conversion.
+
+        Args:
+            output_format (str): marker renderer output format
+            **options: Extra marker config options
+
+        Returns:
+            dict: marker config
+        """
+        config = {
+            "output_format": output_format,
+            "ADDITIONAL_KEY": "VALUE"
+        }
+        config.update(options)
+        return config
+
+    def get_converter(self, output_format="markdown", **options):
+        """
+        Get a PdfConverter for a config, reusing one built earlier if possible.
+
+        Args:
+            output_format (str): marker renderer output format
+            **options: Extra marker config options
+
+        Returns:
+            PdfConverter: Converter sharing this manager's models
+        """
+        config = self.build_config(output_format, **options)
+        key = tuple(sorted((k, repr(v)) for k, v in config.items()))
+
+        converter = self._converters.get(key)
+        if converter is None:
+            artifact_dict = self.artifact_dict
+            with self._lock:
+                converter = self._converters.get(key)
+                if converter is None:
+                    converter = self._build_converter(config, artifact_dict)
+                    self._converters[key] = converter
+        return converter
+
+    @staticmethod
+    def _build_converter(config, artifact_dict):
+        """Build a PdfConverter for a marker config."""
+        from marker.config.parser import ConfigParser
+        from marker.converters.pdf import PdfConverter
+
+        config_parser = ConfigParser(config)
+        return PdfConverter(
+            config=config_parser.generate_config_dict(),
+            artifact_dict=artifact_dict,
+            processor_list=config_parser.get_processors(),
+            renderer=config_parser.get_renderer(),
+            llm_service=config_parser.get_llm_service()
+        )
+
+    def warm_up(self, output_formats=("markdown",)):
+        """
+        Load the models and build converters ahead of the first conversion.
+
+        Args:
+            output_formats (Iterable[str]): Output formats to prepare converters for
+        """
+        for output_format in output_formats:
+            self.get_converter(output_format)
+
+    def convert(self, file_path, output_format="markdown", page_range=None, **options):
+        """
+        Convert a PDF with a shared converter.
+
+        Args:
+            file_path (str | Path): PDF to convert
+            output_format (str): marker renderer output format
+            page_range (Tuple[int, int], optional): Only convert pages start to end (0-based, end exclusive)
+            **options: Extra marker config options
+
+        Returns:
+            The marker rendered output
+        """
+        if page_range is None:
+            converter = self.get_converter(output_format, **options)
+        else:
+            # Ranges rarely repeat, so their converters are built per call instead of kept
+            start, end = page_range
+            config = self.build_config(output_format, page_range=f"{start}-{end - 1}", **options)
+            converter = self._build_converter(config, self.artifact_dict)
+        return converter(filepath=str(file_path))
+
+    def __repr__(self):
+        loaded = self._artifact_dict is not None
+        return f"ConverterManager(models_loaded={loaded}, converters={len(self._converters)})"
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_converter_manager():
+    """Get the process-wide ConverterManager."""
+    global _default_manager
+    if _default_manager is None:
+        with _default_manager_lock:
+            if _default_manager is None:
+                _default_manager = ConverterManager()
+    return _default_manager
+
+
+def pdf_page_count(file_path):
+    """Get the number of pages in a PDF without converting it."""
+    from pypdf import PdfReader
+
+    return len(PdfReader(str(file_path)).pages)
+
+
+def split_page_ranges(page_count, max_workers, pages_per_range=PAGES_PER_RANGE):
+    """
+    Split a document's pages into contiguous ranges for parallel conversion.
+
+    Args:
+        page_count (int): Number of pages
+        max_workers (int): Number of conversion processes
+        pages_per_range (int): Largest range size
+
+    Returns:
+        List[Tuple[int, int]]: (start, end) page ranges, end exclusive, in page order
+    """
+    size = max(MIN_PAGES_PER_RANGE, min(pages_per_range, math.ceil(page_count / max(max_workers, 1))))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _init_range_worker():
+    """Load marker models once in each page-range worker."""
+    get_converter_manager().warm_up()
+
+
+def _convert_range(file_path, page_range, output_format="markdown"):
+    """Convert one page range in a worker process and return its markdown, metadata and images."""
+    rendered_file = get_converter_manager().convert(file_path, output_format, page_range=page_range)
+    return (
+        rendered_file.markdown,
+        dict(getattr(rendered_file, "metadata", None) or {}),
+        dict(getattr(rendered_file, "images", None) or {}),
+    )
+
+
+def merge_metadata(metadata, range_metadata):
+    """Merge the marker metadata of one page range into the document's metadata."""
+    # Page-level lists (page_stats, table_of_contents) keep their original page ids
+    for key, value in range_metadata.items():
+        if isinstance(value, list):
+            metadata.setdefault(key, []).extend(value)
+        else:
+            metadata.setdefault(key, value)
+
+
+def _continues_paragraph(previous, text):
+    """Whether text starts mid-sentence, continuing the last paragraph of previous across a page break."""
+    last_line = previous.rsplit("\n", 1)[-1]
+    if not last_line or last_line[0] in "#|>!-*`" or last_line[-1] in ".!?:;)]\"'`|*":
+        return False
+    return text[0].islower()
+
+
+def _heading_key(title):
+    """Normalize a heading title for matching across ranges."""
+    return " ".join(title.strip("#*_ \t").lower().split())
+
+
+def split_options(max_workers, pages_per_range=PAGES_PER_RANGE):
+    """Get the conversion cache options of a page-range conversion, so it never swaps with a single pass."""
+    return {"page_ranges": {"workers": max_workers, "pages_per_range": pages_per_range}}
+
+
+class MarkdownStitcher:
+    """
+    Joins the markdown of consecutive page ranges into one document.
+
+    Ranges are separated by a blank line, except where a paragraph was
+    cut by the range boundary, which is rejoined with a space. The
+    character span of every range is recorded so positions in the
+    stitched markdown map back to pages.
+
+    marker picks heading levels per conversion, so the same heading can
+    get a different level in another range. A range's levels are shifted
+    by the most common difference between them and the levels the same
+    heading texts had earlier; a range sharing no heading text with the
+    ones before keeps marker's levels. A heading that opens a range and
+    repeats the last heading before it (a section continued across the
+    boundary) is dropped.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.ranges = []
+        self.length = 0
+        self._previous = ""
+        self._levels = {}
+        self._last_heading = None
+
+    def _continue_headings(self, text):
+        """Align a range's heading levels with earlier ranges and drop a repeated opening heading."""
+        matches = list(_HEADING_PATTERN.finditer(text))
+        if not matches:
+            return text
+        shifts = Counter(
+            self._levels[key] - len(match.group(1))
+            for match in matches
+            if (key := _heading_key(match.group(2))) in self._levels
+        )
+        shift = shifts.most_common(1)[0][0] if shifts else 0
+        repeated = matches[0].start() == 0 and _heading_key(matches[0].group(2)) == self._last_heading
+        if shift:
+            incr('stitched_heading_shifts')
+        if repeated:
+            incr('stitched_repeated_headings')
+
+        def replace(match):
+            if repeated and match.start() == 0:
+                return ""
+            return "#" * min(max(len(match.group(1)) + shift, 1), 6) + " " + match.group(2)
+
+        return _HEADING_PATTERN.sub(replace, text).strip()
+
+    def _remember_headings(self, text):
+        for match in _HEADING_PATTERN.finditer(text):
+            key = _heading_key(match.group(2))
+            self._levels.setdefault(key, len(match.group(1)))
+            self._last_heading = key
+
+    def add(self, markdown, page_range):
+        """
+        Append the markdown of the next page range.
+
+        Args:
+            markdown (str): Markdown of the range
+            page_range (Tuple[int, int]): (start, end) pages of the range
+
+        Returns:
+            str: Text appended to the stitched markdown, including its separator
+        """
+        text = self._continue_headings(markdown.strip())
+        self._remember_headings(text)
+        separator = ""
+        if text and self._previous:
+            separator = " " if _continues_paragraph(self._previous, text) else "\n\n"
+        piece = separator + text if text else ""
+        self.parts.append(piece)
+        self.ranges.append({
+            "pages": list(page_range),
+            "char_start": self.length + len(separator),
+            "char_end": self.length + len(piece),
+        })
+        self.length += len(piece)
+        if text:
+            self._previous = text
+        return piece
+
+    @property
+    def markdown(self):
+        """Get the stitched markdown so far."""
+        return "".join(self.parts)
+
+
+class ParallelConversion:
+    """
+    Converts one PDF as page ranges in parallel worker processes.
+
+    Ranges are released in page order as soon as a range and every range
+    before it have finished, so the start of a long document can be split
+    into blocks and chunked while later pages are still converting.
+    """
+
+    def __init__(self, file_path, max_workers=None, pages_per_range=PAGES_PER_RANGE, output_format="markdown",
+                 manager=None):
+        """
+        Initialize the conversion.
+
+        Args:
+            file_path (str | Path): PDF to convert
+            max_workers (int, optional): Conversion processes (default: CPU count)
+            pages_per_range (int): Largest page range per task
+            output_format (str): marker renderer output format; only markdown can be stitched
+            manager (ConverterManager, optional): Manager used when the PDF is too short to split
+        """
+        if output_format != "markdown":
+            raise ValueError("Only markdown output can be converted as page ranges")
+        self.file_path = file_path
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.pages_per_range = pages_per_range
+        self.output_format = output_format
+        self.manager = manager
+        self.rendering = None
+
+    def iter_ranges(self):
+        """
+        Convert the page ranges and yield them in page order.
+
+        Yields:
+            Tuple[Tuple[int, int], str, dict, dict]: Page range, markdown, metadata and images
+        """
+        ranges = split_page_ranges(pdf_page_count(self.file_path), self.max_workers, self.pages_per_range)
+        if len(ranges) <= 1 or self.max_workers <= 1:
+            rendered_file = (self.manager or get_converter_manager()).convert(self.file_path, self.output_format)
+            yield (0, ranges[-1][1] if ranges else 0), rendered_file.markdown, \
+                dict(getattr(rendered_file, "metadata", None) or {}), dict(getattr(rendered_file, "images", None) or {})
+            return
+
+        incr("page_ranges", len(ranges))
+        # Spawn keeps torch state out of the workers
+        context = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=min(self.max_workers, len(ranges)), mp_context=context,
+                                   initializer=_init_range_worker)
+        try:
+            futures = [pool.submit(_convert_range, str(self.file_path), page_range, self.output_format)
+                       for page_range in ranges]
+            for page_range, future in zip(ranges, futures):
+                yield (page_range, *future.result())
+        finally:
+            # Also runs if the consumer stops early or a range fails: drop queued ranges
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def iter_markdown(self):
+        """
+        Yield the stitched markdown piece by piece as ranges finish.
+
+        When the last piece has been yielded, rendering holds the complete result.
+
+        Yields:
+            str: Text to append to the markdown so far
+        """
+        stitcher = MarkdownStitcher()
+        metadata = {}
+        images = {}
+        for page_range, markdown, range_metadata, range_images in self.iter_ranges():
+            yield stitcher.add(markdown, page_range)
+            merge_metadata(metadata, range_metadata)
+            images.update(range_images)
+        metadata["page_ranges"] = stitcher.ranges
+        self.rendering = CachedRendering(stitcher.markdown, metadata, images)
+
+    def iter_lines(self):
+        """
+        Yield complete lines of the stitched markdown as ranges finish.
+
+        The lines are the stitched markdown split on newlines, so offsets
+        computed while streaming match the final markdown.
+
+        Yields:
+            str: Lines without their newline
+        """
+        buffer = ""
+        for piece in self.iter_markdown():
+            lines = (buffer + piece).split("\n")
+            buffer = lines.pop()
+            yield from lines
+        yield buffer
+
+    def run(self):
+        """
+        Convert the whole PDF.
+
+        Returns:
+            CachedRendering: Stitched markdown, merged metadata (with page_ranges) and images
+        """
+        for _ in self.iter_markdown():
+            pass
+        return self.rendering
+
+    def __repr__(self):
+        return f"ParallelConversion(file_path={self.file_path}, max_workers={self.max_workers})"
@@ -0,0 +1,504 @@
+import re
+import time
+import zlib
+
+import numpy as np
+
+from text_processing.doc_models.chunks import Chunk
+from text_processing.metrics import incr, span
+from text_processing.sentences import sentence_spans
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+def shingles(text, size=5):
+    """
+    Get the set of hashed word shingles of a text.
+
+    Args:
+        text (str): Text to shingle
+        size (int): Words per shingle
+
+    Returns:
+        np.ndarray: Unique 32-bit shingle hashes as uint64
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint64, count=len(grams)))
+
+
+def _lsh_bands(threshold, num_perm):
+    """Pick (bands, rows) with bands * rows <= num_perm whose S-curve midpoint is closest to threshold."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles, computed with vectorized universal hashing.
+    """
+
+    def __init__(self, num_perm=128, shingle_size=5, seed=1):
+        """
+        Initialize the hasher.
+
+        Args:
+            num_perm (int): Number of hash permutations (signature length)
+            shingle_size (int): Words per shingle
+            seed (int): Seed for the permutation parameters
+        """
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # a, b < 2^32 and shingle hashes < 2^32 keep a * h + b inside uint64
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        """
+        Get the MinHash signature of a text.
+
+        Args:
+            text (str): Text to sign
+
+        Returns:
+            np.ndarray: (num_perm,) uint64 signature; all max values for empty text
+        """
+        hashes = shingles(text, self.shingle_size)
+        if hashes.size == 0:
+            return np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        return ((np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME).min(axis=0)
+
+    @staticmethod
+    def jaccard(signature, other):
+        """Estimate the Jaccard similarity of two texts from their signatures."""
+        return float(np.mean(signature == other))
+
+
+class DedupReport:
+    """
+    Counters for a deduplication run.
+    """
+
+    def __init__(self):
+        self.blocks = 0
+        self.block_words = 0
+        self.duplicate_blocks = 0
+        self.skipped_words = 0
+        self.skipped_sentences = 0
+        self.chunks = 0
+        self.words = 0
+        self.duplicates = 0
+        self.duplicate_words = 0
+        self.seconds = 0.0
+
+    @property
+    def skipped_fraction(self):
+        """Get the fraction of block words that were never encoded because their block was a duplicate."""
+        return self.skipped_words / self.block_words if self.block_words else 0.0
+
+    @property
+    def saved_fraction(self):
+        """Get the fraction of chunk words that were duplicates."""
+        return self.duplicate_words / self.words if self.words else 0.0
+
+    def as_dict(self):
+        return {
+            "blocks": self.blocks,
+            "block_words": self.block_words,
+            "duplicate_blocks": self.duplicate_blocks,
+            "skipped_words": self.skipped_words,
+            "skipped_sentences": self.skipped_sentences,
+            "skipped_fraction": self.skipped_fraction,
+            "chunks": self.chunks,
+            "words": self.words,
+            "duplicates": self.duplicates,
+            "duplicate_words": self.duplicate_words,
+            "saved_fraction": self.saved_fraction,
+            "seconds": self.seconds,
+        }
+
+    def __str__(self):
+        return (f"Dedup: {self.duplicate_blocks}/{self.blocks} blocks were near duplicates and skipped before "
+                f"encoding ({self.skipped_sentences} sentences, {self.skipped_words}/{self.block_words} words, "
+                f"{self.skipped_fraction:.1%} of the encode work); {self.duplicates}/{self.chunks} remaining chunks "
+                f"were near duplicates, {self.duplicate_words}/{self.words} words ({self.saved_fraction:.1%}) "
+                f"in {self.seconds:.2f}s")
+
+
+class _LshIndex:
+    """Signatures bucketed by band, so lookups only compare bucket collisions."""
+
+    def __init__(self, hasher, bands, rows, threshold):
+        self.hasher = hasher
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        self.buckets = [{} for _ in range(bands)]
+        self.keys = []
+        self.signatures = []
+        self.removed = 0
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def find(self, signature):
+        """Get the position of a stored signature the given one nearly duplicates, or None."""
+        checked = set()
+        for band, key in zip(self.buckets, self._band_keys(signature)):
+            for candidate in band.get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if self.hasher.jaccard(signature, self.signatures[candidate]) >= self.threshold:
+                    return candidate
+        return None
+
+    def add(self, signature, key):
+        """Store a signature under a key and return its position."""
+        position = len(self.keys)
+        self.keys.append(key)
+        self.signatures.append(signature)
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            band.setdefault(band_key, []).append(position)
+        return position
+
+    def discard(self, doc_id):
+        """Forget every signature stored under a key of the document and return their positions."""
+        positions = [position for position, key in enumerate(self.keys) if key is not None and key[0] == doc_id]
+        for position in positions:
+            for band, band_key in zip(self.buckets, self._band_keys(self.signatures[position])):
+                band[band_key].remove(position)
+                if not band[band_key]:
+                    del band[band_key]
+            self.keys[position] = None
+            self.signatures[position] = None
+        self.removed += len(positions)
+        return positions
+
+    def __len__(self):
+        return len(self.keys) - self.removed
+
+
+class Deduplicator:
+    """
+    A corpus-wide near-duplicate detector using MinHash and LSH.
+
+    Each signature is split into bands and bucketed, so only texts
+    sharing a bucket are compared and a corpus is processed in roughly
+    linear time. The first occurrence of a text is kept.
+
+    Blocks are checked before encoding (skip_duplicate_blocks), so
+    repeated boilerplate sections are never encoded: dropped blocks get
+    no chunks, and marked blocks become one chunk pointing at the
+    original block and reusing its mean chunk embedding. Chunks of the
+    remaining blocks can then be checked after chunking (process). One
+    instance remembers everything it has seen, so reuse it across
+    documents to deduplicate a whole corpus.
+    """
+
+    MODES = ('mark', 'drop')
+
+    def __init__(self, threshold=0.85, num_perm=128, shingle_size=5, mode='mark', seed=1):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            threshold (float): Estimated Jaccard similarity at which chunks count as duplicates
+            num_perm (int): MinHash signature length
+            shingle_size (int): Words per shingle
+            mode (str): 'mark' to set chunk.duplicate_of, 'drop' to remove duplicates from blocks
+            seed (int): Seed for the MinHash permutations
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown dedup mode '{mode}', expected one of {self.MODES}")
+        self.threshold = threshold
+        self.mode = mode
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size, seed=seed)
+        self.bands, self.rows = _lsh_bands(threshold, num_perm)
+        self.report = DedupReport()
+        self._chunks = _LshIndex(self.hasher, self.bands, self.rows, threshold)
+        self._blocks = _LshIndex(self.hasher, self.bands, self.rows, threshold)
+        # Mean chunk embedding (float16) of each kept block, by position, for marked duplicates
+        self._block_vectors = {}
+        # Position of each block (or of its original) until complete_blocks() sees it chunked
+        self._pending_blocks = {}
+        # Documents forgotten by discard() because they failed before being written
+        self._discarded = set()
+
+    def find(self, signature):
+        """
+        Find an already seen chunk that the signature nearly duplicates.
+
+        Args:
+            signature (np.ndarray): MinHash signature
+
+        Returns:
+            Tuple[str, int, int] | None: (doc_id, block_id, chunk_id) of the original, or None
+        """
+        position = self._chunks.find(signature)
+        return self._chunks.keys[position] if position is not None else None
+
+    def add(self, signature, key):
+        """Remember a kept chunk's signature under its (doc_id, block_id, chunk_id) key."""
+        self._chunks.add(signature, key)
+
+    def skip_duplicate_blocks(self, blocks, doc_id=None):
+        """
+        Find blocks that nearly duplicate a block seen before, ahead of encoding.
+
+        Duplicates get duplicate_of set to the (doc_id, block_id) of the
+        original and empty chunks; call complete_blocks() once the other
+        blocks are chunked to give marked duplicates their chunk.
+
+        Args:
+            blocks (List[Block]): Blocks about to be chunked
+            doc_id (str, optional): ID of the document the blocks belong to
+
+        Returns:
+            List[Block]: Blocks that still need chunking, in input order
+        """
+        start = time.perf_counter()
+        pending = []
+        skipped = 0
+        # A retried document counts as an original again
+        self._discarded.discard(doc_id)
+        with span('dedup'):
+            for block in blocks:
+                words = block.word_count
+                self.report.blocks += 1
+                self.report.block_words += words
+
+                signature = self.hasher.signature(block.text)
+                position = self._blocks.find(signature)
+                if position is None:
+                    self._pending_blocks[block] = self._blocks.add(signature, (doc_id, block.block_id))
+                    block.duplicate_of = None
+                    pending.append(block)
+                    continue
+
+                self._pending_blocks[block] = position
+                skipped += 1
+                self.report.duplicate_blocks += 1
+                self.report.skipped_words += words
+                self.report.skipped_sentences += len(sentence_spans(block.text))
+                block.duplicate_of = self._blocks.keys[position]
+                block.chunks = []
+        self.report.seconds += time.perf_counter() - start
+        incr('dedup_skipped_blocks', skipped)
+        return pending
+
+    def complete_blocks(self, blocks, doc_id=None):
+        """
+        Finish a chunking pass started with skip_duplicate_blocks().
+
+        Kept blocks remember their mean chunk embedding. In 'mark' mode
+        each duplicate block becomes a single chunk with duplicate_of set
+        and the original block's embedding, so it is exported without
+        being encoded; in 'drop' mode it keeps no chunks.
+
+        Args:
+            blocks (List[Block]): Blocks passed to skip_duplicate_blocks(), now chunked
+            doc_id (str, optional): ID of the document the blocks belong to
+        """
+        for block in blocks:
+            position = self._pending_blocks.pop(block, None)
+            if position is None or self.mode == 'drop':
+                continue
+            if block.duplicate_of is None:
+                if block.chunks:
+                    vectors = np.stack([chunk.get_embedding() for chunk in block.chunks])
+                    self._block_vectors[position] = vectors.mean(axis=0).astype(np.float16)
+                continue
+
+            vector = self._block_vectors.get(position)
+            if vector is None:
+                # The original has no chunks (e.g. no sentences), so neither does the duplicate
+                continue
+            chunk = Chunk.from_span(block.text, 0, len(block.text), chunk_id=0, block_id=block.block_id,
+                                    embedding=vector)
+            chunk.word_count = block.word_count
+            chunk.duplicate_of = block.duplicate_of
+            block.chunks = [chunk]
+
+    def discard(self, blocks, doc_id=None):
+        """
+        Forget a document that failed before it was written.
+
+        Its blocks and chunks no longer count as originals, so a later
+        near duplicate of them is chunked and written instead of pointing
+        at a document that does not exist.
+
+        Args:
+            blocks (List[Block]): Blocks of the document, chunked or not
+            doc_id (str, optional): ID of the document the blocks belong to
+        """
+        for block in blocks:
+            self._pending_blocks.pop(block, None)
+        for position in self._blocks.discard(doc_id):
+            self._block_vectors.pop(position, None)
+        self._chunks.discard(doc_id)
+        self._discarded.add(doc_id)
+
+    def orphaned_blocks(self, blocks):
+        """
+        Find duplicate blocks whose original belongs to a discarded document.
+
+        They were skipped before encoding, so pass them to chunk_blocks()
+        again to chunk them as originals (or as duplicates of another kept
+        block).
+
+        Args:
+            blocks (List[Block]): Blocks passed to skip_duplicate_blocks()
+
+        Returns:
+            List[Block]: The orphaned blocks, no longer counted as duplicates
+        """
+        orphans = [block for block in blocks
+                   if block.duplicate_of is not None and block.duplicate_of[0] in self._discarded]
+        for block in orphans:
+            # chunk_blocks() counts them again
+            self.report.blocks -= 1
+            self.report.block_words -= block.word_count
+            self.report.duplicate_blocks -= 1
+            self.report.skipped_words -= block.word_count
+            self.report.skipped_sentences -= len(sentence_spans(block.text))
+            self._pending_blocks.pop(block, None)
+            block.duplicate_of = None
+        return orphans
+
+    def chunk_blocks(self, chunker, blocks, doc_id=None, **settings):
+        """
+        Chunk blocks, skipping the encoding of near-duplicate blocks.
+
+        Args:
+            chunker (SemanticChunker): Chunker for the blocks that are kept
+            blocks (List[Block]): Blocks to chunk
+            doc_id (str, optional): ID of the document the blocks belong to
+            **settings: min_words, max_words and similarity_threshold for the chunker
+
+        Returns:
+            List[List[Chunk]]: Chunk lists, one per block in input order
+        """
+        pending = self.skip_duplicate_blocks(blocks, doc_id)
+        try:
+            block_chunks = chunker.chunk_blocks(pending, **settings) if pending else []
+        except Exception:
+            self.discard(blocks, doc_id)
+            raise
+        for block, chunks in zip(pending, block_chunks):
+            block.chunks = chunks
+        self.complete_blocks(blocks, doc_id)
+        return [block.chunks for block in blocks]
+
+    def process_blocks(self, blocks, doc_id=None):
+        """
+        Deduplicate the chunks of chunked blocks in place.
+
+        Args:
+            blocks (List[Block]): Blocks whose chunks have been created
+            doc_id (str, optional): ID of the document the blocks belong to
+
+        Returns:
+            int: Number of duplicate chunks found
+        """
+        start = time.perf_counter()
+        found = 0
+        with span('dedup'):
+            for block in blocks:
+                if not block.chunks or block.duplicate_of is not None:
+                    # Duplicate blocks were already handled before encoding
+                    continue
+                kept = []
+                for chunk in block.chunks:
+                    words = chunk.word_count
+                    self.report.chunks += 1
+                    self.report.words += words
+
+                    signature = self.hasher.signature(chunk.text)
+                    original = self.find(signature)
+                    if original is None:
+                        self.add(signature, (doc_id, block.block_id, chunk.chunk_id))
+                        kept.append(chunk)
+                        continue
+
+                    found += 1
+                    self.report.duplicates += 1
+                    self.report.duplicate_words += words
+                    if self.mode == 'mark':
+                        chunk.duplicate_of = original
+                        kept.append(chunk)
+                if self.mode == 'drop':
+                    block.chunks = kept
+        self.report.seconds += time.perf_counter() - start
+        incr('dedup_duplicates', found)
+        return found
+
+    def process(self, document):
+        """
+        Deduplicate a chunked Document in place against everything seen so far.
+
+        Args:
+            document (Document): Document whose blocks have been chunked
+
+        Returns:
+            int: Number of duplicate chunks found
+        """
+        return self.process_blocks(document.blocks or [], doc_id=document.doc_id)
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def __repr__(self):
+        return (f"Deduplicator(threshold={self.threshold}, mode='{self.mode}', bands={self.bands}, "
+                f"rows={self.rows}, seen_blocks={len(self._blocks)}, seen_chunks={len(self._chunks)})")
+
+
+class DedupChunker:
+    """
+    A chunker front that skips near-duplicate blocks before they are encoded.
+
+    Pass it wherever a SemanticChunker is expected for one document, e.g.
+    to Document.iter_chunks() or rechunk_document(); other attributes
+    are those of the wrapped chunker.
+    """
+
+    def __init__(self, chunker, deduplicator, doc_id=None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            chunker (SemanticChunker): Chunker for the blocks that are kept
+            deduplicator (Deduplicator): Corpus-wide deduplicator
+            doc_id (str, optional): ID of the document being chunked
+        """
+        self.chunker = chunker
+        self.deduplicator = deduplicator
+        self.doc_id = doc_id
+
+    def chunk_blocks(self, blocks, **settings):
+        """Chunk blocks like SemanticChunker.chunk_blocks(), without encoding duplicate blocks."""
+        return self.deduplicator.chunk_blocks(self.chunker, blocks, self.doc_id, **settings)
+
+    def chunk_document(self, document, min_words=100, max_words=250, similarity_threshold=0.7):
+        """Chunk every block of a Document like SemanticChunker.chunk_document(), without encoding duplicates."""
+        blocks = document.blocks
+        if blocks is None:
+            blocks = document.create_blocks()
+        self.chunk_blocks(blocks, min_words=min_words, max_words=max_words, similarity_threshold=similarity_threshold)
+        return document.get_all_chunks()
+
+    def __getattr__(self, name):
+        return getattr(self.chunker, name)
+
+    def __repr__(self):
+        return f"DedupChunker({self.chunker!r}, {self.deduplicator!r})"
@@ -1,4 +1,8 @@
 
+import hashlib
+
+from text_processing.metrics import span
+from text_processing.words import WordIndex
 
 
 class Block:
@@ -6,7 +10,10 @@ class Block:
     A block object representing a larger text section that can be split into chunks.
     """
     
-    def __init__(self, text, block_id=None, start_header=None, end_header=None):
+    __slots__ = ('text', 'block_id', 'start_header', 'end_header', '_chunks', '_word_count', 'start',
+                 '_word_index', '_word_offset', '_content_hash', 'duplicate_of')
+    
+    def __init__(self, text, block_id=None, start_header=None, end_header=None, start=None, word_index=None):
         """
         Initialize a Block object.
         
@@ -15,6 +22,8 @@ class Block:
             block_id (int, optional): Unique identifier for the block
             start_header (str, optional): Starting header that defines this block
             end_header (str, optional): Ending header that defines this block
+            start (int, optional): Character offset of the block text in the document markdown
+            word_index (WordIndex, optional): Word index of the document markdown, used with start
         """
         self.text = text
         self.block_id = block_id
@@ -22,12 +31,58 @@ class Block:
         self.end_header = end_header
         self._chunks = None
         self._word_count = None
+        self.start = start
+        self._content_hash = None
+        self.duplicate_of = None
+        # Share the document's index when the block's position in it is known
+        if word_index is not None and start is not None:
+            self._word_index = word_index
+            self._word_offset = start
+        else:
+            self._word_index = None
+            self._word_offset = 0
+    
+    @property
+    def content_hash(self):
+        """Get a hash of the block text, used to recognize unchanged blocks across document versions."""
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha1(self.text.encode('utf-8')).hexdigest()
+        return self._content_hash
+    
+    @property
+    def word_index(self):
+        """Get the word index covering this block, building one for the block text if needed."""
+        if self._word_index is None:
+            self._word_index = WordIndex(self.text)
+            self._word_offset = 0
+        return self._word_index
+    
+    @property
+    def word_offset(self):
+        """Get the offset of the block text within its word index."""
+        # An index built for the block text alone starts at the block
+        return self._word_offset if self._word_index is not None else 0
+    
+    def count_words(self, start=0, end=None):
+        """
+        Count the words in a span of the block text without re-tokenizing it.
+        
+        Args:
+            start (int): Start offset in the block text
+            end (int, optional): End offset in the block text (default: end of block)
+            
+        Returns:
+            int: Same as len(block.text[start:end].split())
+        """
+        if end is None:
+            end = len(self.text)
+        return self.word_index.count(self._word_offset + start, self._word_offset + end)
     
     @property
     def word_count(self):
         """Get the word count of the block."""
         if self._word_count is None:
-            self._word_count = len(self.text.split())
+            self._word_count = self.count_words()
         return self._word_count
     
     def create_chunks(self, chunker, min_words=100, max_words=250, similarity_threshold=0.7):
@@ -43,12 +98,13 @@ class Block:
         Returns:
             List[Chunk]: List of Chunk objects
         """
-        self._chunks = chunker.chunk_block(
-            self, 
-            min_words=min_words, 
-            max_words=max_words, 
-            similarity_threshold=similarity_threshold
-        )
+        with span('block_chunks'):
+            self._chunks = chunker.chunk_blocks(
+                [self], 
+                min_words=min_words, 
+                max_words=max_words, 
+                similarity_threshold=similarity_threshold
+            )[0]
         return self._chunks
     
     @property
@@ -56,6 +112,11 @@ class Block:
         """Get the chunks for this block (if they've been created)."""
         return self._chunks
     
+    @chunks.setter
+    def chunks(self, chunks):
+        """Set the chunks for this block (e.g. from a document-wide chunking pass)."""
+        self._chunks = chunks
+    
 
     def preview(self, max_chars=200):
         """
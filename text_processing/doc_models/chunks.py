@@ -1,14 +1,22 @@
-import re
+import numpy as np
 
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from text_processing.models import get_encoder
+from text_processing.quantization import dequantize, quantize
+from text_processing.sentences import split_sentences
 
 
 class Chunk:
     """
     A chunk object representing a semantically consistent sub text block.
+    
+    A chunk either owns its text and embedding, is a (start, end) span
+    into its parent block's text, or is a lightweight view onto one row
+    of a ChunkStore.
     """
     
+    __slots__ = ('_text', 'chunk_id', 'block_id', '_embedding', '_word_count', '_sentences', '_store', '_row',
+                 'duplicate_of', '_source', 'start', 'end', '_embedding_scale')
+    
     def __init__(self, text, chunk_id=None, block_id=None, embedding=None):
         """
         Initialize a Chunk object.
@@ -19,25 +27,87 @@ class Chunk:
             block_id (int, optional): ID of the parent block
             embedding (np.array, optional): Pre-computed embedding for the chunk
         """
-        self.text = text
+        self._text = text
         self.chunk_id = chunk_id
         self.block_id = block_id
         self._embedding = embedding
         self._word_count = None
         self._sentences = None
+        self._store = None
+        self._row = None
+        self.duplicate_of = None
+        self._source = None
+        self.start = None
+        self.end = None
+        self._embedding_scale = None
+    
+    @classmethod
+    def from_span(cls, source, start, end, chunk_id=None, block_id=None, embedding=None):
+        """
+        Create a chunk that references a span of its parent text instead of copying it.
+        
+        Args:
+            source (str): Parent text, usually the block text
+            start (int): Start offset of the chunk in source
+            end (int): End offset of the chunk in source
+            chunk_id (int, optional): Unique identifier for the chunk within its block
+            block_id (int, optional): ID of the parent block
+            embedding (np.array, optional): Pre-computed embedding for the chunk
+            
+        Returns:
+            Chunk: A chunk whose text is sliced from source on access
+        """
+        chunk = cls(None, chunk_id=chunk_id, block_id=block_id, embedding=embedding)
+        chunk._source = source
+        chunk.start = start
+        chunk.end = end
+        return chunk
+    
+    @classmethod
+    def from_store(cls, store, row):
+        """
+        Create a chunk that reads its text, embedding and word count from a ChunkStore.
+        
+        Args:
+            store (ChunkStore): Store holding the chunk data
+            row (int): Row of the chunk in the store
+            
+        Returns:
+            Chunk: A view onto the store row
+        """
+        chunk = cls(None, chunk_id=int(store.chunk_ids[row]), block_id=int(store.block_ids[row]))
+        chunk._store = store
+        chunk._row = row
+        return chunk
+    
+    @property
+    def text(self):
+        """Get the text content of the chunk."""
+        if self._store is not None:
+            return self._store.text(self._row)
+        if self._source is not None:
+            return self._source[self.start:self.end]
+        return self._text
     
     @property
     def word_count(self):
         """Get the word count of the chunk."""
         if self._word_count is None:
+            if self._store is not None:
+                return int(self._store.word_counts[self._row])
             self._word_count = len(self.text.split())
         return self._word_count
     
+    @word_count.setter
+    def word_count(self, word_count):
+        """Set a pre-computed word count (e.g. from the block's word index)."""
+        self._word_count = word_count
+    
     @property
     def sentences(self):
         """Get the sentences in the chunk."""
         if self._sentences is None:
-            self._sentences = self._split_into_sentences(self.text)
+            self._sentences = split_sentences(self.text)
         return self._sentences
     
     @property
@@ -45,36 +115,63 @@ class Chunk:
         """Get the number of sentences in the chunk."""
         return len(self.sentences)
     
-    def get_embedding(self, model=None):
+    def get_embedding(self, model=None, cache=None):
         """
         Get or compute the embedding for this chunk.
         
         Args:
-            model: SentenceTransformer model to use for embedding
+            model: Encoder (or CachedEncoder); defaults to the shared encoder of the configured backend
+            cache (EmbeddingCache, optional): Cache to consult when using the default model
             
         Returns:
-            np.array: The embedding vector for this chunk
+            np.array: The embedding vector for this chunk (float32 when stored quantized)
         """
+        if getattr(self._embedding, 'dtype', None) in (np.float16, np.int8):
+            return dequantize(self._embedding, self._embedding_scale)
         if self._embedding is None:
+            if self._store is not None:
+                return self._store.embedding(self._row)
             if model is None:
-                model = SentenceTransformer('all-MiniLM-L6-v2')
+                model = get_encoder()
+                if cache is not None:
+                    from text_processing.embedding_cache import CachedEncoder
+                    
+                    model = CachedEncoder(model, model.name, cache)
             self._embedding = model.encode([self.text])[0]
         return self._embedding
     
-    def similarity_to(self, other_chunk, model=None):
+    def quantize_embedding(self, dtype='int8'):
+        """
+        Store this chunk's embedding as float16 or scalar-quantized int8.
+        
+        Args:
+            dtype (str): 'float32', 'float16' or 'int8'
+        """
+        if self._embedding is None:
+            return
+        self._embedding, self._embedding_scale = quantize(self.get_embedding(), dtype)
+    
+    @property
+    def quantized_embedding(self):
+        """Get the stored embedding as (values, scale); scale is None unless int8."""
+        return self._embedding, self._embedding_scale
+    
+    def similarity_to(self, other_chunk, model=None, cache=None):
         """
         Calculate cosine similarity to another chunk.
         
         Args:
             other_chunk (Chunk): Another chunk to compare with
-            model: SentenceTransformer model for embeddings
+            model: Encoder for embeddings
+            cache (EmbeddingCache, optional): Cache to consult when using the default model
             
         Returns:
             float: Cosine similarity score
         """
-        emb1 = self.get_embedding(model).reshape(1, -1)
-        emb2 = other_chunk.get_embedding(model).reshape(1, -1)
-        return cosine_similarity(emb1, emb2)[0][0]
+        emb1 = self.get_embedding(model, cache)
+        emb2 = other_chunk.get_embedding(model, cache)
+        norms = np.linalg.norm(emb1) * np.linalg.norm(emb2)
+        return float(np.dot(emb1, emb2) / norms) if norms else 0.0
     
     def preview(self, max_chars=100):
         """
@@ -90,12 +187,6 @@ class Chunk:
             return self.text
         return self.text[:max_chars] + "..."
     
-    @staticmethod
-    def _split_into_sentences(text):
-        """Split text into sentences using regex."""
-        sentences = re.split(r'[.!?]+', text)
-        return [s.strip() for s in sentences if s.strip()]
-    
     def __str__(self):
         return f"Chunk({self.chunk_id}): {self.word_count} words - {self.preview(50)}"
     
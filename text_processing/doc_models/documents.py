@@ -1,6 +1,17 @@
+import os
 import re
 
 from text_processing.doc_models.blocks import Block
+from text_processing.metrics import incr, span
+from text_processing.words import WordIndex
+
+HEADER_PATTERN = re.compile(r'^(#{1,10})\s+(.+)$')
+
+INVALID_HEADER_PATTERNS = [
+    re.compile(r'<[^>]*>', re.IGNORECASE),  # HTML/XML tags
+    re.compile(r'[**\\\/**]', re.IGNORECASE),  # Contains backslash or forward slash
+    re.compile(r"[']", re.IGNORECASE),  # Contains single quotes
+]
 
 
 class Document:
@@ -8,6 +19,8 @@ class Document:
     A document object that contains multiple blocks.
     """
     
+    __slots__ = ('text', 'doc_id', '_blocks', '_word_count', '_source', '_word_index')
+    
     def __init__(self, text, doc_id=None):
         """
         Initialize a Document object.
@@ -20,12 +33,45 @@ class Document:
         self.doc_id = doc_id
         self._blocks = None
         self._word_count = None
+        self._source = None
+        self._word_index = None
+    
+    @classmethod
+    def from_source(cls, source, doc_id=None):
+        """
+        Create a Document that reads its markdown lazily from a file or text stream.
+        
+        The text is never held in memory as a whole; use iter_blocks() or
+        iter_chunks() to process it incrementally. A file path can be read
+        any number of times, an open stream or iterable of lines only once.
+        
+        Args:
+            source (str | Path | TextIO | Iterable[str]): Markdown file path, text stream, or
+                iterable of lines without newlines
+            doc_id (str, optional): Unique identifier for the document
+            
+        Returns:
+            Document: A streaming document with text set to None
+        """
+        document = cls(None, doc_id=doc_id)
+        document._source = source
+        return document
         
+    @property
+    def word_index(self):
+        """Get the word index of the markdown, built on first use (None for streamed documents)."""
+        if self._word_index is None and self.text is not None:
+            self._word_index = WordIndex(self.text)
+        return self._word_index
+    
     @property
     def word_count(self):
         """Get the word count of the document."""
         if self._word_count is None:
-            self._word_count = len(self.text.split())
+            if self.text is None:
+                self._word_count = sum(len(line.split()) for line in self._iter_lines())
+            else:
+                self._word_count = len(self.word_index)
         return self._word_count
     
     def create_blocks(self, min_words=150):
@@ -38,20 +84,135 @@ class Document:
         Returns:
             List[Block]: List of Block objects
         """
-        valid_pairs = self._find_valid_header_pairs(self.text, min_words)
+        if self.text is None:
+            self._blocks = list(self.iter_blocks(min_words))
+            return self._blocks
+        
+        with span('headers'):
+            valid_pairs = self._find_valid_header_pairs(self.text, min_words)
+        incr('blocks', len(valid_pairs))
         self._blocks = []
         
-        for i, (start_header, end_header, content) in enumerate(valid_pairs):
+        for i, (start_header, end_header, content, offset) in enumerate(valid_pairs):
             block = Block(
                 text=content,
                 block_id=i,
                 start_header=start_header,
-                end_header=end_header
+                end_header=end_header,
+                start=offset,
+                word_index=self.word_index
             )
             self._blocks.append(block)
         
         return self._blocks
     
+    def iter_blocks(self, min_words=150):
+        """
+        Yield blocks one at a time while reading the markdown line by line.
+        
+        A block is yielded as soon as its closing header is read, so only
+        the current section is held in memory. Produces the same blocks
+        as create_blocks(), without storing them on the document.
+        
+        Args:
+            min_words (int): Minimum words per block
+            
+        Yields:
+            Block: Blocks in document order
+        """
+        block_id = 0
+        start_header = None
+        section_lines = []
+        section_start = 0
+        line_start = 0
+        
+        for line in self._iter_lines():
+            match = HEADER_PATTERN.match(line.strip())
+            if match and self._is_valid_header(match.group(2).strip()):
+                end_header = match.group(2).strip()
+                if start_header is not None:
+                    content, offset = self._clean_section_span('\n'.join(section_lines), section_start)
+                    # The block builds a word index over its own text, reused later by the chunker
+                    block = Block(
+                        text=content,
+                        block_id=block_id,
+                        start_header=start_header,
+                        end_header=end_header,
+                        start=offset
+                    )
+                    if content and block.word_count >= min_words:
+                        yield block
+                        block_id += 1
+                start_header = end_header
+                section_lines = []
+                section_start = line_start + len(line) + 1
+            elif start_header is not None:
+                section_lines.append(line)
+            line_start += len(line) + 1
+    
+    def iter_chunks(self, chunker, min_words=100, max_words=250, similarity_threshold=0.7,
+                    block_min_words=150, batch_blocks=32, keep_blocks=False):
+        """
+        Yield chunks while streaming blocks through the chunker in bounded batches.
+        
+        Args:
+            chunker (SemanticChunker): The chunker to use
+            min_words (int): Minimum words per chunk
+            max_words (int): Maximum words per chunk
+            similarity_threshold (float): Similarity threshold for splitting
+            block_min_words (int): Minimum words per block
+            batch_blocks (int): Number of blocks encoded together
+            keep_blocks (bool): Also store the blocks on the document, e.g. to write it afterwards
+            
+        Yields:
+            Chunk: Chunks in document order
+        """
+        batch = []
+        if keep_blocks:
+            self._blocks = []
+        blocks = self.iter_blocks(block_min_words)
+        while True:
+            block = next(blocks, None)
+            if block is not None:
+                batch.append(block)
+                if len(batch) < batch_blocks:
+                    continue
+            if not batch:
+                break
+            
+            block_chunks = chunker.chunk_blocks(
+                batch,
+                min_words=min_words,
+                max_words=max_words,
+                similarity_threshold=similarity_threshold
+            )
+            for chunk_block, chunks in zip(batch, block_chunks):
+                chunk_block.chunks = chunks
+                yield from chunks
+            if keep_blocks:
+                self._blocks.extend(batch)
+            batch = []
+    
+    def _iter_lines(self):
+        """Yield lines of the markdown without trailing newlines."""
+        if self.text is not None:
+            yield from self.text.split('\n')
+            return
+        
+        if hasattr(self._source, 'read'):
+            for line in self._source:
+                yield line.rstrip('\n')
+            return
+        
+        if not isinstance(self._source, (str, os.PathLike)):
+            # Lines produced on the fly, e.g. by a conversion still in progress
+            yield from self._source
+            return
+        
+        with open(self._source, encoding='utf-8') as f:
+            for line in f:
+                yield line.rstrip('\n')
+    
     @property
     def blocks(self):
         """Get the blocks for this document (if they've been created)."""
@@ -68,15 +229,28 @@ class Document:
     
     # Header extraction and validation methods (from your original code)
     def _extract_headers(self, markdown_text):
-        """Extract headers 1-10 (# ## ### #### etc.)"""
-        pattern = r'^(#{1,10})\s+(.+)$'
+        """
+        Extract headers 1-10 (# ## ### #### etc.) in a single pass.
+        
+        Each header records its line number and the character offsets of
+        its line, so sections can be sliced without searching for titles.
+        """
         headers = []
-        for line in markdown_text.split('\n'):
-            match = re.match(pattern, line.strip())
+        line_start = 0
+        for line_number, line in enumerate(markdown_text.split('\n')):
+            line_end = line_start + len(line)
+            match = HEADER_PATTERN.match(line.strip())
             if match:
                 level = len(match.group(1))
                 title = match.group(2).strip()
-                headers.append({'level': level, 'title': title})
+                headers.append({
+                    'level': level,
+                    'title': title,
+                    'line': line_number,
+                    'start': line_start,
+                    'end': line_end
+                })
+            line_start = line_end + 1
         return headers
     
     def _is_valid_header(self, header_text):
@@ -89,30 +263,20 @@ class Document:
         if len(clean_text) == 0 or len(clean_text) > 200:
             return False
         
-        invalid_patterns = [
-            r'<[^>]*>',  # HTML/XML tags
-            r'[**\\\/**]',  # Contains backslash or forward slash
-            r"[']",  # Contains single quotes
-        ]
-        
-        for pattern in invalid_patterns:
-            if re.search(pattern, clean_text, re.IGNORECASE):
+        for pattern in INVALID_HEADER_PATTERNS:
+            if pattern.search(clean_text):
                 return False
         
         return True
     
     def _extract_between_headers(self, text, start_header, end_header):
-        """Extract text between two headers."""
-        start_pos = text.find(start_header)
-        if start_pos == -1:
-            return None
-        
-        start_pos += len(start_header)
-        end_pos = text.find(end_header, start_pos)
-        if end_pos == -1:
-            return None
-        
-        extracted = text[start_pos:end_pos].strip()
+        """Extract text between two headers and its offset, using their recorded offsets."""
+        return self._clean_section_span(text[start_header['end']:end_header['start']], start_header['end'])
+    
+    @staticmethod
+    def _clean_section(extracted):
+        """Strip a section and drop markdown header lines at its end."""
+        extracted = extracted.strip()
         
         # Remove markdown headers at the end
         lines = extracted.split('\n')
@@ -120,11 +284,18 @@ class Document:
             lines.pop()
         
         return '\n'.join(lines).strip()
+    
+    @staticmethod
+    def _clean_section_span(section, offset):
+        """Clean a section that starts at offset and get the offset of the cleaned text."""
+        # Cleaning only trims the ends, so the result starts after the leading whitespace
+        return Document._clean_section(section), offset + len(section) - len(section.lstrip())
 
 
     def _find_valid_header_pairs(self, text, min_words=50):
         """Find pairs of valid headers with sufficient text between them."""
         all_headers = self._extract_headers(text)
+        word_index = self.word_index if text is self.text else WordIndex(text)
         valid_pairs = []
         i = 0
         
@@ -137,7 +308,7 @@ class Document:
             if start_idx >= len(all_headers):
                 break
             
-            start_header = all_headers[start_idx]['title']
+            start_header = all_headers[start_idx]
             
             # Find next valid end header
             end_idx = start_idx + 1
@@ -147,12 +318,12 @@ class Document:
             if end_idx >= len(all_headers):
                 break
             
-            end_header = all_headers[end_idx]['title']
+            end_header = all_headers[end_idx]
             
             # Extract text between headers
-            extracted_text = self._extract_between_headers(text, start_header, end_header)
-            if extracted_text and len(extracted_text.split()) >= min_words:
-                valid_pairs.append((start_header, end_header, extracted_text))
+            extracted_text, offset = self._extract_between_headers(text, start_header, end_header)
+            if extracted_text and word_index.count(offset, offset + len(extracted_text)) >= min_words:
+                valid_pairs.append((start_header['title'], end_header['title'], extracted_text, offset))
             
             i = end_idx
         
@@ -0,0 +1,254 @@
+import json
+import os
+
+import numpy as np
+
+from text_processing.doc_models.chunks import Chunk
+from text_processing.quantization import check_dtype, dequantize, quantize
+
+
+class ChunkStore:
+    """
+    A columnar store of chunks: one embedding matrix plus parallel id/offset arrays.
+
+    Chunk texts are kept in a single text buffer addressed by offsets, and
+    Chunk objects handed out by the store are views onto its rows.
+    """
+
+    COLUMNS = {
+        'doc_index': np.int32,
+        'block_ids': np.int32,
+        'chunk_ids': np.int32,
+        'word_counts': np.int32,
+        'text_starts': np.int64,
+        'text_ends': np.int64,
+    }
+
+    def __init__(self, dim=None, dtype=np.float32, capacity=1024):
+        """
+        Initialize an empty chunk store.
+
+        Args:
+            dim (int, optional): Embedding dimension; taken from the first chunk if omitted
+            dtype: Embedding dtype: np.float32, np.float16 or 'int8' (with a scale per row)
+            capacity (int): Initial number of rows to allocate
+        """
+        self.dtype = np.dtype(check_dtype(dtype))
+        self.doc_ids = []
+        self._size = 0
+        self._capacity = capacity
+        self._columns = {name: np.zeros(capacity, dtype=col_dtype) for name, col_dtype in self.COLUMNS.items()}
+        self._embeddings = np.zeros((capacity, dim), dtype=self.dtype) if dim else None
+        self._scales = np.ones(capacity, dtype=np.float32) if self.dtype == np.int8 else None
+        self._text_parts = []
+        self._text_length = 0
+
+    @classmethod
+    def from_document(cls, document, dtype=np.float32, bind=True):
+        """
+        Build a store from a chunked Document.
+
+        Args:
+            document (Document): Document whose blocks have been chunked
+            dtype: Embedding dtype: np.float32, np.float16 or 'int8'
+            bind (bool): Replace the blocks' chunks with views into the store
+
+        Returns:
+            ChunkStore: The populated store
+        """
+        return cls.from_documents([document], dtype=dtype, bind=bind)
+
+    @classmethod
+    def from_documents(cls, documents, dtype=np.float32, bind=True):
+        """
+        Build a corpus-level store from several chunked Documents.
+
+        Args:
+            documents (List[Document]): Documents whose blocks have been chunked
+            dtype: Embedding dtype: np.float32, np.float16 or 'int8'
+            bind (bool): Replace the blocks' chunks with views into the store
+
+        Returns:
+            ChunkStore: The populated store
+        """
+        documents = list(documents)
+        capacity = sum(len(document.get_all_chunks()) for document in documents)
+        store = cls(dtype=dtype, capacity=max(capacity, 1))
+        for document in documents:
+            store.add_document(document, bind=bind)
+        return store
+
+    @property
+    def embeddings(self):
+        """Get the (n_chunks, dim) embedding matrix in the storage dtype."""
+        if self._embeddings is None:
+            return np.zeros((0, 0), dtype=self.dtype)
+        return self._embeddings[:self._size]
+    
+    @property
+    def scales(self):
+        """Get the per-row scales of an int8 store, or None."""
+        return self._scales[:self._size] if self._scales is not None else None
+
+    def __getattr__(self, name):
+        # Expose columns (block_ids, chunk_ids, ...) as trimmed array views
+        columns = self.__dict__.get('_columns')
+        if columns is not None and name in columns:
+            return columns[name][:self._size]
+        raise AttributeError(name)
+
+    def _reserve(self, rows, dim):
+        """Make room for more rows, growing every column geometrically."""
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self._capacity, dim), dtype=self.dtype)
+        elif self._embeddings.shape[1] != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match store dimension {self._embeddings.shape[1]}")
+
+        needed = self._size + rows
+        if needed <= self._capacity:
+            return
+
+        capacity = max(needed, self._capacity * 2)
+        for name, column in self._columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+        grown = np.zeros((capacity, dim), dtype=self.dtype)
+        grown[:self._size] = self._embeddings[:self._size]
+        self._embeddings = grown
+        if self._scales is not None:
+            grown = np.ones(capacity, dtype=np.float32)
+            grown[:self._size] = self._scales[:self._size]
+            self._scales = grown
+        self._capacity = capacity
+
+    def add_chunk(self, chunk, doc_id=None):
+        """
+        Append one chunk to the store.
+
+        Args:
+            chunk (Chunk): Chunk to store; its embedding is computed if missing
+            doc_id (str, optional): ID of the document the chunk belongs to
+
+        Returns:
+            int: Row of the chunk in the store
+        """
+        embedding, scale = quantize(chunk.get_embedding(), self.dtype.name)
+        self._reserve(1, embedding.shape[0])
+
+        if not self.doc_ids or self.doc_ids[-1] != doc_id:
+            self.doc_ids.append(doc_id)
+
+        text = chunk.text
+        row = self._size
+        self._columns['doc_index'][row] = len(self.doc_ids) - 1
+        self._columns['block_ids'][row] = -1 if chunk.block_id is None else chunk.block_id
+        self._columns['chunk_ids'][row] = -1 if chunk.chunk_id is None else chunk.chunk_id
+        self._columns['word_counts'][row] = chunk.word_count
+        self._columns['text_starts'][row] = self._text_length
+        self._columns['text_ends'][row] = self._text_length + len(text)
+        self._embeddings[row] = embedding
+        if self._scales is not None:
+            self._scales[row] = scale
+
+        self._text_parts.append(text)
+        self._text_length += len(text)
+        self._size += 1
+        return row
+
+    def add_document(self, document, bind=True):
+        """
+        Append every chunk of a Document.
+
+        Args:
+            document (Document): Document whose blocks have been chunked
+            bind (bool): Replace the blocks' chunks with views into the store
+
+        Returns:
+            range: Rows of the document's chunks
+        """
+        first = self._size
+        for block in document.blocks or []:
+            rows = [self.add_chunk(chunk, doc_id=document.doc_id) for chunk in block.chunks or []]
+            if bind and block.chunks is not None:
+                block.chunks = [Chunk.from_store(self, row) for row in rows]
+        return range(first, self._size)
+
+    def _buffer(self):
+        """Get the text buffer, joining pending parts into a single string."""
+        if len(self._text_parts) != 1:
+            self._text_parts = [''.join(self._text_parts)]
+        return self._text_parts[0]
+
+    def text(self, row):
+        """Get the text of a stored chunk."""
+        return self._buffer()[self.text_starts[row]:self.text_ends[row]]
+
+    def embedding(self, row):
+        """Get the embedding of a stored chunk as float32."""
+        return dequantize(self.embeddings[row], None if self._scales is None else self._scales[row])
+
+    def doc_id(self, row):
+        """Get the document ID of a stored chunk."""
+        return self.doc_ids[self.doc_index[row]]
+
+    def chunk(self, row):
+        """Get a Chunk view onto a row."""
+        return Chunk.from_store(self, row)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for row in range(self._size):
+            yield self.chunk(row)
+
+    def save(self, path):
+        """
+        Save the store to a directory of .npy files plus a text buffer.
+
+        Args:
+            path (str): Directory to write to
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'embeddings.npy'), self.embeddings)
+        for name in self.COLUMNS:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        if self._scales is not None:
+            np.save(os.path.join(path, 'scales.npy'), self.scales)
+        with open(os.path.join(path, 'texts.txt'), 'w', encoding='utf-8', newline='') as f:
+            f.write(self._buffer() if self._text_parts else '')
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'doc_ids': self.doc_ids, 'dtype': self.dtype.name}, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a store saved with save().
+
+        Args:
+            path (str): Directory to read from
+            mmap (bool): Memory-map the embedding matrix instead of reading it
+
+        Returns:
+            ChunkStore: The loaded store (read-only embeddings when memory-mapped)
+        """
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+
+        store = cls(dtype=meta['dtype'], capacity=0)
+        store.doc_ids = meta['doc_ids']
+        store._embeddings = np.load(os.path.join(path, 'embeddings.npy'), mmap_mode='r' if mmap else None)
+        for name in cls.COLUMNS:
+            store._columns[name] = np.load(os.path.join(path, f'{name}.npy'))
+        if store.dtype == np.int8:
+            store._scales = np.load(os.path.join(path, 'scales.npy'))
+        with open(os.path.join(path, 'texts.txt'), encoding='utf-8', newline='') as f:
+            store._text_parts = [f.read()]
+        store._size = store._capacity = store._embeddings.shape[0]
+        store._text_length = len(store._text_parts[0])
+        return store
+
+    def __repr__(self):
+        dim = self._embeddings.shape[1] if self._embeddings is not None else None
+        return f"ChunkStore(chunks={self._size}, dim={dim}, dtype={self.dtype.name}, docs={len(self.doc_ids)})"
@@ -0,0 +1,239 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from text_processing.metrics import incr
+
+
+def normalize_sentence(sentence):
+    """Collapse whitespace so trivially different copies share a cache entry."""
+    return ' '.join(sentence.split())
+
+
+def sentence_key(sentence):
+    """Hash a normalized sentence into a cache key."""
+    return hashlib.sha1(normalize_sentence(sentence).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    A persistent SQLite store of sentence embeddings with LRU eviction.
+    """
+
+    def __init__(self, path="data/cache/embeddings.sqlite", max_bytes=512 * 1024 * 1024):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            path (str): SQLite file to store embeddings in
+            max_bytes (int): Maximum total size of stored vectors before eviction
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        # Hits and misses count unique sentences; duplicates count in-batch repeats
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
+        self.encode_seconds = 0.0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model_name, keys):
+        """
+        Look up embeddings and mark them as recently used.
+
+        Args:
+            model_name (str): Name of the model that produced the embeddings
+            keys (List[str]): Sentence keys from sentence_key()
+
+        Returns:
+            dict: Mapping of key to np.ndarray for every key found
+        """
+        found = {}
+        if not keys:
+            return found
+
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    [model_name, *batch]
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                [(now, model_name, key) for key in found]
+            )
+            self._conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        incr('embedding_cache_hits', len(found))
+        incr('embedding_cache_misses', len(keys) - len(found))
+        return found
+
+    def put_many(self, model_name, keys, embeddings):
+        """
+        Store embeddings and evict least recently used entries if over the size limit.
+
+        Args:
+            model_name (str): Name of the model that produced the embeddings
+            keys (List[str]): Sentence keys from sentence_key()
+            embeddings (np.ndarray): One row per key
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        now = time.time()
+        rows = [
+            (model_name, key, embedding.shape[0], embedding.tobytes(), embedding.nbytes, now)
+            for key, embedding in zip(keys, embeddings)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, key, dim, vector, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Delete least recently used rows until the store fits in max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        victims = []
+        for rowid, size in self._conn.execute("SELECT rowid, size FROM embeddings ORDER BY last_used"):
+            victims.append((rowid,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM embeddings WHERE rowid = ?", victims)
+
+    def clear(self, model_name=None):
+        """
+        Remove cached embeddings.
+
+        Args:
+            model_name (str, optional): Only remove entries of this model
+        """
+        with self._lock:
+            if model_name is None:
+                self._conn.execute("DELETE FROM embeddings")
+            else:
+                self._conn.execute("DELETE FROM embeddings WHERE model = ?", (model_name,))
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Get hit/miss counters and an estimate of encode time saved.
+
+        Returns:
+            dict: Counters for this process
+        """
+        lookups = self.hits + self.misses
+        seconds_per_sentence = self.encode_seconds / self.misses if self.misses else 0.0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'duplicates': self.duplicates,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'encode_seconds': self.encode_seconds,
+            'saved_seconds_estimate': (self.hits + self.duplicates) * seconds_per_sentence,
+        }
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def __repr__(self):
+        return f"EmbeddingCache(path={self.path!r}, hits={self.hits}, misses={self.misses})"
+
+
+class CachedEncoder:
+    """
+    A drop-in wrapper around a model's encode() that consults an EmbeddingCache.
+    """
+
+    def __init__(self, model, model_name, cache):
+        """
+        Initialize the cached encoder.
+
+        Args:
+            model: SentenceTransformer (or compatible) model to encode misses with
+            model_name (str): Name used to key the cache
+            cache (EmbeddingCache): Cache to read from and write to
+        """
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Encode sentences, reusing cached vectors and encoding repeats only once.
+
+        Args:
+            sentences (List[str]): Sentences to encode
+            batch_size (int): Batch size passed to the underlying model
+
+        Returns:
+            np.ndarray: float32 matrix with one row per input sentence
+        """
+        keys = [sentence_key(sentence) for sentence in sentences]
+        unique_keys = list(dict.fromkeys(keys))
+        self.cache.duplicates += len(keys) - len(unique_keys)
+
+        vectors = self.cache.get_many(self.model_name, unique_keys)
+        missing = [key for key in unique_keys if key not in vectors]
+
+        if missing:
+            first_index = {}
+            for i, key in enumerate(keys):
+                first_index.setdefault(key, i)
+
+            start = time.perf_counter()
+            encoded = np.asarray(
+                self.model.encode([sentences[first_index[key]] for key in missing], batch_size=batch_size, **kwargs),
+                dtype=np.float32
+            )
+            self.cache.encode_seconds += time.perf_counter() - start
+
+            self.cache.put_many(self.model_name, missing, encoded)
+            vectors.update(zip(missing, encoded))
+
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
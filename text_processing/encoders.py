@@ -0,0 +1,365 @@
+import hashlib
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+import numpy as np
+
+from text_processing.models import DEFAULT_BACKEND, DEFAULT_MODEL_NAME, get_encoder, get_model
+
+
+class Encoder:
+    """
+    The interface shared by encoder backends: a batch of texts in, a float32 matrix out.
+    
+    Any object with a compatible encode() (e.g. a SentenceTransformer) can
+    be used where an encoder is expected; subclasses also provide a name
+    that identifies their vectors in caches and chunk manifests.
+    """
+    
+    name = None
+    
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Encode sentences into embeddings.
+        
+        Args:
+            sentences (List[str]): Sentences to encode
+            batch_size (int): Number of sentences per model call
+            
+        Returns:
+            np.ndarray: float32 matrix with one row per sentence
+        """
+        raise NotImplementedError
+
+
+class SentenceTransformerEncoder(Encoder):
+    """
+    Encodes with a PyTorch SentenceTransformer model (the shared model from get_model()).
+    """
+    
+    def __init__(self, model_name=DEFAULT_MODEL_NAME):
+        """
+        Initialize the encoder; the model loads on first use.
+        
+        Args:
+            model_name (str): Name of the SentenceTransformer model
+        """
+        self.model_name = model_name
+        # Keeps cache keys and manifests of existing runs valid
+        self.name = model_name
+    
+    @property
+    def model(self):
+        """Get the underlying SentenceTransformer."""
+        return get_model(self.model_name)
+    
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Encode sentences with the SentenceTransformer.
+        
+        Args:
+            sentences (List[str]): Sentences to encode
+            batch_size (int): Number of sentences per model call
+            
+        Returns:
+            np.ndarray: float32 matrix with one row per sentence
+        """
+        return np.asarray(self.model.encode(sentences, batch_size=batch_size, **kwargs), dtype=np.float32)
+    
+    def __repr__(self):
+        return f"SentenceTransformerEncoder(model_name={self.model_name})"
+
+
+class FastEmbedEncoder(Encoder):
+    """
+    Encodes with fastembed, which runs ONNX exports of the models on ONNX Runtime.
+    
+    This avoids PyTorch entirely and is usually faster on CPU-only nodes.
+    With quantized=True an int8 export of the model is used instead,
+    trading a little accuracy for a smaller, faster model.
+    """
+    
+    # int8 export of sentence-transformers models for x86 CPUs with AVX2
+    QUANTIZED_MODEL_FILE = "onnx/model_quint8_avx2.onnx"
+    
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, quantized=False, threads=None, cache_dir=None,
+                 model_file=None, dim=None):
+        """
+        Initialize the encoder; the ONNX model loads on first use.
+        
+        Args:
+            model_name (str): Model name; bare sentence-transformers names are prefixed with
+                'sentence-transformers/'
+            quantized (bool): Use the int8 ONNX export of the model
+            threads (int, optional): ONNX Runtime intra-op threads (default: all cores)
+            cache_dir (str, optional): Directory for downloaded models
+            model_file (str, optional): ONNX file in the model repository to use when quantized
+            dim (int, optional): Embedding dimension when quantized, if fastembed does not list the model
+        """
+        self.model_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        self.quantized = quantized
+        self.threads = threads
+        self.cache_dir = cache_dir
+        self.model_file = model_file or self.QUANTIZED_MODEL_FILE
+        self.dim = dim
+        self.name = f"fastembed:{self.model_name}" + (":int8" if quantized else "")
+        self._model = None
+    
+    @property
+    def model(self):
+        """Get the fastembed TextEmbedding, loading it on first use."""
+        if self._model is None:
+            # onnxruntime and the model download are only paid for when this backend is used
+            from fastembed import TextEmbedding
+            
+            model_name = self._register_quantized(TextEmbedding) if self.quantized else self.model_name
+            self._model = TextEmbedding(model_name=model_name, threads=self.threads, cache_dir=self.cache_dir)
+        return self._model
+    
+    def _register_quantized(self, TextEmbedding):
+        """Register the int8 export as a fastembed custom model and return its name."""
+        from fastembed.common.model_description import ModelSource, PoolingType
+        
+        name = f"{self.model_name}-int8"
+        dim = self.dim
+        if dim is None:
+            listed = {model["model"].lower(): model["dim"] for model in TextEmbedding.list_supported_models()}
+            dim = listed.get(self.model_name.lower())
+            if dim is None:
+                raise ValueError(f"Unknown embedding dimension for '{self.model_name}', pass dim=")
+        try:
+            TextEmbedding.add_custom_model(
+                model=name,
+                pooling=PoolingType.MEAN,
+                normalization=True,
+                sources=ModelSource(hf=self.model_name),
+                dim=dim,
+                model_file=self.model_file,
+            )
+        except ValueError:
+            # Already registered by an earlier encoder in this process
+            pass
+        return name
+    
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Encode sentences with ONNX Runtime.
+        
+        Args:
+            sentences (List[str]): Sentences to encode
+            batch_size (int): Number of sentences per model call
+            
+        Returns:
+            np.ndarray: float32 matrix with one row per sentence
+        """
+        if not len(sentences):
+            return np.zeros((0, self.model.embedding_size), dtype=np.float32)
+        return np.asarray(list(self.model.embed(list(sentences), batch_size=batch_size)), dtype=np.float32)
+    
+    def __repr__(self):
+        return f"FastEmbedEncoder(model_name={self.model_name}, quantized={self.quantized})"
+
+
+class HashEncoder(Encoder):
+    """
+    A deterministic, offline stand-in for a sentence encoder.
+    
+    Each sentence maps to a fixed unit vector derived from its hash, so
+    results are reproducible without downloading or running a model.
+    """
+    
+    def __init__(self, dim=384):
+        """
+        Initialize the hash encoder.
+        
+        Args:
+            dim (int): Embedding dimension
+        """
+        self.dim = dim
+        self.name = f"hash-{dim}"
+    
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Encode sentences into deterministic unit vectors.
+        
+        Args:
+            sentences (List[str]): Sentences to encode
+            batch_size (int): Ignored; accepted for interface compatibility
+            
+        Returns:
+            np.ndarray: float32 matrix with one row per sentence
+        """
+        embeddings = np.empty((len(sentences), self.dim), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            seed = int.from_bytes(hashlib.sha1(sentence.encode('utf-8')).digest()[:8], 'little')
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            embeddings[i] = vector / np.linalg.norm(vector)
+        return embeddings
+    
+    def __repr__(self):
+        return f"HashEncoder(dim={self.dim})"
+
+
+# The encoder of a PooledEncoder worker process
+_worker_encoder = None
+
+# Read by torch, numpy's BLAS and OpenMP when they start their thread pools
+_THREAD_VARIABLES = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def _init_encode_worker(backend, model_name, threads):
+    """Load the encoder once in each worker process, limited to its share of the cores."""
+    global _worker_encoder
+    # Thread pools already started with _THREAD_VARIABLES from the parent; torch can still be resized
+    if backend.startswith("fastembed"):
+        _worker_encoder = FastEmbedEncoder(model_name, quantized=backend == "fastembed-int8", threads=threads)
+    else:
+        if backend == "sentence-transformers":
+            import torch
+
+            torch.set_num_threads(threads)
+            torch.set_num_interop_threads(1)
+        _worker_encoder = get_encoder(backend, model_name, workers=1)
+    # Load the model now rather than in the first shard
+    _worker_encoder.encode(["warm up"])
+
+
+def _worker_ready():
+    return True
+
+
+def _encode_shard(sentences, batch_size, kwargs):
+    """Encode one shard of sentences in a worker process."""
+    return _worker_encoder.encode(sentences, batch_size=batch_size, **kwargs)
+
+
+class PooledEncoder(Encoder):
+    """
+    Encodes large batches in a pool of worker processes, one model copy per worker.
+    
+    A single process only uses the intra-op threads of one model, which
+    stops scaling well before all cores of a large CPU node are busy.
+    Batches are cut into shards that workers take as they become free,
+    and the shard results are joined back in input order. Workers start
+    on the first large batch and are reused until close(). Calls smaller
+    than min_pool_batch (single chunks, warm-ups, short documents) are
+    encoded in process, where the round trip to a worker would cost more
+    than the encoding itself.
+    """
+    
+    # Shards per worker, so a worker that finishes early picks up more work
+    SHARDS_PER_WORKER = 4
+    # Fewest sentences sent to the worker pool
+    MIN_POOL_BATCH = 256
+    
+    def __init__(self, backend=DEFAULT_BACKEND, model_name=DEFAULT_MODEL_NAME, workers=None, threads_per_worker=None,
+                 min_pool_batch=MIN_POOL_BATCH):
+        """
+        Initialize the encoder; worker processes start on first use.
+        
+        Args:
+            backend (str): Encoder backend each worker runs, from models.ENCODER_BACKENDS
+            model_name (str): Name of the model to encode with
+            workers (int, optional): Worker processes (default: one per 4 cores)
+            threads_per_worker (int, optional): Intra-op threads per worker (default: cores / workers)
+            min_pool_batch (int): Fewest sentences sent to the workers; smaller calls are encoded in process
+        """
+        cpus = os.cpu_count() or 1
+        self.backend = backend
+        self.model_name = model_name
+        self.workers = workers or max(1, cpus // 4)
+        self.threads_per_worker = threads_per_worker or max(1, cpus // self.workers)
+        self.min_pool_batch = min_pool_batch
+        # Workers produce the same vectors as the single-process encoder of the backend
+        self.local = get_encoder(backend, model_name, workers=1)
+        self.name = self.local.name
+        self._pool = None
+    
+    @property
+    def pool(self):
+        """Get the worker pool, starting it on first use."""
+        if self._pool is None:
+            # Spawn so workers never inherit a parent's torch threads or loaded model
+            context = multiprocessing.get_context("spawn")
+            # Workers import numpy before the initializer runs, so their thread limits must be in the
+            # environment they are spawned with
+            saved = {variable: os.environ.get(variable) for variable in _THREAD_VARIABLES}
+            os.environ.update(dict.fromkeys(_THREAD_VARIABLES, str(self.threads_per_worker)))
+            try:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=context, initializer=_init_encode_worker,
+                    initargs=(self.backend, self.model_name, self.threads_per_worker)
+                )
+                # One task per worker starts them all, so models load now instead of inside the first batches
+                wait([self._pool.submit(_worker_ready) for _ in range(self.workers)])
+            finally:
+                for variable, value in saved.items():
+                    if value is None:
+                        os.environ.pop(variable, None)
+                    else:
+                        os.environ[variable] = value
+        return self._pool
+    
+    def shards(self, sentences, batch_size=32):
+        """
+        Cut sentences into contiguous shards of whole batches.
+        
+        Args:
+            sentences (List[str]): Sentences to encode
+            batch_size (int): Number of sentences per model call
+            
+        Returns:
+            List[List[str]]: Shards in input order
+        """
+        batches = math.ceil(len(sentences) / batch_size)
+        shard_batches = max(1, math.ceil(batches / (self.workers * self.SHARDS_PER_WORKER)))
+        size = shard_batches * batch_size
+        return [sentences[start:start + size] for start in range(0, len(sentences), size)] or [sentences]
+    
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Encode sentences across the worker processes, or in process if there are fewer than min_pool_batch.
+        
+        Args:
+            sentences (List[str]): Sentences to encode
+            batch_size (int): Number of sentences per model call in each worker
+            **kwargs: Passed on to the encoder of the backend
+            
+        Returns:
+            np.ndarray: float32 matrix with one row per sentence, in input order
+        """
+        sentences = list(sentences)
+        if len(sentences) < self.min_pool_batch:
+            return self.local.encode(sentences, batch_size=batch_size, **kwargs)
+        pool = self.pool
+        try:
+            # map() yields shard results in submission order whichever worker finishes first
+            results = list(pool.map(_encode_shard, self.shards(sentences, batch_size), repeat(batch_size),
+                                    repeat(kwargs)))
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); stop the others and start a fresh pool on the next call
+            pool.shutdown(wait=False, cancel_futures=True)
+            if self._pool is pool:
+                self._pool = None
+            raise
+        return np.concatenate(results).astype(np.float32, copy=False)
+    
+    def close(self):
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def __repr__(self):
+        return (f"PooledEncoder(backend={self.backend}, model_name={self.model_name}, workers={self.workers}, "
+                f"threads_per_worker={self.threads_per_worker}, min_pool_batch={self.min_pool_batch})")
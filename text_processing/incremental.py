@@ -0,0 +1,336 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from text_processing.doc_models.chunks import Chunk
+from text_processing.metrics import incr
+from text_processing.writers import _atomic_write
+
+
+def text_hash(text):
+    """Get the content hash used to match blocks and chunks across versions."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def chunk_settings(chunker, min_words=100, max_words=250, similarity_threshold=0.7):
+    """
+    Get the settings that determine a block's chunks.
+
+    Stored chunks are only reused when all of these match.
+
+    Args:
+        chunker (SemanticChunker): The chunker in use
+        min_words (int): Minimum words per chunk
+        max_words (int): Maximum words per chunk
+        similarity_threshold (float): Similarity threshold for splitting
+
+    Returns:
+        dict: JSON-serializable settings
+    """
+    return {
+        "model": chunker.model_name,
+        "engine": chunker.engine,
+        "embedding_dtype": chunker.embedding_dtype,
+        "min_words": min_words,
+        "max_words": max_words,
+        "similarity_threshold": similarity_threshold,
+    }
+
+
+def _by_occurrence(pairs):
+    """Key (header, hash) pairs by (header, n) so repeated headers pair up in order."""
+    keyed = {}
+    seen = {}
+    for header, block_hash in pairs:
+        n = seen[header] = seen.get(header, -1) + 1
+        keyed[(header, n)] = block_hash
+    return keyed
+
+
+class ChunkDiff:
+    """
+    Blocks and chunks that changed between two versions of a document.
+    """
+
+    def __init__(self):
+        self.reused_blocks = 0
+        self.rechunked_blocks = 0
+        self.changed_blocks = []
+        self.added_blocks = []
+        self.removed_blocks = []
+        self.added_chunks = []
+        self.removed_chunks = []
+        self.unchanged_chunks = 0
+
+    @classmethod
+    def between(cls, manifest, document, reused_blocks=0):
+        """
+        Compare a chunked Document against the manifest of the previous version.
+
+        Blocks are paired by start header (in order, for repeated headers):
+        a header present in both with different content is 'changed'. Chunks are compared by content hash.
+
+        Args:
+            manifest (ChunkManifest | None): Manifest of the previous version
+            document (Document): New version, with its blocks chunked
+            reused_blocks (int): Number of blocks whose chunks came from the manifest
+
+        Returns:
+            ChunkDiff: The differences
+        """
+        diff = cls()
+        diff.reused_blocks = reused_blocks
+        blocks = document.blocks or []
+        diff.rechunked_blocks = len(blocks) - reused_blocks
+        old_blocks = manifest.blocks if manifest is not None else []
+
+        old_by_header = _by_occurrence((entry["start_header"], entry["hash"]) for entry in old_blocks)
+        new_by_header = _by_occurrence((block.start_header, block.content_hash) for block in blocks)
+        for key, block_hash in new_by_header.items():
+            if key not in old_by_header:
+                diff.added_blocks.append(key[0])
+            elif old_by_header[key] != block_hash:
+                diff.changed_blocks.append(key[0])
+        diff.removed_blocks = [key[0] for key in old_by_header if key not in new_by_header]
+
+        old_chunks = {}
+        for entry in old_blocks:
+            for chunk in entry["chunks"]:
+                old_chunks.setdefault(chunk["hash"], (entry["block_id"], chunk))
+        seen = set()
+        for block in blocks:
+            for chunk in block.chunks or []:
+                chunk_hash = text_hash(chunk.text)
+                seen.add(chunk_hash)
+                if chunk_hash in old_chunks:
+                    diff.unchanged_chunks += 1
+                else:
+                    diff.added_chunks.append({
+                        "block_id": block.block_id,
+                        "chunk_id": chunk.chunk_id,
+                        "hash": chunk_hash,
+                        "preview": chunk.preview(80),
+                    })
+        diff.removed_chunks = [
+            {"block_id": block_id, "chunk_id": chunk["chunk_id"], "hash": chunk_hash, "preview": chunk["preview"]}
+            for chunk_hash, (block_id, chunk) in old_chunks.items() if chunk_hash not in seen
+        ]
+        return diff
+
+    def as_dict(self):
+        return {
+            "reused_blocks": self.reused_blocks,
+            "rechunked_blocks": self.rechunked_blocks,
+            "changed_blocks": self.changed_blocks,
+            "added_blocks": self.added_blocks,
+            "removed_blocks": self.removed_blocks,
+            "added_chunks": self.added_chunks,
+            "removed_chunks": self.removed_chunks,
+            "unchanged_chunks": self.unchanged_chunks,
+        }
+
+    def save(self, path):
+        """Write the diff as JSON, atomically."""
+        payload = json.dumps(self.as_dict(), indent=2, ensure_ascii=False).encode("utf-8")
+        _atomic_write(path, lambda f: f.write(payload))
+
+    def __str__(self):
+        lines = [
+            f"Re-chunked {self.rechunked_blocks} blocks, reused {self.reused_blocks}: "
+            f"{len(self.added_chunks)} chunks added, {len(self.removed_chunks)} removed, "
+            f"{self.unchanged_chunks} unchanged"
+        ]
+        for label, headers in (("changed", self.changed_blocks), ("added", self.added_blocks),
+                               ("removed", self.removed_blocks)):
+            for header in headers:
+                lines.append(f"  {label} block '{header}'")
+        return "\n".join(lines)
+
+
+class ChunkManifest:
+    """
+    A record of one chunking run over a document: block hashes, chunk spans and embeddings.
+
+    Loading the manifest of the previous run lets a revised document
+    reuse the chunks of every block whose content did not change, so
+    only edited blocks are split, encoded and grouped again.
+    """
+
+    def __init__(self, doc_id=None, settings=None, blocks=None, embeddings=None):
+        """
+        Initialize a manifest.
+
+        Args:
+            doc_id (str, optional): ID of the document
+            settings (dict, optional): Chunking settings from chunk_settings()
+            blocks (List[dict], optional): Block entries with their hash and chunk spans
+            embeddings (np.ndarray, optional): Chunk embeddings; entries point at rows
+        """
+        self.doc_id = doc_id
+        self.settings = settings or {}
+        self.blocks = blocks or []
+        self.embeddings = embeddings if embeddings is not None else np.zeros((0, 0), dtype=np.float32)
+        self._by_hash = {entry["hash"]: entry for entry in self.blocks}
+
+    @classmethod
+    def from_document(cls, document, settings):
+        """
+        Record the chunks of a chunked Document.
+
+        Args:
+            document (Document): Document whose blocks have been chunked
+            settings (dict): Chunking settings from chunk_settings()
+
+        Returns:
+            ChunkManifest: The manifest
+        """
+        blocks = []
+        embeddings = []
+        for block in document.blocks or []:
+            # Only span-based chunks can be rebuilt from a block's text
+            if any(chunk.start is None for chunk in block.chunks or []):
+                continue
+            chunks = []
+            for chunk in block.chunks or []:
+                chunks.append({
+                    "chunk_id": chunk.chunk_id,
+                    "start": chunk.start,
+                    "end": chunk.end,
+                    "word_count": chunk.word_count,
+                    "hash": text_hash(chunk.text),
+                    "preview": chunk.preview(80),
+                    "row": len(embeddings),
+                })
+                embeddings.append(np.asarray(chunk.get_embedding(), dtype=np.float32))
+            blocks.append({
+                "block_id": block.block_id,
+                "start_header": block.start_header,
+                "end_header": block.end_header,
+                "hash": block.content_hash,
+                "chunks": chunks,
+            })
+        matrix = np.stack(embeddings) if embeddings else np.zeros((0, 0), dtype=np.float32)
+        return cls(document.doc_id, settings, blocks, matrix)
+
+    @staticmethod
+    def paths(output_dir, name):
+        """Get the (json, npy) paths of a manifest."""
+        base = os.path.join(output_dir, f"{name}_manifest")
+        return base + ".json", base + ".npy"
+
+    def save(self, output_dir, name):
+        """
+        Write the manifest atomically next to the chunk outputs.
+
+        Args:
+            output_dir (str): Directory to write to
+            name (str): Base output name of the document
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        json_path, npy_path = self.paths(output_dir, name)
+        _atomic_write(npy_path, lambda f: np.save(f, self.embeddings))
+        payload = json.dumps(
+            {"doc_id": self.doc_id, "settings": self.settings, "blocks": self.blocks}, ensure_ascii=False
+        ).encode("utf-8")
+        _atomic_write(json_path, lambda f: f.write(payload))
+
+    @classmethod
+    def load(cls, output_dir, name):
+        """
+        Load the manifest of a previous run.
+
+        Args:
+            output_dir (str): Directory the manifest was written to
+            name (str): Base output name of the document
+
+        Returns:
+            ChunkManifest | None: The manifest, or None if there is no usable one
+        """
+        json_path, npy_path = cls.paths(output_dir, name)
+        try:
+            with open(json_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            embeddings = np.load(npy_path)
+        except (OSError, ValueError):
+            return None
+        return cls(meta.get("doc_id"), meta.get("settings"), meta.get("blocks"), embeddings)
+
+    def reuse(self, document, settings):
+        """
+        Give unchanged blocks of a new document version their stored chunks.
+
+        Args:
+            document (Document): New version, with blocks created
+            settings (dict): Chunking settings of this run
+
+        Returns:
+            List[Block]: Blocks that still need chunking (all of them if the settings changed)
+        """
+        blocks = document.blocks or []
+        if settings != self.settings:
+            return list(blocks)
+
+        dtype = settings.get("embedding_dtype", "float32")
+        pending = []
+        for block in blocks:
+            entry = self._by_hash.get(block.content_hash)
+            if entry is None:
+                pending.append(block)
+                continue
+            chunks = []
+            for stored in entry["chunks"]:
+                chunk = Chunk.from_span(
+                    block.text, stored["start"], stored["end"],
+                    chunk_id=stored["chunk_id"],
+                    block_id=block.block_id,
+                    embedding=self.embeddings[stored["row"]]
+                )
+                chunk.word_count = stored["word_count"]
+                if dtype != "float32":
+                    # Stored like the chunks the chunker creates in this run
+                    chunk.quantize_embedding(dtype)
+                chunks.append(chunk)
+            block.chunks = chunks
+        incr("reused_blocks", len(blocks) - len(pending))
+        return pending
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __repr__(self):
+        return f"ChunkManifest(doc_id={self.doc_id}, blocks={len(self.blocks)}, chunks={self.embeddings.shape[0]})"
+
+
+def rechunk_document(document, chunker, manifest=None, min_words=100, max_words=250, similarity_threshold=0.7):
+    """
+    Chunk a Document, reusing a previous run's chunks for unchanged blocks.
+
+    Args:
+        document (Document): Document to chunk; blocks are created if needed
+        chunker (SemanticChunker): The chunker to use for changed blocks
+        manifest (ChunkManifest, optional): Manifest of the previous version
+        min_words (int): Minimum words per chunk
+        max_words (int): Maximum words per chunk
+        similarity_threshold (float): Similarity threshold for splitting
+
+    Returns:
+        Tuple[ChunkManifest, ChunkDiff]: Manifest of this run and the differences to the previous one
+    """
+    if document.blocks is None:
+        document.create_blocks()
+    settings = chunk_settings(chunker, min_words, max_words, similarity_threshold)
+    pending = manifest.reuse(document, settings) if manifest is not None else list(document.blocks)
+
+    block_chunks = chunker.chunk_blocks(
+        pending,
+        min_words=min_words,
+        max_words=max_words,
+        similarity_threshold=similarity_threshold
+    )
+    for block, chunks in zip(pending, block_chunks):
+        block.chunks = chunks
+
+    diff = ChunkDiff.between(manifest, document, reused_blocks=len(document.blocks) - len(pending))
+    return ChunkManifest.from_document(document, settings), diff
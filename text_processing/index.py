@@ -0,0 +1,469 @@
+import json
+import os
+
+import numpy as np
+
+from text_processing.metrics import incr, span
+from text_processing.quantization import check_dtype, dequantize, quantize, quantized_dot
+
+
+def _normalize(embeddings):
+    """L2-normalize rows as float32, leaving all-zero rows at zero."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim == 1:
+        embeddings = embeddings[None, :]
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+class ChunkIndex:
+    """
+    An in-memory top-k similarity index over chunk embeddings.
+
+    Embeddings are L2-normalized into one matrix, so a batch of queries
+    is answered with a single matrix multiply and argpartition. The
+    matrix can be held as float16 or int8 with per-row scales and is
+    scored in that form. Rows keep their document, block and chunk ids
+    for filtering.
+    """
+
+    def __init__(self, dim=None, capacity=1024, dtype="float32"):
+        """
+        Initialize an empty index.
+
+        Args:
+            dim (int, optional): Embedding dimension; taken from the first add if omitted
+            capacity (int): Initial number of rows to allocate
+            dtype (str): Storage dtype of the matrix: 'float32', 'float16' or 'int8'
+        """
+        self.dtype = check_dtype(dtype)
+        self.doc_ids = []
+        self.texts = []
+        self._doc_lookup = {}
+        self._size = 0
+        self._capacity = max(capacity, 1)
+        self._embeddings = np.zeros((self._capacity, dim), dtype=self.dtype) if dim else None
+        self._scales = np.ones(self._capacity, dtype=np.float32) if self.dtype == "int8" else None
+        self._doc_index = np.zeros(self._capacity, dtype=np.int32)
+        self._block_ids = np.zeros(self._capacity, dtype=np.int32)
+        self._chunk_ids = np.zeros(self._capacity, dtype=np.int32)
+
+    @classmethod
+    def from_document(cls, document, dtype="float32"):
+        """Build an index over the chunks of one chunked Document."""
+        return cls.from_documents([document], dtype=dtype)
+
+    @classmethod
+    def from_documents(cls, documents, dtype="float32"):
+        """
+        Build a corpus-level index over several chunked Documents.
+
+        Args:
+            documents (List[Document]): Documents whose blocks have been chunked
+            dtype (str): Storage dtype of the matrix
+
+        Returns:
+            ChunkIndex: The populated index
+        """
+        documents = list(documents)
+        index = cls(capacity=sum(len(document.get_all_chunks()) for document in documents), dtype=dtype)
+        for document in documents:
+            index.add_document(document)
+        return index
+
+    @classmethod
+    def from_store(cls, store, dtype=None):
+        """
+        Build an index over every row of a ChunkStore.
+
+        Args:
+            store (ChunkStore): Store to index
+            dtype (str, optional): Storage dtype of the matrix (default: the store's dtype)
+
+        Returns:
+            ChunkIndex: The populated index, with rows matching the store rows
+        """
+        index = cls(capacity=len(store), dtype=dtype or store.dtype.name)
+        if len(store):
+            index.add(
+                dequantize(store.embeddings, store.scales),
+                doc_ids=[store.doc_ids[i] for i in store.doc_index],
+                block_ids=store.block_ids,
+                chunk_ids=store.chunk_ids,
+                texts=[store.text(row) for row in range(len(store))]
+            )
+        return index
+
+    @property
+    def dim(self):
+        """Get the embedding dimension, or None while the index is empty."""
+        return self._embeddings.shape[1] if self._embeddings is not None else None
+
+    @property
+    def embeddings(self):
+        """Get the (n_chunks, dim) matrix of normalized embeddings in the storage dtype."""
+        if self._embeddings is None:
+            return np.zeros((0, 0), dtype=self.dtype)
+        return self._embeddings[:self._size]
+
+    @property
+    def scales(self):
+        """Get the per-row scales of an int8 index, or None."""
+        return self._scales[:self._size] if self._scales is not None else None
+
+    def vectors(self, rows):
+        """Get indexed embeddings as float32."""
+        return dequantize(self.embeddings[rows], None if self._scales is None else self._scales[rows])
+
+    @property
+    def block_ids(self):
+        return self._block_ids[:self._size]
+
+    @property
+    def chunk_ids(self):
+        return self._chunk_ids[:self._size]
+
+    def _reserve(self, rows, dim):
+        """Make room for more rows, growing the matrix geometrically."""
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self._capacity, dim), dtype=self.dtype)
+        elif self.dim != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match index dimension {self.dim}")
+
+        needed = self._size + rows
+        if needed <= self._capacity:
+            return
+
+        capacity = max(needed, self._capacity * 2)
+        grown = np.zeros((capacity, dim), dtype=self.dtype)
+        grown[:self._size] = self._embeddings[:self._size]
+        self._embeddings = grown
+        columns = ("_doc_index", "_block_ids", "_chunk_ids") + (("_scales",) if self._scales is not None else ())
+        for name in columns:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+        self._capacity = capacity
+
+    def _doc_position(self, doc_id):
+        position = self._doc_lookup.get(doc_id)
+        if position is None:
+            position = self._doc_lookup[doc_id] = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+        return position
+
+    def add(self, embeddings, doc_ids=None, block_ids=None, chunk_ids=None, texts=None):
+        """
+        Append embeddings and their ids to the index.
+
+        Args:
+            embeddings (np.ndarray): (n, dim) matrix; normalized on the way in
+            doc_ids (str | List[str], optional): Document id for all rows, or one per row
+            block_ids (List[int], optional): Block id per row (-1 if omitted)
+            chunk_ids (List[int], optional): Chunk id per row (-1 if omitted)
+            texts (List[str], optional): Chunk text per row
+
+        Returns:
+            range: Rows of the added embeddings
+        """
+        embeddings, scales = quantize(_normalize(embeddings), self.dtype)
+        n = embeddings.shape[0]
+        first = self._size
+        if n == 0:
+            return range(first, first)
+        self._reserve(n, embeddings.shape[1])
+
+        if doc_ids is None or isinstance(doc_ids, str):
+            doc_ids = [doc_ids] * n
+        rows = slice(first, first + n)
+        self._embeddings[rows] = embeddings
+        if scales is not None:
+            self._scales[rows] = scales
+        self._doc_index[rows] = [self._doc_position(doc_id) for doc_id in doc_ids]
+        self._block_ids[rows] = -1 if block_ids is None else block_ids
+        self._chunk_ids[rows] = -1 if chunk_ids is None else chunk_ids
+        self.texts.extend(texts if texts is not None else [None] * n)
+        self._size += n
+        return range(first, self._size)
+
+    def add_chunks(self, chunks, doc_id=None):
+        """
+        Append chunks to the index, computing missing embeddings.
+
+        Args:
+            chunks (List[Chunk]): Chunks to index
+            doc_id (str, optional): ID of the document the chunks belong to
+
+        Returns:
+            range: Rows of the added chunks
+        """
+        chunks = list(chunks)
+        if not chunks:
+            return range(self._size, self._size)
+        return self.add(
+            np.stack([chunk.get_embedding() for chunk in chunks]),
+            doc_ids=doc_id,
+            block_ids=[-1 if chunk.block_id is None else chunk.block_id for chunk in chunks],
+            chunk_ids=[-1 if chunk.chunk_id is None else chunk.chunk_id for chunk in chunks],
+            texts=[chunk.text for chunk in chunks]
+        )
+
+    def add_document(self, document):
+        """Append every chunk of a chunked Document."""
+        return self.add_chunks(document.get_all_chunks(), doc_id=document.doc_id)
+
+    def _mask(self, doc_id=None, block_id=None):
+        """Get a boolean row mask for the filters, or None when unfiltered."""
+        mask = None
+        if doc_id is not None:
+            doc_ids = [doc_id] if isinstance(doc_id, str) else doc_id
+            positions = [self._doc_lookup[d] for d in doc_ids if d in self._doc_lookup]
+            mask = np.isin(self._doc_index[:self._size], positions)
+        if block_id is not None:
+            block_ids = [block_id] if np.isscalar(block_id) else list(block_id)
+            block_mask = np.isin(self.block_ids, block_ids)
+            mask = block_mask if mask is None else mask & block_mask
+        return mask
+
+    def search(self, queries, k=5, doc_id=None, block_id=None, exclude=None):
+        """
+        Find the k most similar chunks for each query embedding.
+
+        Args:
+            queries (np.ndarray): (dim,) vector or (n_queries, dim) matrix
+            k (int): Number of results per query
+            doc_id (str | List[str], optional): Only search these documents
+            block_id (int | List[int], optional): Only search these block ids
+            exclude (List[int], optional): Row per query to leave out (e.g. the query chunk itself)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (n_queries, k) cosine scores and rows, best first;
+            rows are -1 (score -inf) when fewer than k chunks match
+        """
+        queries = _normalize(queries)
+        n_queries = queries.shape[0]
+        scores_out = np.full((n_queries, k), -np.inf, dtype=np.float32)
+        rows_out = np.full((n_queries, k), -1, dtype=np.int64)
+        if self._size == 0 or k <= 0:
+            return scores_out, rows_out
+
+        mask = self._mask(doc_id, block_id)
+        candidates = np.flatnonzero(mask) if mask is not None else None
+        matrix = self.embeddings if candidates is None else self.embeddings[candidates]
+        scales = self.scales if candidates is None or self._scales is None else self.scales[candidates]
+        if matrix.shape[0] == 0:
+            return scores_out, rows_out
+
+        with span("search"):
+            scores = quantized_dot(queries, matrix, scales)
+            if exclude is not None:
+                for i, row in enumerate(exclude):
+                    if row is None or row < 0:
+                        continue
+                    column = row if candidates is None else np.searchsorted(candidates, row)
+                    if column < scores.shape[1] and (candidates is None or candidates[column] == row):
+                        scores[i, column] = -np.inf
+
+            kk = min(k, scores.shape[1])
+            if kk < scores.shape[1]:
+                top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            else:
+                top = np.broadcast_to(np.arange(kk), (n_queries, kk))
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        rows = top if candidates is None else candidates[top]
+        valid = np.isfinite(top_scores)
+        scores_out[:, :kk] = top_scores
+        rows_out[:, :kk] = np.where(valid, rows, -1)
+        incr("search_queries", n_queries)
+        return scores_out, rows_out
+
+    def query(self, texts, model, k=5, doc_id=None, block_id=None):
+        """
+        Encode query texts and return their top-k matches.
+
+        Args:
+            texts (str | List[str]): Query text(s)
+            model: Encoder with encode(sentences)
+            k (int): Number of results per query
+            doc_id (str | List[str], optional): Only search these documents
+            block_id (int | List[int], optional): Only search these block ids
+
+        Returns:
+            List[List[dict]]: Hits per query, best first
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        scores, rows = self.search(model.encode(texts), k=k, doc_id=doc_id, block_id=block_id)
+        return self.hits(scores, rows)
+
+    def related(self, rows, k=5, same_doc=False):
+        """
+        Find the chunks most similar to already indexed chunks.
+
+        Args:
+            rows (int | List[int]): Rows of the chunks to start from
+            k (int): Number of related chunks per row (the chunk itself is excluded)
+            same_doc (bool): Only return chunks from the same document
+
+        Returns:
+            List[List[dict]]: Hits per row, best first
+        """
+        rows = [rows] if np.isscalar(rows) else list(rows)
+        if not same_doc:
+            scores, found = self.search(self.vectors(rows), k=k, exclude=rows)
+            return self.hits(scores, found)
+
+        results = []
+        for row in rows:
+            scores, found = self.search(self.vectors(row), k=k, doc_id=self.doc_id(row), exclude=[row])
+            results.extend(self.hits(scores, found))
+        return results
+
+    def hits(self, scores, rows):
+        """Turn search() output into lists of hit dicts."""
+        results = []
+        for query_scores, query_rows in zip(scores, rows):
+            results.append([
+                {
+                    "row": int(row),
+                    "score": float(score),
+                    "doc_id": self.doc_id(row),
+                    "block_id": int(self._block_ids[row]),
+                    "chunk_id": int(self._chunk_ids[row]),
+                    "text": self.texts[row],
+                }
+                for score, row in zip(query_scores, query_rows) if row >= 0
+            ])
+        return results
+
+    def doc_id(self, row):
+        """Get the document ID of an indexed row."""
+        return self.doc_ids[self._doc_index[row]]
+
+    def __len__(self):
+        return self._size
+
+    def save(self, path):
+        """
+        Save the index to a directory.
+
+        Args:
+            path (str): Directory to write to
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "embeddings.npy"), self.embeddings)
+        np.save(os.path.join(path, "doc_index.npy"), self._doc_index[:self._size])
+        np.save(os.path.join(path, "block_ids.npy"), self.block_ids)
+        np.save(os.path.join(path, "chunk_ids.npy"), self.chunk_ids)
+        if self._scales is not None:
+            np.save(os.path.join(path, "scales.npy"), self.scales)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"doc_ids": self.doc_ids, "texts": self.texts, "dtype": self.dtype}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """
+        Load an index saved with save().
+
+        Args:
+            path (str): Directory to read from
+            mmap (bool): Memory-map the embedding matrix (read-only; further adds copy it)
+
+        Returns:
+            ChunkIndex: The loaded index
+        """
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        index = cls(capacity=1, dtype=meta.get("dtype", "float32"))
+        embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r" if mmap else None)
+        if embeddings.shape[0] == 0:
+            return index
+        index._size = index._capacity = embeddings.shape[0]
+        index._embeddings = embeddings
+        index._doc_index = np.load(os.path.join(path, "doc_index.npy"))
+        index._block_ids = np.load(os.path.join(path, "block_ids.npy"))
+        index._chunk_ids = np.load(os.path.join(path, "chunk_ids.npy"))
+        if index._scales is not None:
+            index._scales = np.load(os.path.join(path, "scales.npy"))
+        index.doc_ids = meta["doc_ids"]
+        index.texts = meta["texts"]
+        index._doc_lookup = {doc_id: i for i, doc_id in enumerate(index.doc_ids)}
+        return index
+
+    def to_chroma(self, path, collection_name="chunks", batch_size=1024):
+        """
+        Persist the index into a Chroma collection (requires chromadb).
+
+        Args:
+            path (str): Chroma persistence directory
+            collection_name (str): Collection to upsert into
+            batch_size (int): Rows per upsert call
+
+        Returns:
+            The Chroma collection
+        """
+        collection = _chroma_collection(path, collection_name)
+        for start in range(0, self._size, batch_size):
+            rows = range(start, min(start + batch_size, self._size))
+            collection.upsert(
+                ids=[self._chroma_id(row) for row in rows],
+                embeddings=self.vectors(slice(start, rows.stop)).tolist(),
+                metadatas=[
+                    {"doc_id": str(self.doc_id(row)), "block_id": int(self._block_ids[row]),
+                     "chunk_id": int(self._chunk_ids[row])}
+                    for row in rows
+                ],
+                documents=[self.texts[row] or "" for row in rows]
+            )
+        return collection
+
+    @classmethod
+    def from_chroma(cls, path, collection_name="chunks", dtype="float32"):
+        """
+        Load an index from a Chroma collection written by to_chroma() (requires chromadb).
+
+        Args:
+            path (str): Chroma persistence directory
+            collection_name (str): Collection to read
+            dtype (str): Storage dtype of the matrix
+
+        Returns:
+            ChunkIndex: The loaded index
+        """
+        collection = _chroma_collection(path, collection_name)
+        data = collection.get(include=["embeddings", "metadatas", "documents"])
+        index = cls(capacity=len(data["ids"]), dtype=dtype)
+        if data["ids"]:
+            metadatas = data["metadatas"]
+            index.add(
+                np.asarray(data["embeddings"], dtype=np.float32),
+                doc_ids=[m.get("doc_id") for m in metadatas],
+                block_ids=[m.get("block_id", -1) for m in metadatas],
+                chunk_ids=[m.get("chunk_id", -1) for m in metadatas],
+                texts=data["documents"]
+            )
+        return index
+
+    def _chroma_id(self, row):
+        return f"{self.doc_id(row)}:{self._block_ids[row]}:{self._chunk_ids[row]}:{row}"
+
+    def __repr__(self):
+        return f"ChunkIndex(chunks={self._size}, dim={self.dim}, dtype={self.dtype}, docs={len(self.doc_ids)})"
+
+
+def _chroma_collection(path, collection_name):
+    """Open (or create) a cosine-space Chroma collection."""
+    try:
+        import chromadb
+    except ImportError as error:
+        raise ImportError("The Chroma backend requires chromadb (pip install chromadb)") from error
+
+    client = chromadb.PersistentClient(path=path)
+    return client.get_or_create_collection(collection_name, metadata={"hnsw:space": "cosine"})
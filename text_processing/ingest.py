@@ -0,0 +1,571 @@
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from text_processing.batch import _convert_worker, _init_convert_worker, find_pdfs, source_root
+from text_processing.chunkers import SemanticChunker
+from text_processing.conversion_cache import file_hash
+from text_processing.doc_models.documents import Document
+from text_processing.incremental import ChunkManifest, rechunk_document
+from text_processing.metrics import incr, span
+from text_processing.writers import ChunkWriter, _atomic_write
+
+# Pipeline stages in order; a job's stage is the last one it completed
+STAGES = ("new", "converted", "blocked", "chunked", "exported")
+
+# Job statuses: waiting to run, in progress, waiting to be retried, finished, given up on
+STATUSES = ("queued", "running", "retry", "done", "failed")
+
+
+class JobQueue:
+    """
+    A persistent SQLite table of ingestion jobs, one per source file.
+
+    Each job records the last pipeline stage it completed, so work
+    interrupted by a crash or restart resumes from that stage.
+    """
+
+    def __init__(self, path="data/cache/jobs.sqlite"):
+        """
+        Initialize the job queue.
+
+        Args:
+            path (str): SQLite file to store jobs in
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY,"
+            " path TEXT NOT NULL UNIQUE,"
+            " hash TEXT NOT NULL,"
+            " mtime REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt REAL NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " pages INTEGER,"
+            " blocks INTEGER,"
+            " chunks INTEGER,"
+            " seconds REAL NOT NULL DEFAULT 0,"
+            " queued_at REAL NOT NULL,"
+            " finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, next_attempt)")
+        self._conn.commit()
+
+    def known(self, path):
+        """Get the (mtime, size) recorded for a file, or None if it has no job."""
+        with self._lock:
+            row = self._conn.execute("SELECT mtime, size FROM jobs WHERE path = ?", (path,)).fetchone()
+        return (row["mtime"], row["size"]) if row is not None else None
+
+    def enqueue(self, path, content_hash, mtime, size):
+        """
+        Add a job for a new file, or restart the job of a file whose content changed.
+
+        Args:
+            path (str): Source file
+            content_hash (str): Hash of the file content
+            mtime (float): Modification time, to skip hashing unchanged files on the next scan
+            size (int): File size in bytes
+
+        Returns:
+            bool: True if a job was queued
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT hash FROM jobs WHERE path = ?", (path,)).fetchone()
+            if row is not None and row["hash"] == content_hash:
+                # Touched but not changed
+                self._conn.execute("UPDATE jobs SET mtime = ?, size = ? WHERE path = ?", (mtime, size, path))
+                self._conn.commit()
+                return False
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO jobs (path, hash, mtime, size, stage, status, queued_at) "
+                    "VALUES (?, ?, ?, ?, 'new', 'queued', ?)",
+                    (path, content_hash, mtime, size, now)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET hash = ?, mtime = ?, size = ?, stage = 'new', status = 'queued',"
+                    " attempts = 0, next_attempt = 0, error = NULL, pages = NULL, blocks = NULL, chunks = NULL,"
+                    " seconds = 0, queued_at = ?, finished_at = NULL WHERE path = ?",
+                    (content_hash, mtime, size, now, path)
+                )
+            self._conn.commit()
+        incr("ingest_jobs_queued")
+        return True
+
+    def claim(self, limit=1):
+        """
+        Mark the oldest ready jobs as running and return them.
+
+        Args:
+            limit (int): Maximum number of jobs to claim
+
+        Returns:
+            List[dict]: Claimed jobs
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'retry') AND next_attempt <= ?"
+                " ORDER BY queued_at, id LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+            self._conn.executemany("UPDATE jobs SET status = 'running' WHERE id = ?", [(row["id"],) for row in rows])
+            self._conn.commit()
+        return [dict(row, status="running") for row in rows]
+
+    def checkpoint(self, job_id, stage, seconds=0.0, **counts):
+        """
+        Record that a job completed a stage.
+
+        Args:
+            job_id (int): Job to update
+            stage (str): Completed stage from STAGES
+            seconds (float): Processing time to add to the job
+            **counts: pages, blocks or chunks produced so far
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage '{stage}', expected one of {STAGES}")
+        assignments = ", ".join(f"{name} = ?" for name in counts)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET stage = ?, seconds = seconds + ?{', ' + assignments if counts else ''} WHERE id = ?",
+                (stage, seconds, *counts.values(), job_id)
+            )
+            self._conn.commit()
+
+    def finish(self, job_id):
+        """Mark a job as done."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', error = NULL, finished_at = ? WHERE id = ?", (time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def fail(self, job_id, error, max_attempts=5, backoff_seconds=30, max_backoff_seconds=3600):
+        """
+        Record a failed attempt and schedule a retry with exponential backoff.
+
+        The job keeps its stage, so the retry resumes after the last checkpoint.
+
+        Args:
+            job_id (int): Job that failed
+            error (str): Error message
+            max_attempts (int): Attempts before the job is given up on
+            backoff_seconds (float): Delay before the first retry, doubled on each further attempt
+            max_backoff_seconds (float): Longest delay between attempts
+
+        Returns:
+            str: New status, 'retry' or 'failed'
+        """
+        with self._lock:
+            attempts = self._conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] + 1
+            status = "failed" if attempts >= max_attempts else "retry"
+            delay = min(backoff_seconds * 2 ** (attempts - 1), max_backoff_seconds)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, next_attempt = ?, error = ? WHERE id = ?",
+                (status, attempts, time.time() + delay, error, job_id)
+            )
+            self._conn.commit()
+        return status
+
+    def release(self, job_id):
+        """Put a claimed job back in the queue without counting an attempt."""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'queued' WHERE id = ? AND status = 'running'", (job_id,))
+            self._conn.commit()
+
+    def recover(self):
+        """
+        Requeue jobs left running by a process that stopped, keeping their stage.
+
+        Returns:
+            int: Number of jobs requeued
+        """
+        with self._lock:
+            count = self._conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+            self._conn.commit()
+        return count
+
+    def get(self, path):
+        """Get the job of a file as a dict, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE path = ?", (str(path),)).fetchone()
+        return dict(row) if row is not None else None
+
+    def stats(self, window_seconds=3600):
+        """
+        Get job counts and throughput.
+
+        Args:
+            window_seconds (float): Window for the recent documents-per-hour rate
+
+        Returns:
+            dict: Jobs per status and per stage (unfinished jobs), and throughput of finished jobs
+        """
+        with self._lock:
+            statuses = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            stages = dict(self._conn.execute(
+                "SELECT stage, COUNT(*) FROM jobs WHERE status != 'done' GROUP BY stage"
+            ).fetchall())
+            done = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pages), 0), COALESCE(SUM(chunks), 0), COALESCE(SUM(seconds), 0)"
+                " FROM jobs WHERE status = 'done'"
+            ).fetchone()
+            recent = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'done' AND finished_at >= ?", (time.time() - window_seconds,)
+            ).fetchone()[0]
+        documents, pages, chunks, seconds = done
+        return {
+            "statuses": {status: statuses.get(status, 0) for status in STATUSES},
+            "stages": {stage: stages[stage] for stage in STAGES if stage in stages},
+            "documents": documents,
+            "pages": pages,
+            "chunks": chunks,
+            "seconds": seconds,
+            "pages_per_sec": pages / seconds if seconds else 0.0,
+            "seconds_per_document": seconds / documents if documents else 0.0,
+            "documents_per_hour": recent * 3600 / window_seconds,
+        }
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def __repr__(self):
+        return f"JobQueue(path={self.path!r})"
+
+
+def format_stats(stats):
+    """Render JobQueue.stats() as one line."""
+    statuses = ", ".join(f"{count} {status}" for status, count in stats["statuses"].items() if count)
+    return (f"Jobs: {statuses or 'none'}; {stats['documents']} documents, {stats['pages']} pages, "
+            f"{stats['chunks']} chunks done, {stats['pages_per_sec']:.2f} pages/sec, "
+            f"{stats['seconds_per_document']:.1f}s/document, {stats['documents_per_hour']:.1f} documents/hour")
+
+
+class Ingestor:
+    """
+    Ingests the PDFs dropped into a directory as resumable jobs.
+
+    Each scan queues new or changed files. Conversions run in a bounded
+    process pool while blocking, chunking and export run in the calling
+    thread with one shared chunker, as in batch mode. Every stage is
+    checkpointed: converted markdown is saved to the work directory and
+    chunks to the incremental chunk manifest, so a restarted job skips
+    conversion and encoding it has already done.
+    """
+
+    def __init__(self, source, queue=None, chunker=None, writer=None, work_dir="data/cache/ingest", max_workers=2,
+                 max_attempts=5, backoff_seconds=30, max_backoff_seconds=3600, similarity_threshold=0.45,
+                 block_min_words=150, text_layer=False):
+        """
+        Initialize the ingestor.
+
+        Args:
+            source (str | Path): Directory (or glob) to scan for PDFs
+            queue (JobQueue, optional): Job table (default: data/cache/jobs.sqlite)
+            chunker (SemanticChunker, optional): Shared chunker
+            writer (ChunkWriter, optional): Writer for the chunk outputs
+            work_dir (str): Directory for converted-markdown checkpoints
+            max_workers (int): Conversions running at once
+            max_attempts (int): Attempts per job before it is marked failed
+            backoff_seconds (float): Delay before the first retry, doubled on each further attempt
+            max_backoff_seconds (float): Longest delay between attempts
+            similarity_threshold (float): Similarity threshold for splitting
+            block_min_words (int): Minimum words per block
+            text_layer (bool): Extract born-digital pages from the PDF text layer instead of with marker
+        """
+        self.source = source
+        self.queue = queue if queue is not None else JobQueue()
+        self.chunker = chunker if chunker is not None else SemanticChunker()
+        self.writer = writer if writer is not None else ChunkWriter()
+        self.work_dir = work_dir
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.similarity_threshold = similarity_threshold
+        self.block_min_words = block_min_words
+        self.text_layer = text_layer
+        self.root = source_root(source)
+        self._pool = None
+        # Jobs that were converting when a worker died; each converts alone until it finishes or fails alone
+        self._suspects = set()
+
+    @property
+    def pool(self):
+        """Get the conversion process pool, started on first use and kept across scans."""
+        if self._pool is None:
+            # Spawn keeps torch state out of the workers
+            context = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=context,
+                initializer=None if self.text_layer else _init_convert_worker
+            )
+        return self._pool
+
+    def scan(self):
+        """
+        Queue new or changed PDFs in the source directory.
+
+        Files whose modification time and size match their job are not re-hashed.
+
+        Returns:
+            int: Number of jobs queued
+        """
+        queued = 0
+        for file_path in find_pdfs(self.source):
+            path = str(file_path)
+            try:
+                stat = os.stat(path)
+                if self.queue.known(path) == (stat.st_mtime, stat.st_size):
+                    continue
+                queued += self.queue.enqueue(path, file_hash(path), stat.st_mtime, stat.st_size)
+            except OSError:
+                # Removed or still being copied; the next scan will see it
+                continue
+        return queued
+
+    def output_name(self, path):
+        """
+        Get the base output name and doc_id of a PDF, unique within the source.
+
+        Files directly under the source keep the writer's name; files in
+        subdirectories of a recursive glob are prefixed with their
+        directories, so a/report.pdf and b/report.pdf get their own
+        outputs and chunk manifests.
+
+        Args:
+            path (str): PDF path
+
+        Returns:
+            str: Base output name
+        """
+        relative = os.path.splitext(os.path.relpath(path, self.root))[0]
+        return relative.replace(os.sep, "__")
+
+    def _markdown_path(self, job):
+        return os.path.join(self.work_dir, f"job-{job['id']}.md")
+
+    def _converted_markdown(self, job):
+        """Get the saved markdown of a job that was converted before it stopped, if any."""
+        if STAGES.index(job["stage"]) < STAGES.index("converted"):
+            return None
+        try:
+            with open(self._markdown_path(job), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def run_pending(self):
+        """
+        Process every ready job, converting at most max_workers files at a time.
+
+        Returns:
+            int: Number of jobs completed
+        """
+        completed = 0
+        pending = {}
+        while True:
+            while len(pending) < self.max_workers and not self._isolating(pending):
+                jobs = self.queue.claim(1)
+                if not jobs:
+                    break
+                job = jobs[0]
+                if job["id"] in self._suspects and pending:
+                    # Wait for the others, so a crash is only charged to the file that caused it
+                    self.queue.release(job["id"])
+                    break
+                if job["stage"] == "exported":
+                    # Stopped between writing the outputs and marking the job done
+                    self.queue.finish(job["id"])
+                    completed += 1
+                    continue
+                markdown = self._converted_markdown(job)
+                if markdown is None:
+                    try:
+                        future = self.pool.submit(_convert_worker, job["path"], self.text_layer)
+                    except BrokenProcessPool:
+                        # Not this job's fault: give it back and convert it in a fresh pool
+                        self._reset_pool()
+                        self.queue.release(job["id"])
+                        continue
+                    pending[future] = (job, time.perf_counter())
+                else:
+                    # Converted before a restart or failure: resume from the saved markdown
+                    completed += self._process_converted(job, markdown)
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future not in pending:
+                    # Already failed with a broken pool
+                    continue
+                job, started = pending.pop(future)
+                try:
+                    markdown, page_count, _ = future.result()
+                except BrokenProcessPool as error:
+                    # A dead worker (e.g. OOM-killed) takes every conversion in flight with it;
+                    # they all retry with backoff in a fresh pool, one at a time
+                    self._reset_pool()
+                    for failed_job, _ in [(job, started), *pending.values()]:
+                        self._suspects.add(failed_job["id"])
+                        self._fail(failed_job, error)
+                    pending.clear()
+                    continue
+                except Exception as error:
+                    self._suspects.discard(job["id"])
+                    self._fail(job, error)
+                    continue
+                self._suspects.discard(job["id"])
+                try:
+                    os.makedirs(self.work_dir, exist_ok=True)
+                    payload = markdown.encode("utf-8")
+                    _atomic_write(self._markdown_path(job), lambda f: f.write(payload))
+                    self.queue.checkpoint(job["id"], "converted", time.perf_counter() - started, pages=page_count)
+                except Exception as error:
+                    self._fail(job, error)
+                    continue
+                completed += self._process_converted(job, markdown)
+        return completed
+
+    def _isolating(self, pending):
+        """Check whether a job suspected of crashing a worker is converting, which it then does alone."""
+        return any(job["id"] in self._suspects for job, _ in pending.values())
+
+    def _process_converted(self, job, markdown):
+        """Run the stages after conversion; returns True if the job finished."""
+        started = time.perf_counter()
+        try:
+            name = self.output_name(job["path"])
+            document = Document(markdown, doc_id=name)
+            # Blocks are cheap and deterministic, so they are rebuilt from the markdown on resume
+            blocks = document.create_blocks(min_words=self.block_min_words)
+            self.queue.checkpoint(job["id"], "blocked", blocks=len(blocks))
+
+            # The chunk manifest is the chunk checkpoint: a resumed job reuses every block's chunks,
+            # and a changed file re-chunks only the blocks that changed
+            with span("chunk"):
+                manifest, _ = rechunk_document(
+                    document, self.chunker,
+                    manifest=ChunkManifest.load(self.writer.output_dir, name),
+                    similarity_threshold=self.similarity_threshold
+                )
+            manifest.save(self.writer.output_dir, name)
+            self.queue.checkpoint(job["id"], "chunked", chunks=len(document.get_all_chunks()))
+
+            with span("write"):
+                self.writer.write(document, job["path"], name=name)
+            self.queue.checkpoint(job["id"], "exported", time.perf_counter() - started)
+            self.queue.finish(job["id"])
+        except Exception as error:
+            self._fail(job, error)
+            return False
+
+        try:
+            os.remove(self._markdown_path(job))
+        except OSError:
+            pass
+        incr("ingest_jobs_done")
+        return True
+
+    def _fail(self, job, error):
+        status = self.queue.fail(
+            job["id"], repr(error),
+            max_attempts=self.max_attempts,
+            backoff_seconds=self.backoff_seconds,
+            max_backoff_seconds=self.max_backoff_seconds
+        )
+        incr("ingest_job_failures")
+        print(f"{job['path']}: {error!r} ({'giving up' if status == 'failed' else 'will retry'})")
+
+    def tick(self):
+        """
+        One scheduled run: queue new or changed PDFs and process every ready job.
+
+        Returns:
+            dict: Queue stats after the run
+        """
+        queued = self.scan()
+        completed = self.run_pending()
+        stats = self.queue.stats()
+        if queued or completed:
+            print(f"[{datetime.now():%H:%M:%S}] {queued} queued, {completed} completed. {format_stats(stats)}")
+        return stats
+
+    def run_once(self):
+        """
+        Resume interrupted jobs, scan once and process everything that is ready.
+
+        Returns:
+            dict: Queue stats after the run
+        """
+        self.queue.recover()
+        try:
+            return self.tick()
+        finally:
+            self.close()
+
+    def start(self, interval=60):
+        """
+        Scan and process on a schedule until interrupted.
+
+        Args:
+            interval (float): Seconds between scans
+        """
+        # APScheduler is only needed by the daemon
+        from apscheduler.schedulers.blocking import BlockingScheduler
+
+        recovered = self.queue.recover()
+        if recovered:
+            print(f"Resuming {recovered} interrupted jobs")
+        scheduler = BlockingScheduler()
+        # A slow run delays the next scan instead of overlapping it
+        scheduler.add_job(self.tick, "interval", seconds=interval, id="ingest", max_instances=1, coalesce=True,
+                          next_run_time=datetime.now())
+        try:
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.close()
+
+    def _reset_pool(self):
+        """Drop a broken pool; the next submit starts a fresh one."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def close(self):
+        """Stop the conversion processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __repr__(self):
+        return f"Ingestor(source={self.source!r}, max_workers={self.max_workers})"
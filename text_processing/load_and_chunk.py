@@ -1,70 +1,168 @@
 import os
 
-from marker.config.parser import ConfigParser
-from marker.converters.pdf import PdfConverter
-from marker.models import create_model_dict
-
 from text_processing.chunkers import SemanticChunker
+from text_processing.conversion_cache import get_conversion_cache
+from text_processing.converters import (
+    PAGES_PER_RANGE, ConverterManager, ParallelConversion, get_converter_manager, split_options
+)
+from text_processing.dedup import DedupChunker
 from text_processing.doc_models.documents import Document
+from text_processing.incremental import ChunkManifest, rechunk_document
+from text_processing.metrics import incr, span
+from text_processing.text_layer import TextLayerReport, convert_with_text_layer
+from text_processing.writers import ChunkWriter
 
 
-def pdf2markdown(file_path, output_format="markdown"):
+def _cached_rendering(file_path, output_format, cache, text_layer=False, options=None):
+    """Look a conversion up in the cache; returns (cache, key, rendering or None)."""
+    if cache is None:
+        cache = get_conversion_cache()
+    if not cache or output_format != "markdown":
+        return None, None, None
+    # Text-layer extraction and stitched page ranges produce different markdown, so they are cached separately
+    options = dict(options or {})
+    if text_layer:
+        options["text_layer"] = True
+    key = cache.key(file_path, ConverterManager.build_config(output_format, **options))
+    rendered_file = cache.get(key)
+    incr('conversion_cache_hits' if rendered_file is not None else 'conversion_cache_misses')
+    return cache, key, rendered_file
 
-    config = {
-        "output_format": output_format,
-        "ADDITIONAL_KEY": "VALUE"
-    }
-    config_parser = ConfigParser(config)
 
-    converter = PdfConverter(
-        config=config_parser.generate_config_dict(),
-        artifact_dict=create_model_dict(),
-        processor_list=config_parser.get_processors(),
-        renderer=config_parser.get_renderer(),
-        llm_service=config_parser.get_llm_service()
+def pdf2markdown(file_path, output_format="markdown", manager=None, cache=None, workers=None,
+                 pages_per_range=PAGES_PER_RANGE, text_layer=False):
+    text_layer = text_layer and output_format == "markdown"
+    page_ranges = not text_layer and workers is not None and workers > 1 and output_format == "markdown"
+    # Unchanged PDFs are served from the conversion cache; pass cache=False to bypass it
+    cache, key, rendered_file = _cached_rendering(
+        file_path, output_format, cache, text_layer,
+        options=split_options(workers, pages_per_range) if page_ranges else None
     )
+    if rendered_file is not None:
+        return rendered_file
+
+    # Models are loaded once per process and converters reused across files
+    if manager is None:
+        manager = get_converter_manager()
+    with span('convert'):
+        if text_layer:
+            # Born-digital pages skip marker; only scanned or complex pages are converted by it
+            rendered_file = convert_with_text_layer(file_path, manager=manager)
+        elif page_ranges:
+            # Long PDFs are split into page ranges converted by several processes
+            rendered_file = ParallelConversion(file_path, workers, pages_per_range, manager=manager).run()
+        else:
+            rendered_file = manager.convert(file_path, output_format=output_format)
 
-    rendered_file = converter(filepath=str(file_path))
+    if key is not None:
+        cache.put(key, rendered_file)
     return rendered_file
 
 
-def process_and_chunk_document(file_path, similarity_threshold=0.45):
-    # Extract text from the rendered file
-    rendered_file = pdf2markdown(file_path)
-    sample_text = rendered_file.markdown
-
-    # Create document and process it
-    document = Document(sample_text, doc_id="sample_doc")
-    
-    # Step 1: Split into blocks
-    blocks = document.create_blocks(min_words=150)  # Lower threshold for demo
-        
-    # Step 2: Split each block into chunks
-    chunker = SemanticChunker()
-    for block in blocks:
-        chunks = block.create_chunks(chunker, similarity_threshold=0.45)
-        
-        # Prepare output directory and file path
-        output_dir = "data/results"
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(
-            output_dir,
-            os.path.splitext(os.path.basename(file_path))[0] + "_chunks.txt"
-        )
-
-        # Collect result strings
-        result_lines = []
-        result_lines.append(f"Block {block.block_id} ('{block.start_header}') split into {len(chunks)} chunks:")
-        for chunk in chunks:
-            result_lines.append(f"  Chunk {chunk.chunk_id}: {chunk.word_count} words")
-            result_lines.append(chunk.text)
-            result_lines.append("")  # Separate chunks
-
-        result_lines.append("")  # Separate blocks
-
-        # Write results to file (append mode)
-        with open(output_file, "a", encoding="utf-8") as f:
-            f.write("\n".join(result_lines))
-        print(f"Processed and chunked document saved to: {output_file}")
-
-    return document
\ No newline at end of file
+def stream_and_chunk_document(file_path, chunker, similarity_threshold=0.45, workers=None,
+                              pages_per_range=PAGES_PER_RANGE, block_min_words=150, cache=None):
+    """
+    Convert a PDF as parallel page ranges and chunk it while the conversion runs.
+
+    Each range is split into blocks and chunked as soon as it and every
+    range before it are converted, so encoding overlaps with conversion.
+
+    Args:
+        file_path (str | Path): PDF to convert
+        chunker (SemanticChunker): The chunker to use
+        similarity_threshold (float): Similarity threshold for splitting
+        workers (int, optional): Conversion processes (default: CPU count)
+        pages_per_range (int): Largest page range per conversion task
+        block_min_words (int): Minimum words per block
+        cache (ConversionCache, optional): Conversion cache; False to bypass it
+
+    Returns:
+        Document: The chunked document, with its blocks and full markdown
+    """
+    doc_id = os.path.splitext(os.path.basename(str(file_path)))[0]
+    cache, key, rendered_file = _cached_rendering(
+        file_path, "markdown", cache, options=split_options(workers or os.cpu_count() or 1, pages_per_range)
+    )
+    if rendered_file is not None:
+        document = Document(rendered_file.markdown, doc_id=doc_id)
+        document.create_blocks(min_words=block_min_words)
+        with span('chunk'):
+            chunker.chunk_document(document, similarity_threshold=similarity_threshold)
+        return document
+
+    conversion = ParallelConversion(file_path, workers, pages_per_range)
+    document = Document.from_source(conversion.iter_lines(), doc_id=doc_id)
+    with span('convert_and_chunk'):
+        for _ in document.iter_chunks(chunker, similarity_threshold=similarity_threshold,
+                                      block_min_words=block_min_words, keep_blocks=True):
+            pass
+    document.text = conversion.rendering.markdown
+
+    if key is not None:
+        cache.put(key, conversion.rendering)
+    return document
+
+
+def process_and_chunk_document(file_path, similarity_threshold=0.45, chunker=None, writer=None, deduplicator=None,
+                               incremental=False, workers=None, text_layer=False):
+    if chunker is None:
+        chunker = SemanticChunker()
+    if writer is None:
+        writer = ChunkWriter()
+    doc_id = os.path.splitext(os.path.basename(str(file_path)))[0]
+    if deduplicator is not None:
+        # Near-duplicate blocks (e.g. boilerplate) are marked or dropped before they are encoded
+        chunker = DedupChunker(chunker, deduplicator, doc_id)
+
+    try:
+        if workers is not None and workers > 1 and not incremental and not text_layer:
+            # Steps 1 and 2 run while later page ranges are still converting
+            document = stream_and_chunk_document(file_path, chunker, similarity_threshold=similarity_threshold,
+                                                 workers=workers)
+        else:
+            # Extract text from the rendered file
+            rendered_file = pdf2markdown(file_path, workers=workers, text_layer=text_layer)
+            sample_text = rendered_file.markdown
+            if "text_layer" in rendered_file.metadata:
+                print(TextLayerReport.from_dict(rendered_file.metadata["text_layer"]))
+
+            # Create document and process it
+            document = Document(sample_text, doc_id=doc_id)
+
+            # Step 1: Split into blocks
+            document.create_blocks(min_words=150)  # Lower threshold for demo
+
+            # Step 2: Split all blocks into chunks with one encode pass
+            if incremental:
+                # Reuse the previous run's chunks for blocks whose content is unchanged
+                name = writer.output_name(file_path)
+                with span('chunk'):
+                    manifest, diff = rechunk_document(
+                        document, chunker,
+                        manifest=ChunkManifest.load(writer.output_dir, name),
+                        similarity_threshold=similarity_threshold
+                    )
+                print(diff)
+            else:
+                with span('chunk'):
+                    chunker.chunk_document(document, similarity_threshold=similarity_threshold)
+
+        # Then mark or drop remaining chunks that repeat earlier ones
+        if deduplicator is not None:
+            deduplicator.process(document)
+
+        # Step 3: Write chunk records and embeddings, replacing earlier runs
+        with span('write'):
+            paths = writer.write(document, file_path)
+            if incremental:
+                manifest.save(writer.output_dir, name)
+                diff.save(os.path.join(writer.output_dir, f"{name}_diff.json"))
+    except Exception:
+        if deduplicator is not None:
+            # Later duplicates must not point at a document that was never written
+            deduplicator.discard([], doc_id)
+        raise
+
+    print(f"Processed and chunked document saved to: {', '.join(paths.values())}")
+
+    return document
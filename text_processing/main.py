@@ -1,17 +1,169 @@
+import argparse
 import os
 import sys
 from pathlib import Path
 
-from text_processing.load_and_chunk import process_and_chunk_document
 
+def make_deduplicator(mode):
+    if mode is None:
+        return None
+    from text_processing.dedup import Deduplicator
 
-def runner():
+    return Deduplicator(mode=mode)
+
+
+def make_chunker_and_writer(embedding_dtype):
+    if embedding_dtype == "float32":
+        return None, None
+    from text_processing.chunkers import SemanticChunker
+    from text_processing.writers import ChunkWriter
+
+    return SemanticChunker(embedding_dtype=embedding_dtype), ChunkWriter(embedding_dtype=embedding_dtype)
+
+
+def runner(similarity_threshold=0.45, dedup=None, incremental=False, embedding_dtype="float32", page_workers=None,
+           text_layer=False):
+    # Heavy pipeline modules are imported on demand so the CLI starts fast
+    from text_processing.converters import get_converter_manager
+    from text_processing.load_and_chunk import process_and_chunk_document
+
+    # Pay the marker model-load cost up front (page-range workers load their own, and the
+    # text-layer path may not need marker at all)
+    if (not page_workers or page_workers <= 1) and not text_layer:
+        get_converter_manager().warm_up()
     # change filepath
     file_path = Path(os.getcwd()) / "data/sample_pdf/What_is_Sustainability-1.pdf"
-    document = process_and_chunk_document(file_path, similarity_threshold=0.45)
+    deduplicator = make_deduplicator(dedup)
+    chunker, writer = make_chunker_and_writer(embedding_dtype)
+    document = process_and_chunk_document(file_path, similarity_threshold=similarity_threshold,
+                                          chunker=chunker, writer=writer,
+                                          deduplicator=deduplicator, incremental=incremental,
+                                          workers=page_workers, text_layer=text_layer)
     print(document)
     all_chunks = document.get_all_chunks()
     print(f"Total chunks created: {len(all_chunks)}")
+    if deduplicator is not None:
+        print(deduplicator.report)
+
+
+def batch_runner(source, workers=None, similarity_threshold=0.45, dedup=None, embedding_dtype="float32",
+                 text_layer=False):
+    from text_processing.batch import run_batch
+
+    deduplicator = make_deduplicator(dedup)
+    chunker, writer = make_chunker_and_writer(embedding_dtype)
+    report = run_batch(source, similarity_threshold=similarity_threshold, max_workers=workers,
+                       chunker=chunker, writer=writer, deduplicator=deduplicator, text_layer=text_layer)
+    print(report)
+    if deduplicator is not None:
+        print(deduplicator.report)
+    return report
+
+
+def drift_runner(similarity_threshold=0.45):
+    from text_processing.chunkers import SemanticChunker
+    from text_processing.load_and_chunk import pdf2markdown
+    from text_processing.doc_models.documents import Document
+    from text_processing.quantization import drift_report, format_drift_report
+
+    file_path = Path(os.getcwd()) / "data/sample_pdf/What_is_Sustainability-1.pdf"
+    document = Document(pdf2markdown(file_path).markdown, doc_id=file_path.stem)
+    report = drift_report(document.create_blocks(min_words=150), SemanticChunker(),
+                          similarity_threshold=similarity_threshold)
+    print(format_drift_report(report))
+
+
+def ingest_runner(source, workers=None, interval=60, once=False, similarity_threshold=0.45, embedding_dtype="float32",
+                  text_layer=False):
+    from text_processing.ingest import Ingestor
+
+    chunker, writer = make_chunker_and_writer(embedding_dtype)
+    ingestor = Ingestor(source, chunker=chunker, writer=writer, max_workers=workers or 2,
+                        similarity_threshold=similarity_threshold, text_layer=text_layer)
+    if once:
+        stats = ingestor.run_once()
+        return stats["statuses"]["failed"]
+    ingestor.start(interval=interval)
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert PDFs to markdown and split them into semantic chunks.")
+    parser.add_argument("--batch", metavar="SOURCE",
+                        help="directory or glob of PDFs to process as a batch")
+    parser.add_argument("--watch", metavar="DIR",
+                        help="ingestion daemon: scan DIR on a schedule and process new or changed PDFs as resumable jobs")
+    parser.add_argument("--interval", type=float, default=60,
+                        help="seconds between scans in --watch mode")
+    parser.add_argument("--once", action="store_true",
+                        help="with --watch, scan and process once, then exit")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of PDF conversion processes in batch and --watch mode")
+    parser.add_argument("--page-workers", type=int, default=None,
+                        help="convert a single PDF as page ranges in this many processes, chunking as ranges finish")
+    parser.add_argument("--text-layer", action="store_true",
+                        help="extract born-digital pages from the PDF text layer; only scanned or complex pages "
+                             "go to marker")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="drop all cached PDF conversions before running")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="record per-stage timings and write them to PATH (.json, or .prom for Prometheus text)")
+    parser.add_argument("--dedup", choices=("mark", "drop"),
+                        help="mark or drop near-duplicate chunks (MinHash/LSH) before writing")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-chunk blocks that changed since the previous run of the same file")
+    parser.add_argument("--embedding-dtype", choices=("float32", "float16", "int8"), default="float32",
+                        help="store chunk embeddings as float16 or int8 (per-vector scales) to save memory and disk")
+    parser.add_argument("--drift-report", action="store_true",
+                        help="print how float16/int8 embeddings change chunk boundaries and neighbours, then exit")
+    parser.add_argument("--encoder", choices=("sentence-transformers", "fastembed", "fastembed-int8", "hash"),
+                        help="encoder backend for sentence embeddings (default: $TEXTRACT_ENCODER or sentence-transformers)")
+    parser.add_argument("--encode-workers", type=int, metavar="N",
+                        help="encode large sentence batches in N processes, each with its own model copy "
+                             "(default: $TEXTRACT_ENCODE_WORKERS or 1)")
+    parser.add_argument("--threshold", type=float, default=0.45,
+                        help="similarity threshold for splitting chunks")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    runner()
\ No newline at end of file
+    args = parse_args()
+    if args.encoder:
+        # Read by models.get_encoder() wherever a default encoder is created
+        os.environ["TEXTRACT_ENCODER"] = args.encoder
+    if args.encode_workers:
+        os.environ["TEXTRACT_ENCODE_WORKERS"] = str(args.encode_workers)
+    if args.metrics:
+        from text_processing import metrics
+
+        metrics.enable()
+    if args.clear_cache:
+        from text_processing.conversion_cache import get_conversion_cache
+
+        get_conversion_cache().invalidate()
+    if args.watch:
+        report = None
+        failed = ingest_runner(args.watch, workers=args.workers, interval=args.interval, once=args.once,
+                               similarity_threshold=args.threshold, embedding_dtype=args.embedding_dtype,
+                               text_layer=args.text_layer)
+        if failed:
+            sys.exit(1)
+    elif args.drift_report:
+        report = None
+        drift_runner(similarity_threshold=args.threshold)
+    elif args.batch:
+        report = batch_runner(args.batch, workers=args.workers, similarity_threshold=args.threshold,
+                              dedup=args.dedup, embedding_dtype=args.embedding_dtype, text_layer=args.text_layer)
+    else:
+        report = None
+        runner(similarity_threshold=args.threshold, dedup=args.dedup, incremental=args.incremental,
+               embedding_dtype=args.embedding_dtype, page_workers=args.page_workers, text_layer=args.text_layer)
+
+    if args.metrics:
+        if args.metrics.endswith(".prom"):
+            with open(args.metrics, "w", encoding="utf-8") as f:
+                f.write(metrics.get_metrics().to_prometheus())
+        else:
+            metrics.get_metrics().to_json(args.metrics)
+        print(f"Metrics written to {args.metrics}")
+    sys.exit(1 if report is not None and report.failures else 0)
@@ -0,0 +1,219 @@
+import functools
+import json
+import os
+import threading
+import time
+
+
+def _current_rss_kb():
+    """Get the current resident set size in KB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class _NoopSpan:
+    """A span that does nothing, shared by every call while metrics are disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.rss_start = _current_rss_kb() if self.metrics.track_memory else 0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        rss_delta = _current_rss_kb() - self.rss_start if self.metrics.track_memory else 0
+        self.metrics._record(self.name, seconds, rss_delta)
+        return False
+
+
+class Metrics:
+    """
+    A registry of per-stage timings, counters and memory deltas for one run.
+    """
+
+    def __init__(self, enabled=False, track_memory=True):
+        """
+        Initialize the metrics registry.
+
+        Args:
+            enabled (bool): Record spans and counters; when False every call is a no-op
+            track_memory (bool): Record the RSS change across each span
+        """
+        self.enabled = enabled
+        self.track_memory = track_memory
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self.spans = {}
+            self.counters = {}
+            self.started = time.time()
+
+    def span(self, name):
+        """
+        Time a stage, as a context manager.
+
+        Args:
+            name (str): Stage name, e.g. 'encode'
+
+        Returns:
+            A context manager recording the stage when it exits
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, name)
+
+    def timed(self, name):
+        """
+        Time every call of a function, as a decorator.
+
+        Args:
+            name (str): Stage name
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def incr(self, name, value=1):
+        """
+        Add to a counter.
+
+        Args:
+            name (str): Counter name, e.g. 'sentences'
+            value (int | float): Amount to add
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def _record(self, name, seconds, rss_delta_kb):
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = {
+                    "count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "rss_delta_kb": 0
+                }
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["rss_delta_kb"] += rss_delta_kb
+
+    def report(self):
+        """
+        Get a snapshot of everything recorded.
+
+        Returns:
+            dict: Run start time, wall seconds, spans and counters
+        """
+        with self._lock:
+            return {
+                "started": self.started,
+                "wall_seconds": time.time() - self.started,
+                "spans": {name: dict(stats) for name, stats in self.spans.items()},
+                "counters": dict(self.counters),
+            }
+
+    def to_json(self, path=None):
+        """
+        Render the report as JSON, optionally writing it to a file.
+
+        Args:
+            path (str, optional): File to write the report to
+
+        Returns:
+            str: The JSON report
+        """
+        text = json.dumps(self.report(), indent=2)
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+    def to_prometheus(self, prefix="textract"):
+        """
+        Render the report in the Prometheus text exposition format.
+
+        Args:
+            prefix (str): Metric name prefix
+
+        Returns:
+            str: Prometheus metrics text
+        """
+        report = self.report()
+        lines = [
+            f"# TYPE {prefix}_stage_seconds_total counter",
+            *(f'{prefix}_stage_seconds_total{{stage="{name}"}} {stats["total_seconds"]:.6f}'
+              for name, stats in report["spans"].items()),
+            f"# TYPE {prefix}_stage_calls_total counter",
+            *(f'{prefix}_stage_calls_total{{stage="{name}"}} {stats["count"]}'
+              for name, stats in report["spans"].items()),
+            f"# TYPE {prefix}_stage_rss_delta_kb gauge",
+            *(f'{prefix}_stage_rss_delta_kb{{stage="{name}"}} {stats["rss_delta_kb"]}'
+              for name, stats in report["spans"].items()),
+        ]
+        for name, value in report["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry; enable with TEXTRACT_METRICS=1 or metrics.enable()
+_metrics = Metrics(enabled=os.environ.get("TEXTRACT_METRICS") == "1")
+
+
+def get_metrics():
+    """Get the process-wide Metrics registry."""
+    return _metrics
+
+
+def enable(track_memory=True):
+    """Turn on recording in the process-wide registry."""
+    _metrics.enabled = True
+    _metrics.track_memory = track_memory
+
+
+def disable():
+    """Turn off recording in the process-wide registry."""
+    _metrics.enabled = False
+
+
+def span(name):
+    """Time a stage in the process-wide registry; see Metrics.span()."""
+    return _metrics.span(name)
+
+
+def timed(name):
+    """Decorate a function to be timed in the process-wide registry."""
+    return _metrics.timed(name)
+
+
+def incr(name, value=1):
+    """Add to a counter in the process-wide registry."""
+    _metrics.incr(name, value)
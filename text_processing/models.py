@@ -0,0 +1,108 @@
+import atexit
+import os
+import threading
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Encoder backends selectable with get_encoder() or the TEXTRACT_ENCODER environment variable
+ENCODER_BACKENDS = ('sentence-transformers', 'fastembed', 'fastembed-int8', 'hash')
+DEFAULT_BACKEND = 'sentence-transformers'
+
+_models = {}
+_encoders = {}
+_lock = threading.Lock()
+
+
+def get_model(model_name=DEFAULT_MODEL_NAME):
+    """
+    Get a process-wide SentenceTransformer, loading it on first use.
+    
+    Args:
+        model_name (str): Name of the SentenceTransformer model
+        
+    Returns:
+        SentenceTransformer: The shared model instance
+    """
+    model = _models.get(model_name)
+    if model is None:
+        with _lock:
+            model = _models.get(model_name)
+            if model is None:
+                # Imported here so parsing documents never pays for torch
+                from sentence_transformers import SentenceTransformer
+                
+                model = SentenceTransformer(model_name)
+                _models[model_name] = model
+    return model
+
+
+def default_backend():
+    """Get the configured encoder backend (TEXTRACT_ENCODER, else sentence-transformers)."""
+    return os.environ.get('TEXTRACT_ENCODER') or DEFAULT_BACKEND
+
+
+def default_workers():
+    """Get the configured number of encoding processes (TEXTRACT_ENCODE_WORKERS, else 1)."""
+    return int(os.environ.get('TEXTRACT_ENCODE_WORKERS') or 1)
+
+
+def get_encoder(backend=None, model_name=DEFAULT_MODEL_NAME, workers=None):
+    """
+    Get a process-wide encoder for a backend, creating it on first use.
+    
+    Args:
+        backend (str, optional): One of ENCODER_BACKENDS (default: default_backend())
+        model_name (str): Name of the model to encode with; ignored by 'hash'
+        workers (int, optional): Encoding processes; above 1 a PooledEncoder shards batches across them
+            (default: default_workers())
+        
+    Returns:
+        Encoder: The shared encoder instance
+    """
+    backend = backend or default_backend()
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}', expected one of {ENCODER_BACKENDS}")
+    workers = workers if workers is not None else default_workers()
+    key = (backend, model_name, workers) if workers > 1 else (backend, model_name)
+    encoder = _encoders.get(key)
+    if encoder is None:
+        if workers > 1:
+            from text_processing.encoders import PooledEncoder
+            
+            # Created outside the lock: it looks up the single-process encoder for its name
+            encoder = PooledEncoder(backend, model_name, workers=workers)
+            with _lock:
+                return _encoders.setdefault(key, encoder)
+        with _lock:
+            encoder = _encoders.get(key)
+            if encoder is None:
+                from text_processing.encoders import FastEmbedEncoder, HashEncoder, SentenceTransformerEncoder
+                
+                if backend == 'sentence-transformers':
+                    encoder = SentenceTransformerEncoder(model_name)
+                elif backend == 'hash':
+                    encoder = HashEncoder()
+                else:
+                    encoder = FastEmbedEncoder(model_name, quantized=backend == 'fastembed-int8')
+                _encoders[key] = encoder
+    return encoder
+
+
+def loaded_models():
+    """Get the names of models loaded in this process."""
+    return list(_models)
+
+
+def clear_models():
+    """Drop all loaded models so their memory can be released, stopping encoding processes."""
+    with _lock:
+        for encoder in _encoders.values():
+            close = getattr(encoder, 'close', None)
+            if close is not None:
+                close()
+        _models.clear()
+        _encoders.clear()
+
+
+# Stop encoding processes before the interpreter tears down
+atexit.register(clear_models)
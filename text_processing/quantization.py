@@ -0,0 +1,180 @@
+import numpy as np
+
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+
+def check_dtype(dtype):
+    """Normalize an embedding dtype name, rejecting unsupported ones."""
+    name = np.dtype(dtype).name
+    if name not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype '{name}', expected one of {EMBEDDING_DTYPES}")
+    return name
+
+
+def quantize(embeddings, dtype="int8"):
+    """
+    Convert float embeddings to a compact storage dtype.
+
+    int8 uses symmetric scalar quantization with one scale per vector,
+    so each row is values * scale.
+
+    Args:
+        embeddings (np.ndarray): (dim,) vector or (n, dim) matrix
+        dtype (str): 'float32', 'float16' or 'int8'
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray | float | None]: Stored values and per-vector scales (int8 only)
+    """
+    dtype = check_dtype(dtype)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if dtype == "float32":
+        return embeddings, None
+    if dtype == "float16":
+        return embeddings.astype(np.float16), None
+
+    matrix = np.atleast_2d(embeddings)
+    scales = np.abs(matrix).max(axis=1) / 127 if matrix.size else np.zeros(matrix.shape[0], dtype=np.float32)
+    scales[scales == 0] = 1.0
+    values = np.rint(matrix / scales[:, None]).astype(np.int8)
+    scales = scales.astype(np.float32)
+    if embeddings.ndim == 1:
+        return values[0], float(scales[0])
+    return values, scales
+
+
+def dequantize(values, scales=None):
+    """
+    Convert stored embeddings back to float32.
+
+    Args:
+        values (np.ndarray): Stored vector or matrix
+        scales (np.ndarray | float, optional): Per-vector scales for int8 values
+
+    Returns:
+        np.ndarray: float32 embeddings
+    """
+    values = np.asarray(values, dtype=np.float32)
+    if scales is None:
+        return values
+    if np.ndim(scales) == 0:
+        return values * np.float32(scales)
+    return values * np.asarray(scales, dtype=np.float32)[:, None]
+
+
+def quantized_dot(queries, values, scales=None, block_rows=16384):
+    """
+    Score float32 queries against stored embeddings without dequantizing the whole matrix.
+
+    Stored rows are widened to float32 one block at a time and int8
+    scales are applied to the scores, so peak memory stays bounded.
+
+    Args:
+        queries (np.ndarray): (n_queries, dim) float32 matrix
+        values (np.ndarray): (n, dim) stored matrix
+        scales (np.ndarray, optional): (n,) per-row scales for int8 values
+        block_rows (int): Stored rows widened at a time
+
+    Returns:
+        np.ndarray: (n_queries, n) float32 dot products
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    if values.dtype == np.float32 and scales is None:
+        return queries @ values.T
+
+    scores = np.empty((queries.shape[0], values.shape[0]), dtype=np.float32)
+    for start in range(0, values.shape[0], block_rows):
+        stop = start + block_rows
+        block_scores = queries @ values[start:stop].astype(np.float32).T
+        if scales is not None:
+            block_scores *= scales[start:stop]
+        scores[:, start:stop] = block_scores
+    return scores
+
+
+def bytes_per_vector(dim, dtype):
+    """Get the storage size of one embedding, including its int8 scale."""
+    dtype = check_dtype(dtype)
+    return dim * np.dtype(dtype).itemsize + (4 if dtype == "int8" else 0)
+
+
+def drift_report(blocks, chunker, dtypes=("float16", "int8"), k=10, min_words=100, max_words=250,
+                 similarity_threshold=0.7):
+    """
+    Measure how quantized embeddings change chunk boundaries and nearest neighbours.
+
+    Sentences are encoded once. Grouping is then repeated with sentence
+    embeddings stored in each dtype, and the resulting chunk embeddings
+    are searched in that dtype, both compared with float32.
+
+    Args:
+        blocks (List[Block]): Blocks to chunk
+        chunker (SemanticChunker): Chunker providing the encoder and grouping engine
+        dtypes (Iterable[str]): Storage dtypes to compare with float32
+        k (int): Neighbours compared per chunk
+        min_words (int): Minimum words per chunk
+        max_words (int): Maximum words per chunk
+        similarity_threshold (float): Similarity threshold for splitting
+
+    Returns:
+        dict: Per dtype, boundary agreement, top-k overlap and storage size
+    """
+    block_spans, sentences = chunker.split_blocks(blocks)
+    embeddings = chunker.encode_sentences(sentences)
+    settings = dict(min_words=min_words, max_words=max_words, similarity_threshold=similarity_threshold)
+
+    def boundaries(block_chunks):
+        return [(i, chunk.start) for i, chunks in enumerate(block_chunks) for chunk in chunks]
+
+    # The reference keeps float32 chunk embeddings whatever the chunker stores
+    reference = chunker.group_blocks(blocks, block_spans, embeddings, embedding_dtype="float32", **settings)
+    reference_boundaries = set(boundaries(reference))
+    chunk_matrix = np.stack([chunk.get_embedding() for chunks in reference for chunk in chunks]) \
+        if reference_boundaries else np.zeros((0, embeddings.shape[1] if embeddings.size else 0), dtype=np.float32)
+    norms = np.linalg.norm(chunk_matrix, axis=1, keepdims=True)
+    chunk_matrix = chunk_matrix / np.where(norms == 0, 1, norms)
+    kk = min(k, max(len(chunk_matrix) - 1, 0))
+    reference_top = _top_k(chunk_matrix @ chunk_matrix.T, kk)
+
+    dim = embeddings.shape[1] if embeddings.size else 0
+    report = {}
+    for dtype in dtypes:
+        values, scales = quantize(embeddings, dtype)
+        grouped = chunker.group_blocks(blocks, block_spans, values, embedding_scales=scales, **settings)
+        found = set(boundaries(grouped))
+        agreement = len(found & reference_boundaries) / len(found | reference_boundaries) if found else 1.0
+
+        chunk_values, chunk_scales = quantize(chunk_matrix, dtype)
+        top = _top_k(quantized_dot(chunk_matrix, chunk_values, chunk_scales), kk)
+        overlap = float(np.mean([len(set(a) & set(b)) / kk for a, b in zip(reference_top, top)])) if kk else 1.0
+
+        report[dtype] = {
+            "boundary_agreement": agreement,
+            "chunks": len(found),
+            "reference_chunks": len(reference_boundaries),
+            f"top{k}_overlap": overlap,
+            "bytes_per_vector": bytes_per_vector(dim, dtype),
+            "float32_bytes_per_vector": bytes_per_vector(dim, "float32"),
+        }
+    return report
+
+
+def _top_k(scores, k):
+    """Rows of the k best scores per row, excluding the row itself."""
+    if k == 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.int64)
+    scores = scores.copy()
+    np.fill_diagonal(scores, -np.inf)
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def format_drift_report(report):
+    """Render a drift_report() result as a table."""
+    lines = [f"{'dtype':<8} {'boundaries':>11} {'chunks':>13} {'top-k overlap':>14} {'bytes/vector':>13}"]
+    for dtype, stats in report.items():
+        overlap = next(value for key, value in stats.items() if key.endswith("_overlap"))
+        lines.append(
+            f"{dtype:<8} {stats['boundary_agreement']:>11.1%} "
+            f"{stats['chunks']:>6}/{stats['reference_chunks']:<6} {overlap:>14.1%} "
+            f"{stats['bytes_per_vector']:>6} ({stats['bytes_per_vector'] / stats['float32_bytes_per_vector']:.0%})"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,38 @@
+import re
+
+# A sentence runs up to the next '.', '!' or '?' and excludes surrounding whitespace,
+# matching the pieces of re.split(r'[.!?]+', text) after strip()
+SENTENCE_PATTERN = re.compile(r'[^.!?\s](?:[^.!?]*[^.!?\s])?')
+
+TERMINATOR_PATTERN = re.compile(r'[.!?]*')
+
+
+def sentence_spans(text):
+    """
+    Find the sentences of a text as character spans.
+
+    Args:
+        text (str): Text to segment
+
+    Returns:
+        List[Tuple[int, int]]: (start, end) offsets of each sentence, without its terminator
+    """
+    return [match.span() for match in SENTENCE_PATTERN.finditer(text)]
+
+
+def split_sentences(text):
+    """
+    Split a text into sentence strings.
+
+    Args:
+        text (str): Text to segment
+
+    Returns:
+        List[str]: Sentences, stripped and without their terminators
+    """
+    return SENTENCE_PATTERN.findall(text)
+
+
+def extend_to_terminator(text, end):
+    """Move a sentence end offset past the '.', '!' or '?' run that closes it."""
+    return TERMINATOR_PATTERN.match(text, end).end()
@@ -0,0 +1,301 @@
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from text_processing.chunkers import SemanticChunker
+from text_processing.doc_models.documents import Document
+from text_processing.metrics import get_metrics
+from text_processing.writers import chunk_records
+
+
+class MicroBatcher:
+    """
+    An asyncio front end that merges concurrent encode requests into one model call.
+
+    Requests are collected until max_batch_size sentences are queued or
+    max_wait_ms has passed since the first one arrived, then encoded
+    together on a dedicated worker thread so the event loop never blocks.
+    """
+
+    def __init__(self, encoder, max_batch_size=256, max_wait_ms=5, encode_batch_size=64):
+        """
+        Initialize the micro-batcher.
+
+        Args:
+            encoder: Object with encode(sentences, batch_size) returning a matrix
+            max_batch_size (int): Maximum sentences merged into one encode call
+            max_wait_ms (float): Maximum time to wait for more requests
+            encode_batch_size (int): Batch size passed to the encoder
+        """
+        self.encoder = encoder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.encode_batch_size = encode_batch_size
+        self.requests = 0
+        self.sentences = 0
+        self.batches = 0
+        self._queue = None
+        self._task = None
+        self._executor = None
+
+    async def start(self):
+        """Start the batching loop and the encoder thread."""
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encoder")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching loop, failing requests that are still queued or being encoded."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            self._fail([self._queue.get_nowait()], RuntimeError("Encoder service is shutting down"))
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def encode(self, sentences):
+        """
+        Encode sentences as part of the next merged batch.
+
+        Args:
+            sentences (List[str]): Sentences to encode
+
+        Returns:
+            np.ndarray: float32 matrix with one row per sentence
+        """
+        if not sentences:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self._task is None:
+            raise RuntimeError("MicroBatcher.start() has not been called")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((sentences, future))
+        return await future
+
+    async def _next_batch(self, batch):
+        """Wait for one request, then gather more into batch until the size or time limit is hit."""
+        loop = asyncio.get_running_loop()
+        batch.append(await self._queue.get())
+        size = len(batch[0][0])
+        deadline = loop.time() + self.max_wait
+
+        while size < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Requests taken off the queue; stop() can no longer see them there
+            batch = []
+            try:
+                await self._next_batch(batch)
+                sentences = [s for request_sentences, _ in batch for s in request_sentences]
+                embeddings = await loop.run_in_executor(
+                    self._executor, self.encoder.encode, sentences, self.encode_batch_size
+                )
+                embeddings = np.asarray(embeddings, dtype=np.float32)
+            except asyncio.CancelledError:
+                self._fail(batch, RuntimeError("Encoder service is shutting down"))
+                raise
+            except Exception as error:
+                self._fail(batch, error)
+                continue
+
+            self.requests += len(batch)
+            self.sentences += len(sentences)
+            self.batches += 1
+
+            offset = 0
+            for request_sentences, future in batch:
+                if not future.done():
+                    future.set_result(embeddings[offset:offset + len(request_sentences)])
+                offset += len(request_sentences)
+
+    def stats(self):
+        """Get request, sentence and batch counters."""
+        return {
+            "requests": self.requests,
+            "sentences": self.sentences,
+            "batches": self.batches,
+            "avg_requests_per_batch": self.requests / self.batches if self.batches else 0.0,
+            "avg_sentences_per_batch": self.sentences / self.batches if self.batches else 0.0,
+        }
+
+
+class ChunkRequest(BaseModel):
+    markdown: str
+    doc_id: str | None = None
+    block_min_words: int = 150
+    min_words: int = 100
+    max_words: int = 250
+    similarity_threshold: float = 0.45
+
+
+def _split_markdown(chunker, markdown, doc_id, block_min_words):
+    """Parse markdown into blocks and split them into sentences."""
+    document = Document(markdown, doc_id=doc_id)
+    blocks = document.create_blocks(min_words=block_min_words)
+    block_spans, sentences = chunker.split_blocks(blocks)
+    return document, blocks, block_spans, sentences
+
+
+def _group_markdown(chunker, document, blocks, block_spans, embeddings, min_words, max_words, similarity_threshold):
+    """Group the encoded sentences into chunks and render the chunk records."""
+    block_chunks = chunker.group_blocks(
+        blocks, block_spans, embeddings,
+        min_words=min_words,
+        max_words=max_words,
+        similarity_threshold=similarity_threshold
+    )
+    for block, chunks in zip(blocks, block_chunks):
+        block.chunks = chunks
+    return chunk_records(document)
+
+
+async def chunk_markdown(chunker, batcher, markdown, doc_id=None, block_min_words=150,
+                         min_words=100, max_words=250, similarity_threshold=0.45, executor=None):
+    """
+    Chunk markdown, encoding its sentences through the shared micro-batcher.
+
+    Parsing, splitting and grouping run in an executor, so a large document
+    does not block the event loop and the batcher's collection window.
+
+    Args:
+        chunker (SemanticChunker): Chunker used for splitting and grouping
+        batcher (MicroBatcher): Batcher in front of the shared encoder
+        markdown (str): Markdown text to chunk
+        doc_id (str, optional): Unique identifier for the document
+        block_min_words (int): Minimum words per block
+        min_words (int): Minimum words per chunk
+        max_words (int): Maximum words per chunk
+        similarity_threshold (float): Similarity threshold for splitting
+        executor (Executor, optional): Executor for the CPU-bound steps (default: the loop's)
+
+    Returns:
+        dict: Document id, block count and chunk records
+    """
+    loop = asyncio.get_running_loop()
+    document, blocks, block_spans, sentences = await loop.run_in_executor(
+        executor, _split_markdown, chunker, markdown, doc_id, block_min_words
+    )
+    embeddings = await batcher.encode(sentences)
+    records = await loop.run_in_executor(
+        executor, _group_markdown, chunker, document, blocks, block_spans, embeddings,
+        min_words, max_words, similarity_threshold
+    )
+    return {"doc_id": doc_id, "blocks": len(blocks), "chunks": records}
+
+
+def create_app(encoder=None, max_batch_size=256, max_wait_ms=5):
+    """
+    Create the chunking service.
+
+    Args:
+        encoder (optional): Object with encode(); defaults to the configured encoder backend
+        max_batch_size (int): Maximum sentences merged into one encode call
+        max_wait_ms (float): Maximum time a request waits for others to join its batch
+
+    Returns:
+        FastAPI: The application
+    """
+    state = {}
+
+    @asynccontextmanager
+    async def lifespan(app):
+        chunker = SemanticChunker(model=encoder) if encoder is not None else SemanticChunker()
+        batcher = MicroBatcher(chunker.model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        await batcher.start()
+        state["chunker"] = chunker
+        state["batcher"] = batcher
+        # PDF conversion is CPU-heavy, so keep it off the event loop and the encoder thread
+        state["convert_executor"] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="convert")
+        # Splitting and grouping are CPU-bound too; running them here keeps the batcher's window on time
+        state["chunk_executor"] = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chunk")
+        try:
+            yield
+        finally:
+            await batcher.stop()
+            state["convert_executor"].shutdown(wait=True)
+            state["chunk_executor"].shutdown(wait=True)
+
+    app = FastAPI(title="textract chunking service", lifespan=lifespan)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    async def stats():
+        return state["batcher"].stats()
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return get_metrics().to_prometheus()
+
+    @app.post("/chunk/markdown")
+    async def chunk_markdown_endpoint(request: ChunkRequest):
+        return await chunk_markdown(
+            state["chunker"], state["batcher"], request.markdown,
+            doc_id=request.doc_id,
+            block_min_words=request.block_min_words,
+            min_words=request.min_words,
+            max_words=request.max_words,
+            similarity_threshold=request.similarity_threshold,
+            executor=state["chunk_executor"]
+        )
+
+    @app.post("/chunk/pdf")
+    async def chunk_pdf_endpoint(request: Request, doc_id: str | None = None, similarity_threshold: float = 0.45):
+        body = await request.body()
+        if not body.startswith(b"%PDF"):
+            raise HTTPException(status_code=400, detail="Request body must be a PDF file")
+
+        from text_processing.load_and_chunk import pdf2markdown
+
+        fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            loop = asyncio.get_running_loop()
+            rendered_file = await loop.run_in_executor(state["convert_executor"], pdf2markdown, pdf_path)
+        finally:
+            os.remove(pdf_path)
+
+        return await chunk_markdown(
+            state["chunker"], state["batcher"], rendered_file.markdown,
+            doc_id=doc_id,
+            similarity_threshold=similarity_threshold,
+            executor=state["chunk_executor"]
+        )
+
+    return app
+
+
+app = create_app()
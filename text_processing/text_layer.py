@@ -0,0 +1,328 @@
+import re
+import time
+from collections import Counter
+
+from text_processing.conversion_cache import CachedRendering
+from text_processing.converters import MarkdownStitcher, get_converter_manager, merge_metadata
+from text_processing.metrics import incr
+
+# A page needs at least this many characters in its text layer to skip marker
+MIN_PAGE_CHARS = 50
+# Share of unmapped glyphs ("(cid:12)", U+FFFD) above which a text layer is treated as garbled
+MAX_GARBLED_RATIO = 0.05
+# Lines this much larger than body text, and short, are headers
+HEADER_SIZE_RATIO = 1.15
+MAX_HEADER_WORDS = 12
+MAX_HEADER_LEVELS = 4
+# Used to estimate time saved when no page of the document went through marker
+MARKER_SECONDS_PER_PAGE = 1.5
+
+TEXT_LAYER = "text_layer"
+MARKER = "marker"
+
+_GARBLED_PATTERN = re.compile(r"\(cid:\d+\)|\ufffd")
+_DIGITS_PATTERN = re.compile(r"\d+")
+
+
+class TextLayerReport:
+    """
+    How many pages took the text-layer path and the marker path, and the time saved.
+    """
+
+    def __init__(self):
+        self.pages = 0
+        self.text_layer_pages = 0
+        self.marker_pages = 0
+        self.reasons = Counter()
+        self.text_layer_seconds = 0.0
+        self.marker_seconds = 0.0
+
+    @property
+    def marker_seconds_per_page(self):
+        """Get marker's time per page in this run, or the default estimate if it converted none."""
+        if self.marker_pages:
+            return self.marker_seconds / self.marker_pages
+        return MARKER_SECONDS_PER_PAGE
+
+    @property
+    def seconds_saved(self):
+        """Get the estimated time saved by not sending text-layer pages through marker."""
+        return self.text_layer_pages * self.marker_seconds_per_page - self.text_layer_seconds
+
+    def merge(self, other):
+        """Add the counts of another report, e.g. from another document of a batch."""
+        self.pages += other.pages
+        self.text_layer_pages += other.text_layer_pages
+        self.marker_pages += other.marker_pages
+        self.reasons.update(other.reasons)
+        self.text_layer_seconds += other.text_layer_seconds
+        self.marker_seconds += other.marker_seconds
+
+    def as_dict(self):
+        return {
+            "pages": self.pages,
+            "text_layer_pages": self.text_layer_pages,
+            "marker_pages": self.marker_pages,
+            "marker_reasons": dict(self.reasons),
+            "text_layer_seconds": self.text_layer_seconds,
+            "marker_seconds": self.marker_seconds,
+            "seconds_saved": self.seconds_saved,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        report = cls()
+        report.pages = data.get("pages", 0)
+        report.text_layer_pages = data.get("text_layer_pages", 0)
+        report.marker_pages = data.get("marker_pages", 0)
+        report.reasons.update(data.get("marker_reasons", {}))
+        report.text_layer_seconds = data.get("text_layer_seconds", 0.0)
+        report.marker_seconds = data.get("marker_seconds", 0.0)
+        return report
+
+    def __str__(self):
+        reasons = ", ".join(f"{count} {reason}" for reason, count in self.reasons.most_common())
+        estimate = "" if self.marker_pages else " (estimated)"
+        return (f"Text layer: {self.text_layer_pages}/{self.pages} pages extracted directly in "
+                f"{self.text_layer_seconds:.2f}s, {self.marker_pages} sent to marker"
+                f"{f' ({reasons})' if reasons else ''} in {self.marker_seconds:.2f}s; "
+                f"~{self.seconds_saved:.1f}s saved{estimate}")
+
+
+def triage_page(page):
+    """
+    Decide whether a page's text layer can replace marker's layout and OCR models.
+
+    Args:
+        page (pdfplumber.page.Page): Page to inspect
+
+    Returns:
+        Tuple[str, str | None]: TEXT_LAYER or MARKER, and why the page needs marker
+    """
+    text = "".join(char["text"] for char in page.chars)
+    if len(text.strip()) < MIN_PAGE_CHARS:
+        # A page of images without text is a scan; a blank page has nothing to convert
+        return (MARKER, "scanned") if page.images else (TEXT_LAYER, None)
+    if len(_GARBLED_PATTERN.findall(text)) / len(text) > MAX_GARBLED_RATIO:
+        return MARKER, "garbled"
+    if page.find_tables():
+        # marker renders tables as markdown tables
+        return MARKER, "tables"
+    return TEXT_LAYER, None
+
+
+def page_lines(page):
+    """
+    Group a page's words into lines with their font size.
+
+    Args:
+        page (pdfplumber.page.Page): Page to read
+
+    Returns:
+        List[dict]: Lines in reading order with text, size, bold, top and bottom
+    """
+    words = page.extract_words(extra_attrs=["size", "fontname"], use_text_flow=True)
+    lines = []
+    current = []
+    for word in words:
+        # A word continues the line if it sits at the same height to the right of the previous word
+        if current and (abs(word["top"] - current[-1]["top"]) > 0.5 * current[-1]["size"]
+                        or word["x0"] < current[-1]["x0"]):
+            lines.append(_line(current))
+            current = []
+        current.append(word)
+    if current:
+        lines.append(_line(current))
+    return lines
+
+
+def _line(words):
+    sizes = sorted(word["size"] for word in words)
+    return {
+        "text": " ".join(word["text"] for word in words),
+        "size": round(sizes[len(sizes) // 2], 1),
+        "bold": all("bold" in word["fontname"].lower() for word in words),
+        "top": min(word["top"] for word in words),
+        "bottom": max(word["bottom"] for word in words),
+    }
+
+
+def strip_running_lines(pages_lines, min_pages=3):
+    """
+    Remove running headers and footers: lines at the top or bottom repeated across pages.
+
+    Lines are compared with digits ignored, so page numbers do not hide a repeat.
+
+    Args:
+        pages_lines (dict): Lines per page number, from page_lines(); modified in place
+        min_pages (int): Least number of pages a line must repeat on
+    """
+    def key(line):
+        return _DIGITS_PATTERN.sub("#", line["text"]).strip()
+
+    counts = Counter()
+    for lines in pages_lines.values():
+        # Running headers and footers can take two lines, e.g. a journal name and a DOI
+        counts.update({key(line) for line in lines[:2] + lines[-2:]})
+    threshold = max(min_pages, len(pages_lines) // 2)
+    running = {text for text, count in counts.items() if count >= threshold}
+    if not running:
+        return
+    for number, lines in pages_lines.items():
+        while lines and key(lines[0]) in running:
+            lines.pop(0)
+        while lines and key(lines[-1]) in running:
+            lines.pop()
+
+
+def header_levels(pages_lines):
+    """
+    Infer body text size and the header level of each larger font size.
+
+    Sizes are taken over the whole document so a size maps to the same
+    level on every page.
+
+    Args:
+        pages_lines (Iterable[List[dict]]): Lines of every text-layer page
+
+    Returns:
+        Tuple[float, dict]: Body size, and header level per font size
+    """
+    sizes = Counter()
+    for lines in pages_lines:
+        for line in lines:
+            sizes[line["size"]] += len(line["text"])
+    if not sizes:
+        return 0.0, {}
+    body_size = sizes.most_common(1)[0][0]
+    header_sizes = sorted((size for size in sizes if size >= body_size * HEADER_SIZE_RATIO), reverse=True)
+    return body_size, {size: min(i + 1, MAX_HEADER_LEVELS) for i, size in enumerate(header_sizes)}
+
+
+def lines_to_markdown(lines, body_size, levels):
+    """
+    Render a page's lines as markdown.
+
+    Larger fonts become headers at their document-wide level, and short
+    bold lines at body size become the lowest header level; consecutive
+    header lines of one level are a wrapped title. A vertical gap
+    larger than a line starts a new paragraph; other lines are joined.
+
+    Args:
+        lines (List[dict]): Lines from page_lines()
+        body_size (float): Body text size from header_levels()
+        levels (dict): Header level per font size from header_levels()
+
+    Returns:
+        str: Markdown of the page
+    """
+    blocks = []
+    paragraph = []
+    previous = None
+    bold_level = min(len(set(levels.values())) + 1, MAX_HEADER_LEVELS)
+
+    def flush():
+        if paragraph:
+            blocks.append(" ".join(paragraph))
+            paragraph.clear()
+
+    for line in lines:
+        text = line["text"].strip()
+        if not text:
+            continue
+        short = len(text.split()) <= MAX_HEADER_WORDS and not text.endswith(".")
+        level = levels.get(line["size"]) if short else None
+        if level is None and short and line["bold"] and line["size"] >= body_size:
+            level = bold_level
+        if level is not None:
+            flush()
+            if previous is None and blocks and blocks[-1].startswith("#" * level + " "):
+                # A title wrapped over several lines is one header
+                blocks[-1] += " " + text
+            else:
+                blocks.append(f"{'#' * level} {text}")
+            previous = None
+            continue
+
+        gap = line["top"] - previous["bottom"] if previous is not None else 0
+        if previous is not None and gap > previous["bottom"] - previous["top"]:
+            flush()
+        if paragraph and paragraph[-1].endswith("-"):
+            # Rejoin a word hyphenated across lines
+            paragraph[-1] = paragraph[-1][:-1] + text
+        else:
+            paragraph.append(text)
+        previous = line
+    flush()
+    return "\n\n".join(blocks)
+
+
+def convert_with_text_layer(file_path, manager=None):
+    """
+    Convert a PDF, extracting born-digital pages from their text layer.
+
+    Every page is triaged: pages with a usable text layer become markdown
+    directly, with headers inferred from font size, and runs of scanned,
+    garbled or table pages are converted by marker as page ranges. The
+    pieces are stitched in page order, so Document.create_blocks() sees
+    one markdown document.
+
+    Args:
+        file_path (str | Path): PDF to convert
+        manager (ConverterManager, optional): Manager for the pages that need marker
+
+    Returns:
+        CachedRendering: Markdown, with metadata holding page_paths, page_ranges and the text_layer report
+    """
+    import pdfplumber
+
+    report = TextLayerReport()
+    start = time.perf_counter()
+    with pdfplumber.open(str(file_path)) as pdf:
+        paths = []
+        lines = {}
+        for number, page in enumerate(pdf.pages):
+            path, reason = triage_page(page)
+            paths.append(path)
+            if path == TEXT_LAYER:
+                lines[number] = page_lines(page)
+            else:
+                report.reasons[reason] += 1
+            # Parsed page objects are large; keep only the lines
+            page.close()
+    strip_running_lines(lines)
+    body_size, levels = header_levels(lines.values())
+    report.text_layer_seconds = time.perf_counter() - start
+
+    report.pages = len(paths)
+    report.text_layer_pages = paths.count(TEXT_LAYER)
+    report.marker_pages = paths.count(MARKER)
+    incr("text_layer_pages", report.text_layer_pages)
+    incr("marker_pages", report.marker_pages)
+
+    stitcher = MarkdownStitcher()
+    metadata = {}
+    images = {}
+    number = 0
+    while number < len(paths):
+        if paths[number] == TEXT_LAYER:
+            stitcher.add(lines_to_markdown(lines[number], body_size, levels), (number, number + 1))
+            number += 1
+            continue
+
+        # Consecutive marker pages are converted together
+        end = number
+        while end < len(paths) and paths[end] == MARKER:
+            end += 1
+        started = time.perf_counter()
+        rendered_file = (manager or get_converter_manager()).convert(file_path, page_range=(number, end))
+        report.marker_seconds += time.perf_counter() - started
+        stitcher.add(rendered_file.markdown, (number, end))
+        merge_metadata(metadata, dict(getattr(rendered_file, "metadata", None) or {}))
+        images.update(getattr(rendered_file, "images", None) or {})
+        number = end
+
+    metadata["page_paths"] = paths
+    metadata["page_ranges"] = stitcher.ranges
+    metadata["text_layer"] = report.as_dict()
+    return CachedRendering(stitcher.markdown, metadata, images)
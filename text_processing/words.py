@@ -0,0 +1,98 @@
+# Code points for which str.isspace() is True, i.e. the separators used by str.split()
+_WHITESPACE = (
+    list(range(0x09, 0x0E)) + list(range(0x1C, 0x21)) + [0x85, 0xA0, 0x1680]
+    + list(range(0x2000, 0x200B)) + [0x2028, 0x2029, 0x202F, 0x205F, 0x3000]
+)
+_whitespace_table = None
+
+
+def _numpy():
+    """Import numpy and build the whitespace table on first use, so importing documents stays cheap."""
+    global _whitespace_table
+    import numpy as np
+
+    if _whitespace_table is None:
+        table = np.zeros(0x3001, dtype=bool)
+        table[_WHITESPACE] = True
+        _whitespace_table = table
+    return np
+
+
+class WordIndex:
+    """
+    Word boundaries of a text, found once, answering word counts for any span.
+
+    A count for text[start:end] equals len(text[start:end].split()) and
+    costs two binary searches instead of re-tokenizing the span.
+    """
+
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, text):
+        """
+        Build the index with one vectorized pass over the text.
+
+        Args:
+            text (str): Text to index
+        """
+        np = _numpy()
+        if text.isascii():
+            # One byte per character is enough for the common case
+            space = _whitespace_table[np.frombuffer(text.encode('ascii'), dtype=np.uint8)]
+        else:
+            codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+            in_table = codes < len(_whitespace_table)
+            space = np.zeros(len(codes), dtype=bool)
+            space[in_table] = _whitespace_table[codes[in_table]]
+
+        # Words start where a non-space follows a space and end where a space follows a non-space
+        word = ~space
+        starts = np.flatnonzero(word[1:] & space[:-1]) + 1
+        ends = np.flatnonzero(space[1:] & word[:-1]) + 1
+        if len(word) and word[0]:
+            starts = np.concatenate(([0], starts))
+        if len(word) and word[-1]:
+            ends = np.concatenate((ends, [len(word)]))
+        self.starts = starts
+        self.ends = ends
+
+    def count(self, start=0, end=None):
+        """
+        Count the words overlapping a character span.
+
+        Args:
+            start (int): Start offset
+            end (int, optional): End offset (default: end of text)
+
+        Returns:
+            int: Same as len(text[start:end].split())
+        """
+        np = _numpy()
+        if end is None:
+            return max(len(self.starts) - int(np.searchsorted(self.ends, start, 'right')), 0)
+        if end <= start:
+            return 0
+        return int(np.searchsorted(self.starts, end, 'left') - np.searchsorted(self.ends, start, 'right'))
+
+    def counts(self, spans, offset=0):
+        """
+        Count the words of many spans at once.
+
+        Args:
+            spans (List[Tuple[int, int]]): (start, end) offsets
+            offset (int): Amount added to every offset, e.g. a block's position in the document
+
+        Returns:
+            np.ndarray: Word count per span
+        """
+        np = _numpy()
+        spans = np.asarray(spans, dtype=np.int64).reshape(-1, 2) + offset
+        starts, ends = spans[:, 0], spans[:, 1]
+        counts = np.searchsorted(self.starts, ends, 'left') - np.searchsorted(self.ends, starts, 'right')
+        return np.where(ends > starts, np.maximum(counts, 0), 0)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return f"WordIndex(words={len(self.starts)})"
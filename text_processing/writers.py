@@ -0,0 +1,182 @@
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from text_processing.quantization import check_dtype, dequantize, quantize
+
+
+def _atomic_write(path, write):
+    """Write a file through a temporary sibling and rename it into place."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def chunk_records(document):
+    """
+    Build one flat record per chunk of a Document.
+
+    Args:
+        document (Document): Document whose blocks have been chunked
+
+    Returns:
+        List[dict]: Records in block/chunk order; embedding_row indexes the embedding matrix
+    """
+    records = []
+    for block in document.blocks or []:
+        for chunk in block.chunks or []:
+            # Chunk spans are relative to the block; shift them to offsets in the markdown
+            offset = block.start if chunk.start is not None else None
+            records.append({
+                "doc_id": document.doc_id,
+                "block_id": block.block_id,
+                "chunk_id": chunk.chunk_id,
+                "start_header": block.start_header,
+                "end_header": block.end_header,
+                "word_count": chunk.word_count,
+                "char_start": offset + chunk.start if offset is not None else None,
+                "char_end": offset + chunk.end if offset is not None else None,
+                "embedding_row": len(records),
+                "duplicate_of": ":".join(map(str, chunk.duplicate_of)) if chunk.duplicate_of else None,
+                "text": chunk.text,
+            })
+    return records
+
+
+def format_text_report(document):
+    """Render a Document's chunks in the human-readable _chunks.txt layout."""
+    result_lines = []
+    for block in document.blocks or []:
+        chunks = block.chunks or []
+        result_lines.append(f"Block {block.block_id} ('{block.start_header}') split into {len(chunks)} chunks:")
+        for chunk in chunks:
+            result_lines.append(f"  Chunk {chunk.chunk_id}: {chunk.word_count} words")
+            result_lines.append(chunk.text)
+            result_lines.append("")  # Separate chunks
+
+        result_lines.append("")  # Separate blocks
+    return "\n".join(result_lines)
+
+
+class ChunkWriter:
+    """
+    A writer that exports each chunked Document in one atomic, buffered pass.
+    """
+
+    FORMATS = ("txt", "jsonl", "parquet")
+
+    def __init__(self, output_dir="data/results", formats=("txt", "jsonl"), embeddings=True,
+                 embedding_dtype=np.float32):
+        """
+        Initialize the chunk writer.
+
+        Args:
+            output_dir (str): Directory to write results to
+            formats (Iterable[str]): Any of 'txt', 'jsonl' and 'parquet'
+            embeddings (bool): Also write a <name>_embeddings.npy matrix aligned with the records
+            embedding_dtype: dtype of the saved embedding matrix: np.float32, np.float16 or 'int8'
+                (int8 also writes per-row scales to <name>_embedding_scales.npy)
+        """
+        unknown = set(formats) - set(self.FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown export formats {sorted(unknown)}, expected any of {self.FORMATS}")
+        if "parquet" in formats:
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError as error:
+                raise ImportError("Parquet export requires pyarrow (pip install pyarrow)") from error
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.embeddings = embeddings
+        self.embedding_dtype = check_dtype(embedding_dtype)
+
+    def output_name(self, file_path):
+        """Get the base output name for a source file."""
+        return os.path.splitext(os.path.basename(str(file_path)))[0]
+
+    def write(self, document, file_path, name=None):
+        """
+        Write a Document's chunks, replacing any previous results for the same file.
+
+        Args:
+            document (Document): Document whose blocks have been chunked
+            file_path (str | Path): Source file, used to name the outputs
+            name (str, optional): Base output name (default: output_name(file_path))
+
+        Returns:
+            dict: Output path per format, plus 'embeddings' (and 'embedding_scales') if written
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = name or self.output_name(file_path)
+        records = chunk_records(document)
+        paths = {}
+
+        if "txt" in self.formats:
+            paths["txt"] = os.path.join(self.output_dir, f"{name}_chunks.txt")
+            report = format_text_report(document).encode("utf-8")
+            _atomic_write(paths["txt"], lambda f: f.write(report))
+
+        if "jsonl" in self.formats:
+            paths["jsonl"] = os.path.join(self.output_dir, f"{name}_chunks.jsonl")
+            buffer = io.StringIO()
+            for record in records:
+                buffer.write(json.dumps(record, ensure_ascii=False))
+                buffer.write("\n")
+            payload = buffer.getvalue().encode("utf-8")
+            _atomic_write(paths["jsonl"], lambda f: f.write(payload))
+
+        if "parquet" in self.formats:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            paths["parquet"] = os.path.join(self.output_dir, f"{name}_chunks.parquet")
+            table = pa.Table.from_pylist(records)
+            _atomic_write(paths["parquet"], lambda f: pq.write_table(table, f))
+
+        if self.embeddings:
+            paths["embeddings"] = os.path.join(self.output_dir, f"{name}_embeddings.npy")
+            chunks = document.get_all_chunks()
+            if chunks:
+                matrix = np.stack([chunk.get_embedding() for chunk in chunks])
+            else:
+                matrix = np.zeros((0, 0), dtype=np.float32)
+            matrix, scales = quantize(matrix, self.embedding_dtype)
+            _atomic_write(paths["embeddings"], lambda f: np.save(f, matrix))
+            scales_path = os.path.join(self.output_dir, f"{name}_embedding_scales.npy")
+            if scales is not None:
+                paths["embedding_scales"] = scales_path
+                _atomic_write(scales_path, lambda f: np.save(f, scales))
+            elif os.path.exists(scales_path):
+                # Left by an earlier int8 run; the matrix no longer needs it
+                os.remove(scales_path)
+
+        return paths
+
+
+def load_embeddings(path, mmap=True, dequantized=True):
+    """
+    Load an exported embedding matrix, memory-mapped by default.
+
+    Args:
+        path (str): Path of a <name>_embeddings.npy file
+        mmap (bool): Memory-map instead of reading into memory
+        dequantized (bool): Convert int8 matrices back to float32 using their scales file
+
+    Returns:
+        np.ndarray: (n_chunks, dim) matrix whose rows match embedding_row
+    """
+    matrix = np.load(path, mmap_mode="r" if mmap else None)
+    if dequantized and matrix.dtype == np.int8:
+        scales_path = path[:-len("_embeddings.npy")] + "_embedding_scales.npy"
+        return dequantize(matrix, np.load(scales_path))
+    return matrix